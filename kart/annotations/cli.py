@@ -1,16 +1,24 @@
+import concurrent.futures
+import math
 import sys
 
 import click
 import pygit2
 
-from kart.diff_estimation import estimate_diff_feature_counts
+from kart.diff_estimation import calculate_diff_feature_counts
 from kart.exceptions import InvalidOperation
 from kart.cli_util import KartCommand
+from kart.utils import get_num_available_cores
 
 from .db import annotations_session, is_db_writable
 
 EMPTY_TREE_SHA = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
 
+ANNOTATION_TYPE = "feature-change-counts-exact"
+
+# How many annotations the writer holds in memory before flushing them to the database (still in the same transaction).
+FLUSH_EVERY = 1000
+
 
 def gen_reachable_commits(repo):
     """
@@ -23,6 +31,48 @@ def gen_reachable_commits(repo):
     yield from walker
 
 
+def _base_of(repo, commit):
+    return commit.parents[0] if commit.parents else repo.empty_tree
+
+
+# The repo used by each worker process - each worker opens its own.
+_worker_repo = None
+
+
+def _init_worker(repo_path):
+    global _worker_repo
+    from kart.repo import KartRepo
+
+    _worker_repo = KartRepo(repo_path)
+
+
+def _calculate_feature_counts_for_commit(commit_id):
+    """Runs in a worker process. Returns the exact feature counts for each dataset changed by the given commit."""
+    commit = _worker_repo[commit_id]
+    return calculate_diff_feature_counts(
+        _worker_repo, _base_of(_worker_repo, commit), commit, accuracy="exact"
+    )
+
+
+def _iter_feature_counts(repo, commits, jobs):
+    """Yields the exact feature counts for each of the given commits, in order - using jobs worker processes."""
+    if jobs == 1:
+        for commit in commits:
+            yield calculate_diff_feature_counts(
+                repo, _base_of(repo, commit), commit, accuracy="exact"
+            )
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(repo.path,)
+    ) as executor:
+        yield from executor.map(
+            _calculate_feature_counts_for_commit,
+            [commit.id.hex for commit in commits],
+            chunksize=max(1, min(64, len(commits) // (jobs * 4))),
+        )
+
+
 @click.command(cls=KartCommand, name="build-annotations")
 @click.pass_context
 @click.option(
@@ -30,7 +80,15 @@ def gen_reachable_commits(repo):
     is_flag=True,
     help="Build annotations for reachable commits on all refs",
 )
-def build_annotations(ctx, all_reachable):
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="How many commits to annotate in parallel. Use 0 for the number of available CPU cores.",
+)
+def build_annotations(ctx, all_reachable, jobs):
     """
     Builds annotations against commits; stores the annotations in a sqlite database.
 
@@ -57,14 +115,33 @@ def build_annotations(ctx, all_reachable):
                     "Annotations database is readonly; can't continue"
                 )
             click.echo("Building feature change counts...")
-            for i, commit in enumerate(commits):
+            # Commits that are already annotated don't need to be annotated again.
+            commits = [
+                commit
+                for commit in commits
+                if repo.diff_annotations.get(
+                    base=_base_of(repo, commit),
+                    target=commit,
+                    annotation_type=ANNOTATION_TYPE,
+                )
+                is None
+            ]
+            if jobs == 0:
+                jobs = max(1, int(math.ceil(get_num_available_cores())))
+            jobs = max(1, min(jobs, len(commits)))
+
+            # Workers just calculate the feature counts - all annotations are written from here, in one transaction.
+            feature_counts = _iter_feature_counts(repo, commits, jobs)
+            for i, (commit, counts) in enumerate(zip(commits, feature_counts)):
                 click.echo(
                     f"({i+1}/{len(commits)}): {commit.short_id} {commit.message.splitlines()[0]}"
                 )
-                estimate_diff_feature_counts(
-                    repo,
-                    commit.parents[0] if commit.parents else repo.empty_tree,
-                    commit,
-                    accuracy="exact",
+                repo.diff_annotations.store(
+                    base=_base_of(repo, commit),
+                    target=commit,
+                    annotation_type=ANNOTATION_TYPE,
+                    data=counts,
                 )
+                if (i + 1) % FLUSH_EVERY == 0:
+                    session.flush()
     click.echo("done.")
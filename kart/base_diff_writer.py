@@ -14,7 +14,11 @@ from kart.exceptions import CrsError, InvalidOperation
 from kart.key_filters import RepoKeyFilter
 from kart import list_of_conflicts
 from kart.list_of_conflicts import ListOfConflicts
-from kart.promisor_utils import FetchPromisedBlobsProcess, object_is_promised
+from kart.promisor_utils import (
+    PromisedBlobsPrefetch,
+    object_is_promised,
+    promised_blob_ids,
+)
 from kart.repo import KartRepoState
 from kart.spatial_filter import SpatialFilter
 from kart.serialise_util import b64encode_str
@@ -434,7 +438,17 @@ class BaseDiffWriter:
         unfiltered_deltas = ds_diff[item_type].sorted_items()
 
         if self.spatial_filter.match_all:
-            yield from unfiltered_deltas
+            if not self.repo.is_partial_clone:
+                yield from unfiltered_deltas
+                return
+            # Every delta will be output, so we know up front which promised blobs are needed - these are fetched
+            # in parallel, while the deltas before the first one that needs a promised blob are output. The deltas
+            # are still output in order - the rest are output once the fetch has finished.
+            delta_fetcher = self._get_delta_fetcher(ds_path)
+            delta_fetcher.prefetch_deltas(ds_diff[item_type].iter_deltas())
+            for key, delta in unfiltered_deltas:
+                delta_fetcher.wait_until_delta_is_ready(key, delta)
+                yield key, delta
             return
 
         old_spatial_filter, new_spatial_filter = self.get_spatial_filters(
@@ -617,10 +631,13 @@ class BaseDiffWriter:
             if source_crs is None:
                 return None
 
-            from osgeo import osr
+            from kart.crs_util import make_transform
+            from kart.tabular.reprojection import BatchGeometryTransform
 
             try:
-                return osr.CoordinateTransformation(source_crs, self.target_crs)
+                return BatchGeometryTransform(
+                    make_transform(source_crs, self.target_crs)
+                )
             except RuntimeError as e:
                 raise CrsError(
                     f"Can't reproject dataset {ds_path!r} into target CRS: {e}"
@@ -719,6 +736,7 @@ class FeatureDeltaFetcher:
         self.diff_writer = diff_writer
         self.ds_path = ds_path
         self.buffered_deltas = []
+        self._notified_fetch = False
 
     def ensure_delta_is_ready_or_start_fetch(self, key, delta):
         """
@@ -740,31 +758,68 @@ class FeatureDeltaFetcher:
             self._start_fetch(delta.new)
         return False
 
+    def wait_until_delta_is_ready(self, key, delta):
+        """
+        If the delta is locally available, simply returns. Otherwise, blocks until it has been fetched - along with
+        every other blob that has been requested so far, such as by prefetch_deltas.
+        """
+        old_value_ready = self._is_delta_value_ready(delta.old)
+        new_value_ready = self._is_delta_value_ready(delta.new)
+        if old_value_ready and new_value_ready:
+            return
+
+        if not old_value_ready:
+            self._start_fetch(delta.old)
+        if not new_value_ready:
+            self._start_fetch(delta.new)
+        self._finish_fetch()
+
     @property
-    def fetch_process(self):
-        if not hasattr(self, "_fetch_process"):
-            self._fetch_process = FetchPromisedBlobsProcess(self.diff_writer.repo)
-        return self._fetch_process
+    def prefetch(self):
+        if not hasattr(self, "_prefetch"):
+            self._prefetch = PromisedBlobsPrefetch(self.diff_writer.repo)
+        return self._prefetch
+
+    def prefetch_deltas(self, deltas):
+        """
+        Starts fetching all the promised blobs needed by the given deltas at once, without loading any of them.
+        The blobs are fetched in the background, so the deltas that are available immediately can be output meanwhile.
+        """
+        blobs = (
+            kv.value.args[0]
+            for delta in deltas
+            for kv in (delta.old, delta.new)
+            if kv is not None and isinstance(kv.value, functools.partial)
+        )
+        for blob_id in promised_blob_ids(self.diff_writer.repo, blobs):
+            self.prefetch.fetch(blob_id)
+        if hasattr(self, "_prefetch"):
+            self._prefetch.start()
 
     def _start_fetch(self, delta_key_value):
         blob = delta_key_value.value.args[0]
-        self.fetch_process.fetch(blob.id.hex)
+        self.prefetch.fetch(blob.id.hex)
 
     def finish_fetching_deltas(self):
         """Blocks until all the deltas that were requested finish fetching, then yields them all."""
 
-        if not hasattr(self, "_fetch_process"):
+        if not hasattr(self, "_prefetch"):
             # We didn't start fetching any features - nothing to do here.
             return
 
+        self._finish_fetch()
+        yield from self.buffered_deltas
+
+    def _finish_fetch(self):
         # Notify the user about the fetch at this point since this is the point at which the diff
         # output will stop until the fetch completes.
-        click.echo(
-            f"Fetching missing but required features in {self.ds_path}", err=True
-        )
+        if not self._notified_fetch:
+            click.echo(
+                f"Fetching missing but required features in {self.ds_path}", err=True
+            )
+            self._notified_fetch = True
 
-        self._fetch_process.finish()
-        yield from self.buffered_deltas
+        self.prefetch.finish()
 
     def _is_delta_value_ready(self, delta_key_value):
         if delta_key_value is None:
@@ -802,6 +857,17 @@ class NullDeltaFetcher:
             f"Dataset {self.ds_path} has missing+promised blobs - this is not expected for a {self.ds_type} dataset"
         )
 
+    def wait_until_delta_is_ready(self, key, delta):
+        """
+        If the delta is locally available, simply returns.
+        If the delta is not locally available, raises an error.
+        """
+        self.ensure_delta_is_ready_or_start_fetch(key, delta)
+
+    def prefetch_deltas(self, deltas):
+        # Nothing to do here.
+        pass
+
     def finish_fetching_deltas(self):
         # Nothing to do here.
         yield from ()
@@ -6,7 +6,7 @@ from kart.byod.importer import ByodTileImporter
 from kart.cli_util import StringFromFile, MutexOption, KartCommand
 from kart.point_cloud.import_ import PointCloudImporter
 from kart.point_cloud.metadata_util import extract_pc_tile_metadata
-from kart.s3_util import get_hash_and_size_of_s3_object, fetch_from_s3
+from kart.s3_util import get_hash_and_size_of_s3_object
 
 
 L = logging.getLogger(__name__)
@@ -123,11 +123,5 @@ def byod_point_cloud_import(
 class ByodPointCloudImporter(ByodTileImporter, PointCloudImporter):
     def extract_tile_metadata(self, tile_location):
         oid_and_size = get_hash_and_size_of_s3_object(tile_location)
-        # TODO - download only certain ranges of the file, and extract metadata from those.
-        tmp_downloaded_tile = fetch_from_s3(tile_location)
-        result = extract_pc_tile_metadata(
-            tmp_downloaded_tile, oid_and_size=oid_and_size
-        )
-        tmp_downloaded_tile.unlink()
-        result["tile"]["url"] = tile_location
-        return result
+        # Only the header and VLRs of the tile are fetched from S3, unless the tile has to be read using PDAL.
+        return extract_pc_tile_metadata(tile_location, oid_and_size=oid_and_size)
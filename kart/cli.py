@@ -51,6 +51,7 @@ MODULE_COMMANDS = {
     "status": {"status"},
     "upgrade": {"upgrade"},
     "tabular.import_": {"table-import"},
+    "tabular.export": {"export"},
     "point_cloud.import_": {"point-cloud-import"},
     "install": {"install"},
     "add_dataset": {"add-dataset"},
@@ -1,3 +1,7 @@
+import functools
+import hashlib
+import threading
+
 from osgeo import osr
 
 from .cli_util import StringFromFile
@@ -14,15 +18,32 @@ from .wkt_lexer import (
 )
 
 
+# Parsing a CRS definition, and setting up a transformation between two CRSs, both involve PROJ database lookups -
+# these are slow compared to anything else done with a CRS, and the same few CRSs are used over and over again.
+# So parsed CRSs and transformations are memoised - see make_crs and make_transform.
+CRS_CACHE_SIZE = 256
+TRANSFORM_CACHE_SIZE = 256
+
+_crs_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=CRS_CACHE_SIZE)
+def _parse_crs(crs_text):
+    crs = osr.SpatialReference()
+    crs.SetFromUserInput(crs_text)
+    return crs
+
+
 def make_crs(crs_text, context=None):
     """
     Creates an OGR SpatialReference object from the given string.
     Accepted input is very flexible.
     see https://gdal.org/api/ogrspatialref.html#classOGRSpatialReference_1aec3c6a49533fe457ddc763d699ff8796
+    Each call returns a new SpatialReference, which the caller is free to modify - but the string is only parsed once.
     """
     try:
-        crs = osr.SpatialReference()
-        crs.SetFromUserInput(crs_text)
+        with _crs_cache_lock:
+            crs = _parse_crs(crs_text).Clone()
         crs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
         return crs
     except RuntimeError as e:
@@ -32,6 +53,44 @@ def make_crs(crs_text, context=None):
         raise CrsError(f"Invalid or unknown {crs_desc}: {crs_text!r} ({e})")
 
 
+class _TransformCache(threading.local):
+    # CoordinateTransformations shouldn't be used by more than one thread at once, so each thread has its own.
+    def __init__(self):
+        self.transforms = {}
+
+
+_transform_cache = _TransformCache()
+
+
+def _crs_key(crs):
+    wkt = crs.ExportToWkt(["FORMAT=WKT2_2019"])
+    return (
+        hashlib.sha256(wkt.encode("utf-8")).digest(),
+        tuple(crs.GetDataAxisToSRSAxisMapping()),
+    )
+
+
+def make_transform(src_crs, dest_crs):
+    """
+    Returns an osr.CoordinateTransformation from src_crs to dest_crs - both OGR SpatialReferences.
+    Transformations are memoised, keyed by the normalised WKT and the axis order of both CRSs - so a transformation
+    is only set up once per thread, however many times it is asked for. The result is shared and must not be modified.
+    Raises RuntimeError if no transformation can be found.
+    """
+    key = (_crs_key(src_crs), _crs_key(dest_crs))
+    transforms = _transform_cache.transforms
+    transform = transforms.pop(key, None)
+    if transform is None:
+        transform = osr.CoordinateTransformation(src_crs, dest_crs)
+        if transform is None:
+            raise RuntimeError("Couldn't create coordinate transformation")
+        if len(transforms) >= TRANSFORM_CACHE_SIZE:
+            # Forget the least recently used transformation.
+            del transforms[next(iter(transforms))]
+    transforms[key] = transform
+    return transform
+
+
 class CoordinateReferenceString(StringFromFile):
     """
     Click option to specify a CRS.
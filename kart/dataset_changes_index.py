@@ -0,0 +1,201 @@
+import contextlib
+import logging
+
+import pygit2
+from pysqlite3 import dbapi2 as sqlite
+from sqlalchemy import Column, Table, Text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.types import BLOB
+
+from kart.repo import KartRepoFiles
+from kart.sqlalchemy import TableSet
+from kart.sqlalchemy.sqlite import sqlite_db
+from kart.structure import DATASET_DIRNAME_PATTERN
+
+# An index of which datasets were changed by each commit, so that `kart log --dataset-changes` doesn't have to compare
+# every commit to its parent each time it is run. Commits are immutable, so once a commit is indexed its entry never
+# goes stale - the index is filled in incrementally as commits are logged.
+
+L = logging.getLogger(__name__)
+
+# How many newly indexed commits to hold in memory before writing them to the index.
+FLUSH_EVERY = 1000
+
+
+class DatasetChangesIndexTables(TableSet):
+    """Tables for indexing which datasets were changed by each commit."""
+
+    def __init__(self):
+        super().__init__()
+
+        # "indexed_commits" records every commit for which commit_dataset_changes has been populated -
+        # including commits that didn't change any datasets.
+        self.indexed_commits = Table(
+            "indexed_commits",
+            self.sqlalchemy_metadata,
+            # The commit ID (the SHA-1 hash), in binary (20 bytes).
+            Column("commit_id", BLOB, nullable=False, primary_key=True),
+            sqlite_with_rowid=False,
+        )
+
+        # "commit_dataset_changes" has a row for every dataset changed by every indexed commit, compared to the
+        # commit's first parent (or compared to nothing, for a root commit).
+        self.commit_dataset_changes = Table(
+            "commit_dataset_changes",
+            self.sqlalchemy_metadata,
+            Column("commit_id", BLOB, nullable=False, primary_key=True),
+            Column("ds_path", Text, nullable=False, primary_key=True),
+            # The tree ID of the dataset at this commit, in binary - or null if this commit deleted the dataset.
+            Column("tree_id", BLOB, nullable=True),
+            sqlite_with_rowid=False,
+        )
+
+
+DatasetChangesIndexTables.copy_tables_to_class()
+
+
+def dataset_changes_index_db(repo):
+    """Context manager giving a connection to the dataset-changes index of the given repo - commits on success."""
+    return sqlite_db(
+        DatasetChangesIndexTables, str(repo.gitdir_file(KartRepoFiles.DATASET_CHANGES))
+    )
+
+
+class DatasetChangesIndex:
+    """
+    Finds which datasets were changed by each commit, using the dataset-changes index where possible, and
+    adding any commits that are missing from the index. Use as a context manager, so that newly indexed commits
+    are written to the index when done. If the index can't be read or written, works just the same, but slower.
+    """
+
+    def __init__(self, repo):
+        self.repo = repo
+        self._db = None
+        self._exit_stack = None
+        self._pending = {}
+
+    def __enter__(self):
+        self._exit_stack = contextlib.ExitStack()
+        try:
+            self._db = self._exit_stack.enter_context(
+                dataset_changes_index_db(self.repo)
+            )
+        except (sqlite.Error, SQLAlchemyError) as e:
+            L.info("Couldn't open the dataset-changes index: %s", e)
+            self._db = None
+        return self
+
+    def __exit__(self, *exc_info):
+        self._flush()
+        self._db = None
+        try:
+            self._exit_stack.__exit__(*exc_info)
+        except sqlite.Error as e:
+            L.info("Couldn't update the dataset-changes index: %s", e)
+
+    def get_dataset_changes(self, commit):
+        """Given a commit, returns a sorted list of the paths of the datasets changed by that commit."""
+        changes = self._pending.get(commit.id.raw)
+        if changes is None:
+            changes = self._read_index(commit)
+        if changes is None:
+            changes = self._find_dataset_changes(commit)
+        return sorted(changes)
+
+    def _read_index(self, commit):
+        if self._db is None:
+            return None
+        commit_id = commit.id.raw
+        try:
+            is_indexed = self._db.execute(
+                "SELECT 1 FROM indexed_commits WHERE commit_id = ?;", (commit_id,)
+            ).fetchone()
+            if not is_indexed:
+                return None
+            return {
+                row[0]: row[1]
+                for row in self._db.execute(
+                    "SELECT ds_path, tree_id FROM commit_dataset_changes WHERE commit_id = ?;",
+                    (commit_id,),
+                )
+            }
+        except sqlite.Error as e:
+            L.info("Couldn't read the dataset-changes index: %s", e)
+            self._db = None
+            return None
+
+    def _find_dataset_changes(self, commit):
+        """Returns {ds_path: tree_id} for every dataset changed by this commit. Deleted datasets have a tree_id of None."""
+        try:
+            parents = commit.parents
+        except KeyError:
+            # Shallow clone - the parent isn't present. Don't index this answer, since it's not the whole story.
+            return dict(_iter_changed_datasets(None, commit.tree))
+
+        old_tree = parents[0].tree if parents else None
+        changes = dict(_iter_changed_datasets(old_tree, commit.tree))
+        self._pending[commit.id.raw] = changes
+        if len(self._pending) >= FLUSH_EVERY:
+            self._flush()
+        return changes
+
+    def _flush(self):
+        if self._db is None or not self._pending:
+            self._pending.clear()
+            return
+        try:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO commit_dataset_changes (commit_id, ds_path, tree_id) VALUES (?, ?, ?);",
+                (
+                    (commit_id, ds_path, tree_id)
+                    for commit_id, changes in self._pending.items()
+                    for ds_path, tree_id in changes.items()
+                ),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO indexed_commits (commit_id) VALUES (?);",
+                ((commit_id,) for commit_id in self._pending),
+            )
+            self._db.commit()
+        except sqlite.Error as e:
+            L.info("Couldn't update the dataset-changes index: %s", e)
+            self._db = None
+        self._pending.clear()
+
+
+def _iter_changed_datasets(old_tree, new_tree, path=""):
+    """
+    Yields (ds_path, tree_id) for every dataset that is different in new_tree compared to old_tree - where tree_id
+    is the ID of the dataset's tree in new_tree, or None if the dataset is not in new_tree. Either tree can be None.
+    Subtrees that are the same in both trees are skipped, so this is proportional to the size of the change.
+    """
+    old_children = _non_hidden_subtrees(old_tree)
+    new_children = _non_hidden_subtrees(new_tree)
+    for name in sorted(old_children.keys() | new_children.keys()):
+        old_child = old_children.get(name)
+        new_child = new_children.get(name)
+        if old_child is not None and new_child is not None:
+            if old_child.id == new_child.id:
+                continue
+        child_path = f"{path}/{name}" if path else name
+        new_is_dataset = _is_dataset_tree(new_child)
+        if new_is_dataset or _is_dataset_tree(old_child):
+            yield child_path, new_child.id.raw if new_is_dataset else None
+        yield from _iter_changed_datasets(old_child, new_child, child_path)
+
+
+def _non_hidden_subtrees(tree):
+    if tree is None:
+        return {}
+    return {
+        entry.name: entry
+        for entry in tree
+        if entry.type == pygit2.GIT_OBJ_TREE and not entry.name.startswith(".")
+    }
+
+
+def _is_dataset_tree(tree):
+    # Same as the test used by kart.structure.Datasets to find datasets.
+    return tree is not None and any(
+        DATASET_DIRNAME_PATTERN.fullmatch(entry.name) for entry in tree
+    )
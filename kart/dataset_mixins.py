@@ -1,6 +1,6 @@
 import pygit2
 
-from kart.diff_structs import DatasetDiff, DeltaDiff, Delta
+from kart.diff_structs import DatasetDiff, DeltaDiff, Delta, StreamingDeltaDiff
 from kart.diff_format import DiffFormat
 from kart.key_filters import DatasetKeyFilter, MetaKeyFilter, UserStringKeyFilter
 
@@ -116,10 +116,66 @@ class DatasetDiffMixin:
         # TODO - if the key-filter is very restrictive (ie it has only a few items in) then
         # it would be more efficient if we first search for those items and diff only those.
 
-        subtree_name = subtree_name.rstrip("/")
-        raw_diff = self.get_raw_diff_for_subtree(other, subtree_name, reverse=reverse)
+        raw_diff = self.get_raw_diff_for_subtree(
+            other, subtree_name.rstrip("/"), reverse=reverse
+        )
         # NOTE - we could potentially call diff.find_similar() to detect renames here,
 
+        yield from self.transform_raw_deltas(
+            raw_diff.deltas,
+            key_filter,
+            **self._subtree_delta_transforms(
+                other, subtree_name, key_decoder_method, value_decoder_method, reverse
+            ),
+        )
+
+    def diff_subtree_as_stream(
+        self,
+        other,
+        subtree_name,
+        key_filter=UserStringKeyFilter.MATCH_ALL,
+        *,
+        key_decoder_method,
+        value_decoder_method,
+        reverse=False,
+        sort_buffer_size=None,
+    ):
+        """
+        Like diff_subtree, but returns a StreamingDeltaDiff rather than yielding deltas - so that diffs with a very
+        large number of deltas can be output without ever holding every delta in memory at once. Only the pygit2.Diff
+        is kept, and deltas are created from it whenever they are iterated over.
+        See StreamingDeltaDiff for more details, including the meaning of sort_buffer_size.
+        """
+        raw_diff = None
+
+        def iter_raw_records():
+            nonlocal raw_diff
+            if raw_diff is None:
+                raw_diff = self.get_raw_diff_for_subtree(
+                    other, subtree_name.rstrip("/"), reverse=reverse
+                )
+            for d in raw_diff.deltas:
+                yield d.status, d.old_file.path, d.new_file.path
+
+        transforms = self._subtree_delta_transforms(
+            other, subtree_name, key_decoder_method, value_decoder_method, reverse
+        )
+
+        def delta_from_raw_record(record):
+            status, old_raw_path, new_raw_path = record
+            return self.transform_raw_delta(
+                status, old_raw_path, new_raw_path, key_filter, **transforms
+            )
+
+        return StreamingDeltaDiff(
+            iter_raw_records, delta_from_raw_record, sort_buffer_size=sort_buffer_size
+        )
+
+    def _subtree_delta_transforms(
+        self, other, subtree_name, key_decoder_method, value_decoder_method, reverse
+    ):
+        subtree_name = subtree_name.rstrip("/")
+
         if reverse:
             old, new = other, self
         else:
@@ -138,9 +194,7 @@ class DatasetDiffMixin:
 
         path_decoder = lambda path: f"{subtree_name}/{path}"
 
-        yield from self.transform_raw_deltas(
-            raw_diff.deltas,
-            key_filter,
+        return dict(
             old_path_transform=path_decoder,
             old_key_transform=get_decoder(old, key_decoder_method),
             old_value_transform=get_decoder(old, value_decoder_method),
@@ -196,42 +250,78 @@ class DatasetDiffMixin:
                 # We don't enounter these status codes in the diffs we generate.
                 raise NotImplementedError(f"Delta status: {d.status_char()}")
 
-            if d.status in self._UPDATE_DELETE:
-                old_path = old_path_transform(d.old_file.path)
-                old_key = old_key_transform(old_path)
-            else:
-                old_key = None
-
-            if d.status in self._INSERT_UPDATE:
-                new_path = new_path_transform(d.new_file.path)
-                new_key = new_key_transform(d.new_file.path)
-            else:
-                new_key = None
-
-            if old_key not in key_filter and new_key not in key_filter:
-                continue
-
-            if d.status in self._INSERT_TYPES:
-                self.L.debug("diff(): insert %s (%s)", new_path, new_key)
-            elif d.status in self._UPDATE_TYPES:
-                self.L.debug(
-                    "diff(): update %s %s -> %s %s",
-                    old_path,
-                    old_key,
-                    new_path,
-                    new_key,
-                )
-            elif d.status in self._DELETE_TYPES:
-                self.L.debug("diff(): delete %s %s", old_path, old_key)
+            delta = self.transform_raw_delta(
+                d.status,
+                d.old_file.path,
+                d.new_file.path,
+                key_filter,
+                old_path_transform=old_path_transform,
+                old_key_transform=old_key_transform,
+                old_value_transform=old_value_transform,
+                new_path_transform=new_path_transform,
+                new_key_transform=new_key_transform,
+                new_value_transform=new_value_transform,
+            )
+            if delta is not None:
+                yield delta
 
-            if d.status in self._UPDATE_DELETE:
-                old_half_delta = old_key, old_value_transform(old_path)
-            else:
-                old_half_delta = None
+    def transform_raw_delta(
+        self,
+        status,
+        old_raw_path,
+        new_raw_path,
+        key_filter=UserStringKeyFilter.MATCH_ALL,
+        *,
+        old_path_transform=lambda x: x,
+        old_key_transform=lambda x: x,
+        old_value_transform=lambda x: x,
+        new_path_transform=lambda x: x,
+        new_key_transform=lambda x: x,
+        new_value_transform=lambda x: x,
+    ):
+        """
+        Transforms a single raw delta - given as its pygit2 status and its old and new paths - into a Kart delta,
+        as described in transform_raw_deltas. Returns None if the delta doesn't match the key filter.
+        """
+        if status not in self._INSERT_UPDATE_DELETE:
+            raise NotImplementedError(f"Delta status: {status}")
+
+        if status in self._UPDATE_DELETE:
+            old_path = old_path_transform(old_raw_path)
+            old_key = old_key_transform(old_path)
+        else:
+            old_key = None
+
+        if status in self._INSERT_UPDATE:
+            new_path = new_path_transform(new_raw_path)
+            new_key = new_key_transform(new_raw_path)
+        else:
+            new_key = None
 
-            if d.status in self._INSERT_UPDATE:
-                new_half_delta = new_key, new_value_transform(new_path)
-            else:
-                new_half_delta = None
+        if old_key not in key_filter and new_key not in key_filter:
+            return None
+
+        if status in self._INSERT_TYPES:
+            self.L.debug("diff(): insert %s (%s)", new_path, new_key)
+        elif status in self._UPDATE_TYPES:
+            self.L.debug(
+                "diff(): update %s %s -> %s %s",
+                old_path,
+                old_key,
+                new_path,
+                new_key,
+            )
+        elif status in self._DELETE_TYPES:
+            self.L.debug("diff(): delete %s %s", old_path, old_key)
+
+        if status in self._UPDATE_DELETE:
+            old_half_delta = old_key, old_value_transform(old_path)
+        else:
+            old_half_delta = None
+
+        if status in self._INSERT_UPDATE:
+            new_half_delta = new_key, new_value_transform(new_path)
+        else:
+            new_half_delta = None
 
-            yield Delta(old_half_delta, new_half_delta)
+        return Delta(old_half_delta, new_half_delta)
@@ -108,6 +108,41 @@ def estimate_diff_feature_counts(
         if annotation is not None:
             return annotation
 
+    dataset_change_counts = calculate_diff_feature_counts(
+        repo, base, target, include_wc_diff=include_wc_diff, accuracy=accuracy
+    )
+
+    if not include_wc_diff:
+        repo.diff_annotations.store(
+            base=base,
+            target=target,
+            annotation_type=annotation_type,
+            data=dataset_change_counts,
+        )
+
+    if terminate_estimate_thread.is_set():
+        raise ThreadTerminated()
+
+    return dataset_change_counts
+
+
+def calculate_diff_feature_counts(
+    repo,
+    base,
+    target,
+    *,
+    include_wc_diff=False,
+    accuracy,
+):
+    """
+    Like estimate_diff_feature_counts, but always calculates the feature counts -
+    never reads them from or stores them in the annotations database.
+    """
+    base = base.peel(pygit2.Tree)
+    target = target.peel(pygit2.Tree)
+    if base == target and not include_wc_diff:
+        return {}
+
     base_rs = repo.structure(base)
     target_rs = repo.structure(target)
 
@@ -170,15 +205,4 @@ def estimate_diff_feature_counts(
         if ds_total:
             dataset_change_counts[dataset_path] = ds_total
 
-    if not include_wc_diff:
-        repo.diff_annotations.store(
-            base=base,
-            target=target,
-            annotation_type=annotation_type,
-            data=dataset_change_counts,
-        )
-
-    if terminate_estimate_thread.is_set():
-        raise ThreadTerminated()
-
     return dataset_change_counts
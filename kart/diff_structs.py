@@ -1,5 +1,10 @@
 from collections import UserDict
+import contextlib
 from dataclasses import dataclass
+import heapq
+from numbers import Number
+import pickle
+import tempfile
 from typing import Any
 
 from kart.diff_format import DiffFormat
@@ -353,12 +358,17 @@ class Diff(RichDict):
             result[key] = ~value
         return result
 
+    @property
+    def diff_type(self):
+        """The type of Diff this is, for the purposes of deciding whether two Diffs can be concatenated."""
+        return type(self)
+
     def __add__(self, other, result=None):
         """Concatenate this Diff to the subsequent Diff, by concatenating all children with matching keys."""
 
         # FIXME: this algorithm isn't perfect when renames are involved.
 
-        if type(self) != type(other):
+        if self.diff_type != getattr(other, "diff_type", type(other)):
             raise TypeError(f"Diff type mismatch: {type(self)} != {type(other)}")
 
         if result is None:
@@ -383,7 +393,7 @@ class Diff(RichDict):
         Slightly faster than __add__, modifies self in place.
         """
 
-        if type(self) != type(other):
+        if self.diff_type != getattr(other, "diff_type", type(other)):
             raise TypeError(f"Diff type mismatch: {type(self)} != {type(other)}")
 
         for key in other.keys():
@@ -438,9 +448,13 @@ class DeltaDiff(Diff):
             result.add_delta(~delta)
         return result
 
+    def iter_deltas(self):
+        """Yields every Delta in this DeltaDiff, in no particular order."""
+        return iter(self.values())
+
     def to_filter(self):
         result = set()
-        for delta in self.values():
+        for delta in self.iter_deltas():
             if delta.old is not None:
                 result.add(str(delta.old.key))
             if delta.new is not None:
@@ -449,7 +463,7 @@ class DeltaDiff(Diff):
 
     def type_counts(self):
         result = {}
-        for delta in self.values():
+        for delta in self.iter_deltas():
             delta_type = delta.type
             result.setdefault(delta_type, 0)
             result[delta_type] += 1
@@ -476,28 +490,169 @@ class DeltaDiff(Diff):
             result.add_delta(delta)
         return result
 
-    def sorted_items(self):
-        from numbers import Number
-
-        inf = float("inf")
-
-        def key(item):
-            k, v = item
-            if k is None:
-                return (-inf, "")
-            elif isinstance(k, Number):
-                return (k, "")
-            elif isinstance(k, str):
-                return (inf, k)
-            else:
-                return (inf, str(k))
+    @staticmethod
+    def sort_key(key):
+        """
+        The key used to sort deltas by their key: None first, then numbers in numeric order, then everything else
+        in string order.
+        """
+        if key is None:
+            return (-_INF, "")
+        elif isinstance(key, Number):
+            return (key, "")
+        elif isinstance(key, str):
+            return (_INF, key)
+        else:
+            return (_INF, str(key))
 
-        return sorted(self.items(), key=key)
+    def sorted_items(self):
+        return sorted(self.items(), key=lambda item: self.sort_key(item[0]))
 
     def recursive_len(self, max_depth=None):
         return len(self)
 
 
+_INF = float("inf")
+
+
+class StreamingDeltaDiff(DeltaDiff):
+    """
+    A DeltaDiff that doesn't keep all of its Deltas in memory at once - Deltas are created from a source of compact,
+    picklable "raw records" as they are iterated over. For a feature diff, the raw records come straight from the
+    tree diff, so iter_deltas() yields Deltas in path-encoder order.
+
+    sorted_items() does an external merge sort: at most sort_buffer_size raw records are kept in memory at once,
+    and the rest are spilled to temporary files in sorted runs, which are then merged as the Deltas are yielded.
+
+    Anything else that needs the contents as a dict - getting or setting items, inverting, etc - loads every Delta
+    into memory first, after which this behaves just like a regular DeltaDiff.
+
+    iter_raw_records - a callable that returns an iterator of raw records, in the order they should be streamed.
+        It is called each time the raw records are needed, so should be cheap to call more than once.
+    delta_from_raw_record - a callable that turns a raw record into a Delta, or into None if it should be skipped.
+    """
+
+    DEFAULT_SORT_BUFFER_SIZE = 100_000
+
+    def __init__(
+        self,
+        iter_raw_records=None,
+        delta_from_raw_record=None,
+        *,
+        sort_buffer_size=None,
+    ):
+        super().__init__()
+        self._iter_raw_records = iter_raw_records
+        self._delta_from_raw_record = delta_from_raw_record
+        self.sort_buffer_size = sort_buffer_size or self.DEFAULT_SORT_BUFFER_SIZE
+        self._data = None if iter_raw_records is not None else {}
+        # The number of Deltas, once they have been counted without loading them.
+        self._len = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = {delta.key: delta for delta in self.iter_deltas()}
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+
+    @property
+    def is_loaded(self):
+        """True if every Delta has been loaded into memory."""
+        return self._data is not None
+
+    @property
+    def diff_type(self):
+        return DeltaDiff
+
+    def empty_copy(self):
+        return DeltaDiff()
+
+    def __eq__(self, other):
+        return isinstance(other, DeltaDiff) and self.data == other.data
+
+    def __bool__(self):
+        if self.is_loaded:
+            return bool(self._data)
+        if self._len is not None:
+            return self._len > 0
+        # Stops at the first Delta - no need to count them all.
+        if next(self.iter_deltas(), None) is None:
+            self._len = 0
+            return False
+        return True
+
+    def __len__(self):
+        if self.is_loaded:
+            return len(self._data)
+        if self._len is None:
+            self._len = sum(1 for delta in self.iter_deltas())
+        return self._len
+
+    def prune(self, recurse=True):
+        # A DeltaDiff contains only Deltas, so there is nothing to prune - no need to load them all to find that out.
+        pass
+
+    def _iter_records_and_deltas(self):
+        for record in self._iter_raw_records():
+            delta = self._delta_from_raw_record(record)
+            if delta is not None:
+                yield record, delta
+
+    def iter_deltas(self):
+        if self.is_loaded:
+            return iter(self._data.values())
+        return (delta for record, delta in self._iter_records_and_deltas())
+
+    def sorted_items(self):
+        if self.is_loaded:
+            return super().sorted_items()
+        return self._externally_sorted_items()
+
+    def _externally_sorted_items(self):
+        with contextlib.ExitStack() as stack:
+            runs = []
+            buffer = []
+            for seq, (record, delta) in enumerate(self._iter_records_and_deltas()):
+                buffer.append((self.sort_key(delta.key), seq, record))
+                if len(buffer) >= self.sort_buffer_size:
+                    runs.append(stack.enter_context(_spill_sorted_run(buffer)))
+                    buffer = []
+            buffer.sort()
+
+            if runs:
+                sorted_entries = heapq.merge(
+                    buffer, *(_read_sorted_run(run) for run in runs)
+                )
+            else:
+                sorted_entries = buffer
+
+            for sort_key, seq, record in sorted_entries:
+                delta = self._delta_from_raw_record(record)
+                yield delta.key, delta
+
+
+def _spill_sorted_run(entries):
+    """Sorts the given entries and writes them to a temporary file, which is returned - rewound, ready for reading."""
+    entries.sort()
+    run = tempfile.TemporaryFile()
+    for entry in entries:
+        pickle.dump(entry, run, protocol=pickle.HIGHEST_PROTOCOL)
+    run.seek(0)
+    return run
+
+
+def _read_sorted_run(run):
+    while True:
+        try:
+            yield pickle.load(run)
+        except EOFError:
+            return
+
+
 class DatasetDiff(Diff):
     """A DatasetDiff contains up to two DeltaDiffs, at keys "meta" or "feature"."""
 
@@ -14,6 +14,7 @@ from kart.tabular.version import (
     dataset_class_for_version,
     extra_blobs_for_version,
 )
+from kart.tabular.import_cache import ImportCache, ImportCacheError
 from kart.tabular.import_source import TableImportSource
 from kart.tabular.pk_generation import PkGeneratingTableImportSource
 from kart.timestamps import minutes_to_tz_offset
@@ -161,17 +162,21 @@ def git_fast_import(repo, *args):
         )
 
 
-def fast_import_clear_tree(*, proc, replace_ids, replacing_dataset, source):
+def fast_import_clear_tree(
+    *, proc, replace_ids, replacing_dataset, source, keep_features=False
+):
     """
     Clears out the appropriate trees in each of the fast_import processes,
     before importing any actual data over the top.
+    If keep_features is True, the existing features are left in place, even though replace_ids is None -
+    the caller will write only those features that have changed, and delete those that no longer exist.
     """
     if replacing_dataset is None:
         # nothing to do
         return
     dest_path = source.dest_path
     dest_inner_path = f"{dest_path}/{replacing_dataset.DATASET_DIRNAME}"
-    if replace_ids is None:
+    if replace_ids is None and not keep_features:
         # Delete the existing dataset, before we re-import it.
         proc.stdin.write(f"D {source.dest_path}\n".encode("utf8"))
     else:
@@ -274,6 +279,17 @@ def fast_import_tables(
     if verbosity >= 1:
         click.echo("Starting git-fast-import...")
 
+    # Re-imports remember a hash of every source row, so that next time only the changed rows need to be imported.
+    # Not used when only some features are being imported, or by kart upgrade (which supplies the header).
+    use_import_cache = (
+        replace_existing == ReplaceExisting.GIVEN
+        and replace_ids is None
+        and limit is None
+        and header is None
+    )
+
+    import_cache = ImportCache(repo) if use_import_cache else None
+
     try:
         import_ref = None
         if header is None:
@@ -304,12 +320,16 @@ def fast_import_tables(
                     replace_ids,
                     limit,
                     verbosity,
+                    import_cache,
                 )
 
         if import_ref is not None:
             # we created a temp branch for the import above.
             # now we need to reset the head branch to the temp branch tip.
             new_tree = repo.revparse_single(import_ref).peel(pygit2.Tree)
+            if import_cache is not None:
+                # Even if there are no changes, the cache now describes new_tree (which is the same as from_tree).
+                import_cache.commit(new_tree)
             if not allow_empty:
                 if new_tree == from_tree:
                     raise NotFound("No changes to commit", exit_code=NO_CHANGES)
@@ -328,6 +348,8 @@ def fast_import_tables(
         # remove the import branches
         if import_ref is not None and import_ref in repo.references:
             repo.references.delete(import_ref)
+        if import_cache is not None:
+            import_cache.close()
 
 
 def _import_single_source(
@@ -339,6 +361,7 @@ def _import_single_source(
     replace_ids,
     limit,
     verbosity,
+    import_cache=None,
 ):
     """
     repo - the Kart repo to import into.
@@ -352,8 +375,12 @@ def _import_single_source(
         0: no progress information is printed to stdout.
         1: basic status information
         2: full output of `git-fast-import --stats ...`
+    import_cache - an ImportCache, or None. If supplied, only source rows that have changed since the last import
+        are written, if possible - and the rows of this import are recorded for next time.
     """
     replacing_dataset = None
+    use_import_cache = import_cache is not None and import_cache.can_cache(source)
+    incremental = False
     if replace_existing == ReplaceExisting.GIVEN:
         try:
             replacing_dataset = repo.datasets(refish=from_commit)[source.dest_path]
@@ -361,11 +388,15 @@ def _import_single_source(
             # no such dataset; no problem
             replacing_dataset = None
 
+        incremental = use_import_cache and import_cache.is_up_to_date(
+            source, replacing_dataset
+        )
         fast_import_clear_tree(
             proc=proc,
             replace_ids=replace_ids,
             replacing_dataset=replacing_dataset,
             source=source,
+            keep_features=incremental,
         )
 
     dataset_class = dataset_class_for_version(repo.table_dataset_version)
@@ -404,6 +435,14 @@ def _import_single_source(
         else:
             id_iterator = None
             src_iterator = source.features()
+            if use_import_cache:
+                src_iterator = import_cache.changed_features(
+                    source, dataset, src_iterator, incremental
+                )
+                if incremental and verbosity >= 1:
+                    click.echo(
+                        f"Only importing features changed since the last import to {source.dest_path}/"
+                    )
 
         progress_every = None
         if verbosity >= 1:
@@ -419,7 +458,7 @@ def _import_single_source(
                 dataset, id_iterator
             )
 
-        elif should_compare_imported_features_against_old_features(
+        elif not incremental and should_compare_imported_features_against_old_features(
             repo,
             source,
             replacing_dataset,
@@ -436,18 +475,42 @@ def _import_single_source(
                 repo, src_iterator, source
             )
 
-        for i, (feature_path, blob_data) in enumerate(feature_blob_iter):
-            if feature_blobs_already_written:
-                copy_existing_blob_to_stream(proc.stdin, feature_path, blob_data)
-            else:
-                write_blob_to_stream(proc.stdin, feature_path, blob_data)
+        def _write_feature_blobs(feature_blob_iter):
+            for i, (feature_path, blob_data) in enumerate(feature_blob_iter):
+                if feature_blobs_already_written:
+                    copy_existing_blob_to_stream(proc.stdin, feature_path, blob_data)
+                else:
+                    write_blob_to_stream(proc.stdin, feature_path, blob_data)
+
+                if i and progress_every and i % progress_every == 0:
+                    click.echo(f"  {i:,d} features... @{time.monotonic()-t1:.1f}s")
 
-            if i and progress_every and i % progress_every == 0:
-                click.echo(f"  {i:,d} features... @{time.monotonic()-t1:.1f}s")
+                if limit is not None and i == (limit - 1):
+                    click.secho(f"  Stopping at {limit:,d} features", fg="yellow")
+                    break
 
-            if limit is not None and i == (limit - 1):
-                click.secho(f"  Stopping at {limit:,d} features", fg="yellow")
-                break
+        try:
+            _write_feature_blobs(feature_blob_iter)
+
+            if incremental:
+                # Features that weren't in the source this time have been deleted since the last import.
+                for pk in import_cache.deleted_pks(source):
+                    path = dataset.encode_1pk_to_path(pk)
+                    proc.stdin.write(f"D {path}\n".encode("utf8"))
+        except ImportCacheError:
+            # We no longer know which features have changed - so delete them all, and import every feature instead.
+            if verbosity >= 1:
+                click.echo(
+                    f"Couldn't use the import cache - importing all features to {source.dest_path}/"
+                )
+            feature_tree_path = ImportCache.feature_tree_path(dataset)
+            proc.stdin.write(f"D {feature_tree_path}\n".encode("utf8"))
+            src_iterator = import_cache.changed_features(
+                source, dataset, source.features(), incremental=False
+            )
+            _write_feature_blobs(
+                dataset.import_iter_feature_blobs(repo, src_iterator, source)
+            )
         t2 = time.monotonic()
         if verbosity >= 1:
             click.echo(f"Added {num_rows:,d} Features to index in {t2-t1:.1f}s")
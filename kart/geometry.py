@@ -202,7 +202,8 @@ class Geometry(bytes):
         Returns the envelope as a tuple of 4, 6, or 8 values, or None if no envelope is stored.
         The tuple ordering is (min-x, max-x, min-y, max-y, min-z?, max-z?, min-m?, max-m?) - ? values may be missing.
         If only_2d is True, then only (min-x, max-x, min-y, max-y) is returned, even if more values are present.
-        if calculate_if_missing is True then the entire geometry is loaded into OGR in order to calculate the envelope.
+        If calculate_if_missing is True and no envelope is stored, the envelope is calculated by scanning the WKB
+        directly - the geometry is only loaded into OGR as a fallback, for curved geometry types.
         """
         return geom_envelope(
             self, only_2d=only_2d, calculate_if_missing=calculate_if_missing
@@ -377,7 +378,7 @@ def gpkg_geom_to_hex_wkb(gpkg_geom):
     if wkb is None:
         return None
     else:
-        return binascii.hexlify(wkb).decode("ascii").upper()
+        return wkb_to_hex_wkb(wkb)
 
 
 def parse_gpkg_geom(gpkg_geom):
@@ -437,6 +438,13 @@ def wkb_to_gpkg_geom(wkb, **kwargs):
     if wkb is None:
         return None
 
+    if not kwargs:
+        try:
+            # Most WKB can be wrapped in a GPKG header as is, without loading it into OGR.
+            return _wkb_to_gpkg_geom_without_ogr(bytes(wkb))
+        except (ValueError, IndexError, struct.error):
+            pass
+
     ogr_geom = ogr.CreateGeometryFromWkb(wkb)
     return ogr_to_gpkg_geom(ogr_geom, **kwargs)
 
@@ -469,9 +477,13 @@ def hex_wkb_to_ogr(hex_wkb):
 WKB_POINT_EMPTY_LE = b"\x01\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\xF8\x7F\x00\x00\x00\x00\x00\x00\xF8\x7F"
 
 
+def wkb_to_hex_wkb(wkb):
+    return binascii.hexlify(wkb).decode("ascii").upper()
+
+
 def ogr_to_hex_wkb(ogr_geom):
     wkb = ogr_geom.ExportToIsoWkb(ogr.wkbNDR)
-    return binascii.hexlify(wkb).decode("ascii").upper()
+    return wkb_to_hex_wkb(wkb)
 
 
 def ogr_to_gpkg_geom(
@@ -532,6 +544,45 @@ def ogr_to_gpkg_geom(
     return Geometry(header + envelope + wkb)
 
 
+_GPKG_HEADER_LE = struct.Struct("<ccBBi")
+_GPKG_EMPTY_POINT = (
+    _GPKG_HEADER_LE.pack(b"G", b"P", 0, _GPKG_LE_BIT | _GPKG_EMPTY_BIT, 0)
+    + WKB_POINT_EMPTY_LE
+)
+
+
+def _wkb_to_gpkg_geom_without_ogr(wkb):
+    """
+    Wraps the given WKB in a GPKG header - with an envelope found by scanning its coordinates, if it needs one.
+    The result is exactly the same as ogr_to_gpkg_geom(ogr.CreateGeometryFromWkb(wkb)), but this only supports WKB
+    that OGR would write back out unchanged (see WkbScan.is_normalised) without any NaN coordinates - except for
+    POINT EMPTY. Raises ValueError for anything else.
+    """
+    if wkb == WKB_POINT_EMPTY_LE:
+        return Geometry(_GPKG_EMPTY_POINT)
+
+    scan = scan_wkb(wkb)
+    if scan.end != len(wkb):
+        raise ValueError("Unexpected data after WKB geometry")
+    if not scan.is_normalised or scan.has_nan:
+        raise ValueError("WKB would be changed by OGR")
+
+    bounds = scan.bounds
+    flags = _GPKG_LE_BIT
+    envelope = b""
+    if bounds[0] > bounds[1]:
+        flags |= _GPKG_EMPTY_BIT
+    elif scan.geometry_type == GeometryType.POINT:
+        pass
+    elif scan.has_z:
+        flags |= GPKG_ENVELOPE_XYZ << 1
+        envelope = struct.pack("<6d", *bounds)
+    else:
+        flags |= GPKG_ENVELOPE_XY << 1
+        envelope = struct.pack("<4d", *bounds[:4])
+    return Geometry(_GPKG_HEADER_LE.pack(b"G", b"P", 0, flags, 0) + envelope + wkb)
+
+
 def geojson_to_gpkg_geom(geojson, **kwargs):
     """Given a GEOJSON geometry, construct a GPKG geometry value."""
     if not isinstance(geojson, str):
@@ -684,6 +735,12 @@ def geom_envelope(gpkg_geom, only_2d=False, calculate_if_missing=False):
     if envelope_format == "":
         if not calculate_if_missing:
             return None
+        try:
+            # No envelope is stored (which is normal for points) - scan the WKB to find it.
+            return wkb_envelope(gpkg_geom, wkb_offset=8)
+        except (ValueError, IndexError, struct.error):
+            # Curved geometries, or WKB we can't scan - let OGR work it out.
+            pass
         ogr_geom = gpkg_geom_to_ogr(gpkg_geom)
         if ogr_geom.IsEmpty():
             # envelope is apparently (0, 0, 0, 0), thanks OGR :/
@@ -705,6 +762,178 @@ def geom_envelope(gpkg_geom, only_2d=False, calculate_if_missing=False):
         return envelope
 
 
+# WKB geometry types that are made of nothing but straight lines between points - so that their envelope is just
+# the envelope of their points. Curved geometry types are not included.
+_WKB_RING_ARRAY_TYPES = {
+    GeometryType.POLYGON,
+    17,  # Triangle
+}
+# The type of geometry that each type of collection contains - or None if it can contain any type.
+_WKB_COLLECTION_PART_TYPES = {
+    GeometryType.MULTIPOINT: GeometryType.POINT,
+    GeometryType.MULTILINESTRING: GeometryType.LINESTRING,
+    GeometryType.MULTIPOLYGON: GeometryType.POLYGON,
+    GeometryType.GEOMETRYCOLLECTION: None,
+    15: GeometryType.POLYGON,  # PolyhedralSurface
+    16: 17,  # TIN
+}
+
+# Flags used by EWKB (and by OGR's older WKB variant) to mark Z, M and embedded SRID.
+_EWKB_Z_BIT = 0x80000000
+_EWKB_M_BIT = 0x40000000
+_EWKB_SRID_BIT = 0x20000000
+
+
+class WkbScan:
+    """What scan_wkb found out about a WKB geometry by walking through it."""
+
+    def __init__(self, bounds=True, coord_arrays=False):
+        # (min-x, max-x, min-y, max-y, min-z, max-z) of every point, skipping NaN values (ie POINT EMPTY).
+        self.bounds = [math.inf, -math.inf] * 3 if bounds else None
+        # (offset, num_points, dims) of every non-empty array of points, in order.
+        self.coord_arrays = [] if coord_arrays else None
+        # The offset of the end of the geometry, and its flattened type and dimensions.
+        self.end = None
+        self.geometry_type = None
+        self.has_z = False
+        self.has_m = False
+        # Whether every part of the geometry is little-endian, and is ISO WKB rather than EWKB.
+        self.is_little_endian = True
+        self.is_iso = True
+        # Whether every part is one of the basic GeometryTypes, with the type and dimensions its parent requires.
+        self.is_uniform = True
+        # Whether any coordinates are NaN - only known if bounds are being scanned.
+        self.has_nan = False
+
+    @property
+    def is_normalised(self):
+        """
+        True if OGR would write this geometry back out exactly the same - as long as it has no NaN coordinates.
+        That is: little-endian ISO WKB of a uniform XY or XYZ geometry.
+        """
+        return (
+            self.is_little_endian and self.is_iso and self.is_uniform and not self.has_m
+        )
+
+
+def scan_wkb(buf, wkb_offset=0, bounds=True, coord_arrays=False):
+    """
+    Walks through the WKB geometry at the given offset in the given buffer without loading it into OGR, and returns
+    a WkbScan describing it. Supports ISO WKB, and EWKB flags for Z / M / SRID, in either byte order.
+    If bounds is True, every coordinate is read so as to find the bounds of the geometry.
+    If coord_arrays is True, the location of every array of points is recorded.
+
+    Raises ValueError for curved geometry types, since their bounds can't be found just by looking at their points.
+    """
+    scan = WkbScan(bounds=bounds, coord_arrays=coord_arrays)
+    scan.end, scan.geometry_type, scan.has_z, scan.has_m = _scan_wkb(
+        buf, wkb_offset, scan
+    )
+    return scan
+
+
+def wkb_envelope(buf, wkb_offset=0):
+    """
+    Finds the 2D envelope of the WKB geometry at the given offset in the given buffer, by scanning its coordinates -
+    without loading it into OGR. Supports ISO WKB, and EWKB flags for Z / M / SRID, in either byte order.
+
+    Returns a 4-tuple (minx, maxx, miny, maxy), or None if the geometry is empty. Raises ValueError for curved
+    geometry types, since their envelope can't be found just by looking at their points.
+    """
+    bounds = scan_wkb(buf, wkb_offset).bounds
+    if bounds[0] > bounds[1]:
+        return None
+    return tuple(bounds[:4])
+
+
+def _scan_wkb(buf, offset, scan, part_type=None, part_dims=None):
+    # Records what is found in the WKB geometry at offset in scan - returns the offset of the end of the geometry,
+    # its flattened type, and whether it has Z and M values.
+    # If part_type or part_dims are set, the geometry is not uniform unless it has that type or those dimensions.
+    if buf[offset] not in (0, 1):
+        raise ValueError("Invalid WKB byte order")
+    is_le = buf[offset] == 1
+    bo = "<" if is_le else ">"
+    (wkb_type,) = struct.unpack_from(f"{bo}I", buf, offset + 1)
+    offset += 5
+
+    has_z = bool(wkb_type & _EWKB_Z_BIT)
+    has_m = bool(wkb_type & _EWKB_M_BIT)
+    if wkb_type & (_EWKB_Z_BIT | _EWKB_M_BIT | _EWKB_SRID_BIT):
+        scan.is_iso = False
+    if wkb_type & _EWKB_SRID_BIT:
+        offset += 4
+    wkb_type &= 0x0FFFFFFF
+    # ISO WKB: 1000 for Z, 2000 for M, 3000 for ZM
+    iso_dims, geom_type = divmod(wkb_type, 1000)
+    if iso_dims > 3:
+        raise ValueError(f"Unsupported WKB geometry type: {wkb_type}")
+    has_z = has_z or iso_dims in (1, 3)
+    has_m = has_m or iso_dims in (2, 3)
+    dims = 2 + has_z + has_m
+
+    if not is_le:
+        scan.is_little_endian = False
+    if (
+        geom_type > GeometryType.GEOMETRYCOLLECTION
+        or (part_type is not None and geom_type != part_type)
+        or (part_dims is not None and (has_z, has_m) != part_dims)
+    ):
+        scan.is_uniform = False
+
+    if geom_type == GeometryType.POINT:
+        offset = _scan_points(buf, offset, 1, dims, has_z, bo, scan)
+    elif geom_type == GeometryType.LINESTRING:
+        (num_points,) = struct.unpack_from(f"{bo}I", buf, offset)
+        offset = _scan_points(buf, offset + 4, num_points, dims, has_z, bo, scan)
+    elif geom_type in _WKB_RING_ARRAY_TYPES:
+        (num_rings,) = struct.unpack_from(f"{bo}I", buf, offset)
+        offset += 4
+        for i in range(num_rings):
+            (num_points,) = struct.unpack_from(f"{bo}I", buf, offset)
+            offset = _scan_points(buf, offset + 4, num_points, dims, has_z, bo, scan)
+    elif geom_type in _WKB_COLLECTION_PART_TYPES:
+        child_type = _WKB_COLLECTION_PART_TYPES[geom_type]
+        (num_parts,) = struct.unpack_from(f"{bo}I", buf, offset)
+        offset += 4
+        for i in range(num_parts):
+            offset, _, _, _ = _scan_wkb(buf, offset, scan, child_type, (has_z, has_m))
+    else:
+        raise ValueError(f"Unsupported WKB geometry type: {wkb_type}")
+    return offset, geom_type, has_z, has_m
+
+
+def _scan_points(buf, offset, num_points, dims, has_z, bo, scan):
+    end = offset + 8 * dims * num_points
+    if end > len(buf):
+        raise ValueError("Truncated WKB")
+    if not num_points:
+        return end
+    if scan.coord_arrays is not None:
+        scan.coord_arrays.append((offset, num_points, dims))
+    if scan.bounds is None:
+        return end
+
+    coords = struct.unpack_from(f"{bo}{num_points * dims}d", buf, offset)
+    axes = [coords[i::dims] for i in range(3 if has_z else 2)]
+    if any(map(math.isnan, coords)):
+        scan.has_nan = True
+        # POINT EMPTY is stored as POINT(NaN NaN) - skip any such points, and any NaN Z values.
+        points = [p for p in zip(*axes) if not (math.isnan(p[0]) or math.isnan(p[1]))]
+        if not points:
+            return end
+        axes = list(zip(*points))
+        if has_z:
+            axes[2] = [z for z in axes[2] if not math.isnan(z)]
+
+    bounds = scan.bounds
+    for i, values in enumerate(axes):
+        if values:
+            bounds[2 * i] = min(bounds[2 * i], min(values))
+            bounds[2 * i + 1] = max(bounds[2 * i + 1], max(values))
+    return end
+
+
 def ring_as_wkt(*points, repeat_first_point=True, dp=None):
     if repeat_first_point:
         points_iter = itertools.chain(points, [points[0]])
@@ -1,4 +1,3 @@
-import json
 import logging
 import threading
 from datetime import datetime, timedelta, timezone
@@ -16,9 +15,11 @@ from .diff_estimation import (
     terminate_estimate_thread,
 )
 from kart.diff_structs import FILES_KEY, BINARY_FILE, DatasetDiff
+from kart.json_lines_encoder import FastJsonLinesEncoder
 from kart.log import commit_obj_to_json
 from kart.output_util import dump_json_output, resolve_output_path
 from kart.tabular.feature_output import feature_as_geojson, feature_as_json
+from kart.tabular.reprojection import batch_reproject_deltas
 from kart.timestamps import datetime_to_iso8601_utc, timedelta_to_iso8601_tz
 
 L = logging.getLogger(__name__)
@@ -122,7 +123,9 @@ class JsonDiffWriter(BaseDiffWriter):
 
         old_transform, new_transform = self.get_geometry_transforms(ds_path, ds_diff)
 
-        for key, delta in self.filtered_dataset_deltas(ds_path, ds_diff):
+        for key, delta in batch_reproject_deltas(
+            self.filtered_dataset_deltas(ds_path, ds_diff), old_transform, new_transform
+        ):
             delta_as_json = {}
 
             if delta.old:
@@ -230,6 +233,9 @@ class JsonLinesDiffWriter(BaseDiffWriter):
       {"type": "feature", "dataset": dataset-path, "change": {"-/+": old/new-value}}
     """
 
+    # The JsonLinesEncoder (sub)class used to encode and write each line.
+    encoder_class = FastJsonLinesEncoder
+
     @classmethod
     def _check_output_path(cls, repo, output_path):
         if isinstance(output_path, Path) and output_path.is_dir():
@@ -243,12 +249,16 @@ class JsonLinesDiffWriter(BaseDiffWriter):
         self.fp = resolve_output_path(self.output_path)
         self.separators = (",", ":") if self.json_style == "extracompact" else None
         self._diff_estimate_accuracy = diff_estimate_accuracy
-        self._output_lock = threading.RLock()
+        self.encoder = self.encoder_class(self.fp, separators=self.separators)
 
-    def dump(self, obj):
-        with self._output_lock:
-            json.dump(obj, self.fp, separators=self.separators)
-            self.fp.write("\n")
+    def dump(self, obj, flush=False):
+        self.encoder.write(obj, flush=flush)
+
+    def write_diff(self, diff_format=DiffFormat.FULL):
+        try:
+            super().write_diff(diff_format=diff_format)
+        finally:
+            self.encoder.flush()
 
     def write_header(self):
         self.dump(
@@ -287,7 +297,8 @@ class JsonLinesDiffWriter(BaseDiffWriter):
                     "type": "featureCountEstimate",
                     "accuracy": self._diff_estimate_accuracy,
                     "datasets": est,
-                }
+                },
+                flush=True,
             )
 
     def write_ds_diff(self, ds_path, ds_diff, diff_format=DiffFormat.FULL):
@@ -348,21 +359,23 @@ class JsonLinesDiffWriter(BaseDiffWriter):
 
         old_transform, new_transform = self.get_geometry_transforms(ds_path, ds_diff)
 
-        obj = {"type": item_type, "dataset": ds_path, "change": None}
-
-        for key, delta in self.filtered_dataset_deltas(ds_path, ds_diff):
-            obj["type"] = item_type
-            change = {}
-            if delta.old:
-                change["-"] = feature_as_json(
-                    delta.old_value, delta.old_key, old_transform
-                )
-            if delta.new:
-                change["+"] = feature_as_json(
-                    delta.new_value, delta.new_key, new_transform
-                )
-            obj["change"] = change
-            self.dump(obj)
+        for key, delta in batch_reproject_deltas(
+            self.filtered_dataset_deltas(ds_path, ds_diff), old_transform, new_transform
+        ):
+            self.encoder.write_feature_change(
+                item_type,
+                ds_path,
+                old=(
+                    (delta.old_value, delta.old_key, old_transform)
+                    if delta.old
+                    else None
+                ),
+                new=(
+                    (delta.new_value, delta.new_key, new_transform)
+                    if delta.new
+                    else None
+                ),
+            )
 
     def write_file_diff(self, file_diff):
         obj = {"type": "file", "path": None, "binary": False, "change": None}
@@ -382,6 +395,7 @@ class JsonLinesDiffWriter(BaseDiffWriter):
     def write_warnings_footer(self):
         # If there's an estimate thread running (see write_header()), ask it to terminate
         terminate_estimate_thread.set()
+        self.encoder.flush()
         super().write_warnings_footer()
 
 
@@ -481,7 +495,9 @@ class GeojsonDiffWriter(BaseDiffWriter):
 
         old_transform, new_transform = self.get_geometry_transforms(ds_path, ds_diff)
 
-        for key, delta in self.filtered_dataset_deltas(ds_path, ds_diff):
+        for key, delta in batch_reproject_deltas(
+            self.filtered_dataset_deltas(ds_path, ds_diff), old_transform, new_transform
+        ):
             if delta.old:
                 change_type = "U-" if delta.new else "D"
                 yield feature_as_geojson(
@@ -0,0 +1,161 @@
+import json
+import threading
+from json.encoder import INFINITY, encode_basestring_ascii
+
+from kart.geometry import Geometry
+from kart.tabular.feature_output import feature_as_json, feature_value_as_json
+
+
+class JsonLinesEncoder:
+    """
+    Writes objects to a text stream as lines of JSON. Each line is exactly what json.dump(obj, fp, separators=...)
+    would write, followed by a newline - but lines are collected in a buffer and written to the stream in large
+    chunks, rather than as lots of tiny writes. Lines are written to the buffer in the order they are encoded, even
+    when they are encoded by different threads.
+
+    This encoder uses the standard library json encoder for everything - see FastJsonLinesEncoder.
+    """
+
+    DEFAULT_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, fp, separators=None, chunk_size=None):
+        self.fp = fp
+        self.item_separator, self.key_separator = separators or (", ", ": ")
+        self.chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        self._json_encoder = json.JSONEncoder(
+            separators=(self.item_separator, self.key_separator)
+        )
+        self._buffer = []
+        self._buffer_size = 0
+        self._lock = threading.RLock()
+
+    def write(self, obj, flush=False):
+        """Writes the given object as a line of JSON. If flush is True, writes it to the stream immediately."""
+        self._write_line(self._json_encoder.encode(obj), flush=flush)
+
+    def write_feature_change(self, item_type, ds_path, old=None, new=None):
+        """
+        Writes a line of the form {"type": item_type, "dataset": ds_path, "change": {"-": old, "+": new}}.
+        old and new are each either None, or a tuple of (row, pk_value, geometry_transform) -
+        where the row is converted to JSON the same as feature_output.feature_as_json would.
+        """
+        change = {}
+        if old is not None:
+            change["-"] = feature_as_json(*old)
+        if new is not None:
+            change["+"] = feature_as_json(*new)
+        self.write({"type": item_type, "dataset": ds_path, "change": change})
+
+    def _write_line(self, line, flush=False):
+        with self._lock:
+            self._buffer.append(line)
+            self._buffer.append("\n")
+            self._buffer_size += len(line) + 1
+            if flush or self._buffer_size >= self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        """Writes everything in the buffer to the stream."""
+        with self._lock:
+            if self._buffer:
+                self.fp.write("".join(self._buffer))
+                self._buffer.clear()
+                self._buffer_size = 0
+            self.fp.flush()
+
+
+class FastJsonLinesEncoder(JsonLinesEncoder):
+    """
+    A JsonLinesEncoder with a fast path for feature changes: rather than building a dict for each feature and then
+    encoding it, the geometry (as hex WKB) and other primitive fields of each feature are written straight into the
+    output buffer - with the JSON for the dict keys and the rest of the line only encoded once. Anything that isn't
+    a primitive field is encoded by the standard library, so the output is identical to that of JsonLinesEncoder.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._encoded_keys = {}
+        self._line_prefixes = {}
+
+    def write_feature_change(self, item_type, ds_path, old=None, new=None):
+        parts = [self._line_prefix(item_type, ds_path)]
+        if old is not None:
+            parts.append('"-"')
+            parts.append(self.key_separator)
+            self._encode_feature(parts, *old)
+        if new is not None:
+            if old is not None:
+                parts.append(self.item_separator)
+            parts.append('"+"')
+            parts.append(self.key_separator)
+            self._encode_feature(parts, *new)
+        parts.append("}}")
+        self._write_line("".join(parts))
+
+    def _line_prefix(self, item_type, ds_path):
+        key = (item_type, ds_path)
+        prefix = self._line_prefixes.get(key)
+        if prefix is None:
+            # Everything up to and including the opening brace of the "change" dict.
+            encoded = self._json_encoder.encode(
+                {"type": item_type, "dataset": ds_path, "change": {}}
+            )
+            assert encoded.endswith("{}}")
+            prefix = self._line_prefixes[key] = encoded[:-2]
+        return prefix
+
+    def _encode_key(self, key):
+        # Keyed by type too, since eg True == 1 but they are encoded differently.
+        cache_key = (type(key), key)
+        encoded = self._encoded_keys.get(cache_key)
+        if encoded is None:
+            if type(key) is str:
+                encoded = encode_basestring_ascii(key) + self.key_separator
+            else:
+                # Let the standard library decide how to convert non-string keys to strings.
+                encoded = self._json_encoder.encode({key: None})[1 : -len("null}")]
+            self._encoded_keys[cache_key] = encoded
+        return encoded
+
+    def _encode_feature(self, parts, row, pk_value, geometry_transform=None):
+        parts.append("{")
+        first = True
+        for k, v in row.items():
+            if first:
+                first = False
+            else:
+                parts.append(self.item_separator)
+            parts.append(self._encode_key(k))
+
+            value_type = type(v)
+            if value_type is str:
+                parts.append(encode_basestring_ascii(v))
+            elif value_type is int:
+                parts.append(int.__repr__(v))
+            elif value_type is float:
+                parts.append(_encode_float(v))
+            elif v is None:
+                parts.append("null")
+            elif v is True:
+                parts.append("true")
+            elif v is False:
+                parts.append("false")
+            elif isinstance(v, (Geometry, bytes)):
+                # Hex never needs escaping.
+                parts.append('"')
+                parts.append(feature_value_as_json(v, pk_value, geometry_transform))
+                parts.append('"')
+            else:
+                parts.append(self._json_encoder.encode(v))
+        parts.append("}")
+
+
+def _encode_float(value):
+    # Same as the standard library json encoder, with allow_nan=True.
+    if value != value:
+        return "NaN"
+    elif value == INFINITY:
+        return "Infinity"
+    elif value == -INFINITY:
+        return "-Infinity"
+    return float.__repr__(value)
@@ -1,5 +1,4 @@
 import functools
-import itertools
 import os
 import pygit2
 import re
@@ -10,15 +9,20 @@ import click
 
 from kart.cli_util import KartGroup, add_help_subcommand
 from kart.exceptions import SubprocessError, InvalidOperation
+from kart.lfs_fetch import LfsFetcher
+from kart.lfs_index import (
+    ensure_lfs_index_complete,
+    forget_lfs_objects,
+    get_unpushed_lfs_oids,
+    list_lfs_objects,
+)
 from kart.lfs_util import (
     pointer_file_bytes_to_dict,
     get_hash_from_pointer_file,
     get_local_path_from_lfs_hash,
 )
-from kart.object_builder import ObjectBuilder
 from kart.rev_list_objects import rev_list_tile_pointer_files
 from kart.repo import KartRepoState
-from kart.s3_util import fetch_multiple_from_s3
 from kart.spatial_filter import SpatialFilter
 from kart.structs import CommitWithReference
 from kart import subprocess_util as subprocess
@@ -227,8 +231,15 @@ def _push_lfs_oids_using_args(repo, remote_name, lfs_oids):
     is_flag=True,
     help="Don't fetch anything, just show what would be fetched",
 )
+@click.option(
+    "--num-workers",
+    type=click.INT,
+    help="How many LFS files to fetch in parallel. Defaults to the lfs.concurrenttransfers config setting, or 8.",
+    default=None,
+    hidden=True,
+)
 @click.argument("commits", nargs=-1)
-def fetch(ctx, remote, do_spatial_filter, dry_run, commits):
+def fetch(ctx, remote, do_spatial_filter, dry_run, num_workers, commits):
     """Fetch LFS files referenced by the given commit(s) from a remote."""
     repo = ctx.obj.get_repo(allowed_states=KartRepoState.ALL_STATES)
 
@@ -241,6 +252,7 @@ def fetch(ctx, remote, do_spatial_filter, dry_run, commits):
         do_spatial_filter=do_spatial_filter,
         remote_name=remote,
         dry_run=dry_run,
+        num_workers=num_workers,
     )
 
 
@@ -252,6 +264,7 @@ def fetch_lfs_blobs_for_commits(
     do_spatial_filter=True,
     dry_run=False,
     quiet=False,
+    num_workers=None,
 ):
     """
     Given a list of commits (or commit OIDS), fetch all the tiles from those commits that
@@ -267,18 +280,23 @@ def fetch_lfs_blobs_for_commits(
         repo.spatial_filter if do_spatial_filter else SpatialFilter.MATCH_ALL
     )
 
-    pointer_file_oids = set()
+    pointer_file_oids = {}
     for commit in commits:
         for dataset in repo.datasets(
             commit, filter_dataset_type=ALL_TILE_DATASET_TYPES
         ):
             pointer_file_oids.update(
-                blob.hex
+                (blob.hex, None)
                 for blob in dataset.tile_pointer_blobs(spatial_filter=spatial_filter)
             )
 
     fetch_lfs_blobs_for_pointer_files(
-        repo, pointer_file_oids, dry_run=dry_run, quiet=quiet
+        repo,
+        pointer_file_oids,
+        remote_name=remote_name,
+        dry_run=dry_run,
+        quiet=quiet,
+        num_workers=num_workers,
     )
 
 
@@ -287,7 +305,13 @@ def _blobs(count):
 
 
 def fetch_lfs_blobs_for_pointer_files(
-    repo, pointer_files, *, remote_name=None, dry_run=False, quiet=False
+    repo,
+    pointer_files,
+    *,
+    remote_name=None,
+    dry_run=False,
+    quiet=False,
+    num_workers=None,
 ):
     """
     Given a list of pointer files (or OIDs of pointer files themselves - not the OIDs they point to)
@@ -296,13 +320,49 @@ def fetch_lfs_blobs_for_pointer_files(
     if not pointer_files:
         return
 
+    if dry_run:
+        _dry_run_fetch_lfs_blobs_for_pointer_files(repo, pointer_files, remote_name)
+        return
+
+    with start_fetching_lfs_blobs_for_pointer_files(
+        repo,
+        pointer_files,
+        remote_name=remote_name,
+        quiet=quiet,
+        num_workers=num_workers,
+    ):
+        pass
+
+
+def start_fetching_lfs_blobs_for_pointer_files(
+    repo, pointer_files, *, remote_name=None, quiet=False, num_workers=None
+):
+    """
+    Like fetch_lfs_blobs_for_pointer_files, but returns as soon as fetching has started, so that the caller can make
+    use of each tile as soon as it arrives. Returns an LfsFetcher, which should be used as a context manager -
+    the caller can call fetcher.wait_for(lfs_oid) to wait for a particular tile, and exiting the context waits for
+    all the tiles to be fetched. Tiles are fetched roughly in the order in which the pointer files are supplied.
+    """
     if not remote_name:
         remote_name = repo.head_remote_name_or_default
 
-    dry_run_output = []
-    urls = []
-    non_urls = []
+    fetcher = LfsFetcher(repo, remote_name, concurrency=num_workers, quiet=quiet)
+    for pointer_blob, pointer_dict, lfs_oid in _pointer_files_to_fetch(
+        repo, pointer_files
+    ):
+        url = pointer_dict.get("url")
+        if url or remote_name:
+            fetcher.add(lfs_oid, pointer_dict.get("size"), url=url)
+
+    fetcher.start()
+    return fetcher
 
+
+def _pointer_files_to_fetch(repo, pointer_files):
+    """
+    Yields (pointer_blob, pointer_dict, lfs_oid) for each of the given pointer files
+    that points to an LFS blob that is not already present in the local cache.
+    """
     for pointer_file in pointer_files:
         if isinstance(pointer_file, str):
             pointer_blob = repo[pointer_file]
@@ -312,98 +372,67 @@ def fetch_lfs_blobs_for_pointer_files(
             raise TypeError("pointer_file should be an OID or a blob object")
 
         pointer_dict = pointer_file_bytes_to_dict(pointer_blob)
-        url = pointer_dict.get("url")
         lfs_oid = get_hash_from_pointer_file(pointer_dict)
-        pointer_file_oid = pointer_blob.hex
         lfs_path = get_local_path_from_lfs_hash(repo, lfs_oid)
         if lfs_path.is_file():
             continue  # Already fetched.
 
-        if url:
-            urls.append((url, lfs_oid))
-        else:
-            non_urls.append((pointer_file_oid, lfs_oid))
+        yield pointer_blob, pointer_dict, lfs_oid
 
-        if dry_run:
-            if url:
-                dry_run_output.append(f"{lfs_oid} ({pointer_blob.hex})\n⮑  {url}")
-            else:
-                dry_run_output.append(f"{lfs_oid} ({pointer_blob.hex})")
 
-    if dry_run:
-        click.echo("Running fetch with --dry-run:")
-        if urls:
-            click.echo(f"  Found {_blobs(len(urls))} blobs to fetch from specific URLs")
-        if non_urls:
-            found_non_urls = f"  Found {_blobs(len(non_urls))} to fetch from the remote"
-            found_non_urls += "" if remote_name else " - but no remote is configured"
-            click.echo(found_non_urls)
-        if not urls and not non_urls:
-            click.echo("  Found nothing to fetch")
-
-        if dry_run_output:
-            click.echo()
-            click.echo(
-                "LFS blob OID:                                                    (Pointer file OID):"
-            )
-            for line in sorted(dry_run_output):
-                click.echo(line)
-        return
+def _dry_run_fetch_lfs_blobs_for_pointer_files(repo, pointer_files, remote_name):
+    if not remote_name:
+        remote_name = repo.head_remote_name_or_default
 
-    if urls:
-        _do_fetch_from_urls(repo, urls, quiet=quiet)
-    if non_urls and remote_name:
-        _do_fetch_from_remote(repo, non_urls, remote_name, quiet=quiet)
+    dry_run_output = []
+    urls = []
+    non_urls = []
 
+    for pointer_blob, pointer_dict, lfs_oid in _pointer_files_to_fetch(
+        repo, pointer_files
+    ):
+        url = pointer_dict.get("url")
+        if url:
+            urls.append((url, lfs_oid))
+            dry_run_output.append(f"{lfs_oid} ({pointer_blob.hex})\n⮑  {url}")
+        else:
+            non_urls.append((pointer_blob.hex, lfs_oid))
+            dry_run_output.append(f"{lfs_oid} ({pointer_blob.hex})")
 
-def _do_fetch_from_urls(repo, urls_and_lfs_oids, quiet=False):
-    non_s3_url = next(
-        (url for (url, lfs_oid) in urls_and_lfs_oids if not url.startswith("s3://")),
-        None,
-    )
-    if non_s3_url:
-        raise NotImplementedError(
-            f"Invalid URL - only S3 URLs are currently supported for BYOD repos: {non_s3_url}"
+    click.echo("Running fetch with --dry-run:")
+    if urls:
+        click.echo(f"  Found {_blobs(len(urls))} blobs to fetch from specific URLs")
+    if non_urls:
+        found_non_urls = f"  Found {_blobs(len(non_urls))} to fetch from the remote"
+        found_non_urls += "" if remote_name else " - but no remote is configured"
+        click.echo(found_non_urls)
+    if not urls and not non_urls:
+        click.echo("  Found nothing to fetch")
+
+    if dry_run_output:
+        click.echo()
+        click.echo(
+            "LFS blob OID:                                                    (Pointer file OID):"
         )
+        for line in sorted(dry_run_output):
+            click.echo(line)
 
-    urls_and_paths_and_oids = [
-        (url, get_local_path_from_lfs_hash(repo, lfs_oid), lfs_oid)
-        for (url, lfs_oid) in urls_and_lfs_oids
-    ]
-    path_parents = {path.parent for url, path, lfs_oid in urls_and_paths_and_oids}
-    for path_parent in path_parents:
-        path_parent.mkdir(parents=True, exist_ok=True)
-    fetch_multiple_from_s3(urls_and_paths_and_oids, quiet=quiet)
 
+LFS_OID_PATTERN = re.compile("[0-9a-fA-F]{64}")
 
-def _do_fetch_from_remote(repo, pointer_file_and_lfs_oids, remote_name, quiet=False):
-    # TODO - directly instruct Git-LFS to fetch blobs instead of creating a tree to point Git-LFS to,
-    # as and when Git-LFS supports this.
+BYTE_SIZE_PATTERN = re.compile(r"([0-9]+(?:\.[0-9]+)?)\s*([kmgtp]?)i?b?", re.IGNORECASE)
 
-    next_blob_name = (str(i) for i in itertools.count(start=0, step=1))
-    object_builder = ObjectBuilder(repo, None)
-    for pointer_file_oid, lfs_oid in pointer_file_and_lfs_oids:
-        object_builder.insert(next(next_blob_name), repo[pointer_file_oid])
-    tree = object_builder.flush()
 
-    try:
-        # TODO - capture progress reporting and do our own.
-        extra_kwargs = {"stdout": subprocess.DEVNULL} if quiet else {}
-        subprocess.check_call(
-            ["git-lfs", "fetch", remote_name, tree.hex],
-            cwd=repo.workdir_path,
-            **extra_kwargs,
-        )
-        if not quiet:
-            # git-lfs fetch generally leaves the cursor at the start of a line which it has already written on.
-            click.echo()
-    except subprocess.CalledProcessError as e:
-        raise SubprocessError(
-            f"There was a problem with git-lfs fetch: {e}", called_process_error=e
-        )
-
-
-LFS_OID_PATTERN = re.compile("[0-9a-fA-F]{64}")
+def parse_byte_size(ctx, param, value):
+    """Click callback - parses a size such as 200G, 512MiB, or 1000000 into a number of bytes."""
+    if value is None:
+        return None
+    match = BYTE_SIZE_PATTERN.fullmatch(value.strip())
+    if not match:
+        raise click.BadParameter(f"Invalid size: {value}", param=param)
+    number, unit = match.groups()
+    multiplier = 1024 ** " kmgtp".index(unit.lower() or " ")
+    return int(float(number) * multiplier)
 
 
 @lfs_plus.command()
@@ -413,7 +442,21 @@ LFS_OID_PATTERN = re.compile("[0-9a-fA-F]{64}")
     is_flag=True,
     help="Don't fetch anything, just show what would be fetched",
 )
-def gc(ctx, dry_run):
+@click.option(
+    "--max-size",
+    callback=parse_byte_size,
+    help=(
+        "Instead of deleting every LFS blob that can be deleted, only delete as many as are needed to bring the "
+        "total size of the cache down to this size (eg 200G) - least recently used blobs are deleted first."
+    ),
+)
+@click.option(
+    "--rescan",
+    is_flag=True,
+    hidden=True,
+    help="Rebuild the index of the LFS cache by scanning every file in the cache.",
+)
+def gc(ctx, dry_run, max_size, rescan):
     """
     Delete (garbage-collect) LFS files that are not referenced at HEAD from the local cache.
 
@@ -430,36 +473,34 @@ def gc(ctx, dry_run):
             "LFS files cannot be garbage collected unless there is a remote to refetch them from."
         )
 
-    unpushed_lfs_oids = set()
-    for commit_id, path_match_result, pointer_blob in rev_list_tile_pointer_files(
-        repo, ["--branches"], ["--remotes"]
-    ):
-        unpushed_lfs_oids.add(get_hash_from_pointer_file(pointer_blob))
+    ensure_lfs_index_complete(repo, rescan=rescan)
+    unpushed_lfs_oids = get_unpushed_lfs_oids(repo)
 
     spatial_filter = repo.spatial_filter
     checked_out_lfs_oids = set()
     for dataset in repo.datasets("HEAD", filter_dataset_type=ALL_TILE_DATASET_TYPES):
         checked_out_lfs_oids.update(dataset.tile_lfs_hashes(spatial_filter))
 
-    to_delete = set()
+    to_delete = []
     total_size_to_delete = 0
 
     to_delete_once_pushed = set()
     total_size_to_delete_once_pushed = 0
 
-    for file in (repo.gitdir_path / "lfs" / "objects").glob("**/*"):
-        if not file.is_file() or not LFS_OID_PATTERN.fullmatch(file.name):
-            continue  # Not an LFS blob at all.
-
-        if file.name in checked_out_lfs_oids:
+    # Least recently used first - so that if we are only deleting enough to get within max_size,
+    # we delete the ones that are least likely to be needed again.
+    lfs_objects = list_lfs_objects(repo)
+    total_size = sum(size for oid, size, last_used in lfs_objects)
+    for oid, size, last_used in lfs_objects:
+        if oid in checked_out_lfs_oids:
             continue  # Can't garbage-collect anything that's currently checked out.
 
-        if file.name in unpushed_lfs_oids:
-            to_delete_once_pushed.add(file)
-            total_size_to_delete_once_pushed += file.stat().st_size
-        else:
-            to_delete.add(file)
-            total_size_to_delete += file.stat().st_size
+        if oid in unpushed_lfs_oids:
+            to_delete_once_pushed.add(oid)
+            total_size_to_delete_once_pushed += size
+        elif max_size is None or total_size - total_size_to_delete > max_size:
+            to_delete.append(oid)
+            total_size_to_delete += size
 
     if to_delete_once_pushed:
         size_desc = human_readable_bytes(total_size_to_delete_once_pushed)
@@ -472,13 +513,20 @@ def gc(ctx, dry_run):
         click.echo(
             f"Running gc with --dry-run: found {len(to_delete)} LFS blobs ({size_desc}) to delete from the cache"
         )
-        for file in sorted(to_delete, key=lambda f: f.name):
-            click.echo(file.name)
+        for oid in sorted(to_delete):
+            click.echo(oid)
         return
 
     click.echo(f"Deleting {len(to_delete)} LFS blobs ({size_desc}) from the cache...")
-    for file in to_delete:
-        file.unlink()
+    for oid in to_delete:
+        get_local_path_from_lfs_hash(repo, oid).unlink(missing_ok=True)
+    forget_lfs_objects(repo, to_delete)
+
+    if max_size is not None and total_size - total_size_to_delete > max_size:
+        size_desc = human_readable_bytes(total_size - total_size_to_delete)
+        click.echo(
+            f"The LFS cache is still {size_desc} since the remaining LFS blobs are checked out or have not been pushed"
+        )
 
 
 def human_readable_bytes(num):
@@ -0,0 +1,484 @@
+import concurrent.futures
+import hashlib
+import itertools
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlparse, unquote
+import urllib.request
+
+import click
+
+from kart.exceptions import NotFound, SubprocessError
+from kart.lfs_util import get_local_path_from_lfs_hash, dict_to_pointer_file_bytes
+from kart.object_builder import ObjectBuilder
+from kart.progress_util import progress_bar
+from kart import subprocess_util as subprocess
+
+# Kart-native scheduler for fetching LFS blobs - from S3 URLs stored in pointer files (for BYOD repos),
+# and from the LFS store that belongs to a remote. Blobs are downloaded concurrently, verified while they stream,
+# resumed if a previous download was interrupted, and made available to the caller one at a time as they arrive -
+# so that, for instance, tiles can be written to the working copy while the rest are still downloading.
+
+L = logging.getLogger(__name__)
+
+# Same default as Git LFS: the number of blobs requested in a single request to the LFS batch API.
+LFS_BATCH_SIZE = 100
+
+# Same default as Git LFS - can be overridden using the lfs.concurrenttransfers config setting.
+DEFAULT_CONCURRENT_TRANSFERS = 8
+
+_CHUNK_SIZE = 1 * 1024 * 1024  # 1MB
+
+_LFS_MEDIA_TYPE = "application/vnd.git-lfs+json"
+
+
+class LfsFetchError(NotFound):
+    pass
+
+
+def get_concurrent_transfers(repo):
+    """Returns the number of blobs that should be downloaded at once, as configured by lfs.concurrenttransfers."""
+    try:
+        result = repo.config.get_int("lfs.concurrenttransfers")
+    except (KeyError, ValueError):
+        return DEFAULT_CONCURRENT_TRANSFERS
+    return max(1, result)
+
+
+def get_incomplete_path(repo, lfs_oid):
+    """
+    Where a blob is stored while it is being fetched, so that if the fetch is interrupted, it can be resumed.
+    This is the same place that Git LFS stores partial downloads.
+    """
+    return repo.gitdir_path / "lfs" / "incomplete" / lfs_oid
+
+
+def download_to_lfs_cache(repo, lfs_oid, size, iter_chunks_from):
+    """
+    Streams the blob with the given OID into the local LFS cache.
+    iter_chunks_from is a function that takes a byte offset and returns an iterator of chunks starting at that offset,
+    or, returns (offset, iterator) if the source couldn't start at the requested offset.
+    Any partial download of the same blob left over from earlier is resumed, rather than started from scratch.
+    The sha256 hash of the blob is verified as it streams - a blob that fails verification is not stored.
+    """
+    final_path = get_local_path_from_lfs_hash(repo, lfs_oid)
+    if final_path.is_file():
+        return final_path
+
+    incomplete_path = get_incomplete_path(repo, lfs_oid)
+    incomplete_path.parent.mkdir(parents=True, exist_ok=True)
+
+    offset = incomplete_path.stat().st_size if incomplete_path.is_file() else 0
+    if size is not None and offset > size:
+        offset = 0
+
+    sha256 = hashlib.sha256()
+    if offset:
+        with open(incomplete_path, "rb") as existing:
+            for chunk in iter(lambda: existing.read(_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+
+    if size is None or offset < size:
+        chunks = iter_chunks_from(offset)
+        if isinstance(chunks, tuple):
+            actual_offset, chunks = chunks
+            if actual_offset != offset:
+                # The source ignored our request to resume - start again.
+                offset = actual_offset
+                sha256 = hashlib.sha256()
+        with open(incomplete_path, "r+b" if offset else "wb") as output:
+            output.seek(offset)
+            output.truncate()
+            for chunk in chunks:
+                sha256.update(chunk)
+                output.write(chunk)
+            written = output.tell()
+    else:
+        written = offset
+
+    if sha256.hexdigest() != lfs_oid or (size is not None and written != size):
+        incomplete_path.unlink()
+        raise LfsFetchError(f"Checksum verification failed on LFS blob {lfs_oid}")
+
+    final_path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(incomplete_path, final_path)
+    return final_path
+
+
+class _LocalLfsStore:
+    """The LFS store of a remote that is on the local filesystem."""
+
+    def __init__(self, objects_path):
+        self.objects_path = objects_path
+
+    @classmethod
+    def from_remote_url(cls, url):
+        parsed = urlparse(url)
+        if parsed.scheme == "file":
+            path = Path(unquote(parsed.path))
+        elif not parsed.scheme or len(parsed.scheme) == 1:
+            # A plain path (a single letter "scheme" is a Windows drive letter).
+            path = Path(url)
+        else:
+            return None
+        for gitdir in (path / ".kart", path / ".git", path):
+            if (gitdir / "lfs" / "objects").is_dir():
+                return cls(gitdir / "lfs" / "objects")
+        return None
+
+    def fetch_batch(self, fetcher, batch):
+        for lfs_oid, size in batch:
+            fetcher._submit(lfs_oid, self._fetch_one, fetcher.repo, lfs_oid, size)
+
+    def _fetch_one(self, repo, lfs_oid, size):
+        src_path = self.objects_path / lfs_oid[0:2] / lfs_oid[2:4] / lfs_oid
+        if not src_path.is_file():
+            raise LfsFetchError(f"LFS blob {lfs_oid} not found at remote")
+
+        def _iter_chunks_from(offset):
+            with open(src_path, "rb") as src:
+                src.seek(offset)
+                yield from iter(lambda: src.read(_CHUNK_SIZE), b"")
+
+        return download_to_lfs_cache(repo, lfs_oid, size, _iter_chunks_from)
+
+
+class _HttpLfsStore:
+    """The LFS store of a remote that is an LFS server implementing the Git LFS batch API over HTTP(S)."""
+
+    def __init__(self, lfs_url):
+        self.lfs_url = lfs_url.rstrip("/")
+
+    @classmethod
+    def from_remote_url(cls, url):
+        if urlparse(url).scheme not in ("http", "https"):
+            return None
+        url = url.rstrip("/")
+        return cls(f"{url}/info/lfs" if url.endswith(".git") else f"{url}.git/info/lfs")
+
+    def fetch_batch(self, fetcher, batch):
+        request = urllib.request.Request(
+            f"{self.lfs_url}/objects/batch",
+            data=json.dumps(
+                {
+                    "operation": "download",
+                    "transfers": ["basic"],
+                    "objects": [{"oid": oid, "size": size} for oid, size in batch],
+                }
+            ).encode("utf-8"),
+            headers={"Accept": _LFS_MEDIA_TYPE, "Content-Type": _LFS_MEDIA_TYPE},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response_json = json.load(response)
+        except (HTTPError, URLError) as e:
+            # Most likely credentials are required - leave it to Git LFS, which knows how to get them.
+            L.info("LFS batch request failed, falling back to git-lfs: %s", e)
+            fetcher._fetch_batch_using_git_lfs(batch)
+            return
+
+        sizes = dict(batch)
+        for obj in response_json.get("objects", []):
+            lfs_oid = obj["oid"]
+            if lfs_oid not in sizes:
+                continue
+            download = obj.get("actions", {}).get("download")
+            if not download:
+                error = obj.get("error", {}).get("message", "no download action")
+                fetcher._set_exception(
+                    lfs_oid, LfsFetchError(f"Can't fetch LFS blob {lfs_oid}: {error}")
+                )
+                sizes.pop(lfs_oid)
+                continue
+            fetcher._submit(
+                lfs_oid,
+                self._fetch_one,
+                fetcher.repo,
+                lfs_oid,
+                sizes.pop(lfs_oid),
+                download["href"],
+                download.get("header", {}),
+            )
+        for lfs_oid in sizes:
+            fetcher._set_exception(
+                lfs_oid, LfsFetchError(f"LFS blob {lfs_oid} not found at remote")
+            )
+
+    def _fetch_one(self, repo, lfs_oid, size, href, headers):
+        def _iter_chunks_from(offset):
+            request_headers = dict(headers)
+            if offset:
+                request_headers["Range"] = f"bytes={offset}-"
+            response = urllib.request.urlopen(
+                urllib.request.Request(href, headers=request_headers)
+            )
+            # 206 means the server honoured our Range header - otherwise we're starting from the beginning.
+            actual_offset = offset if response.status == 206 else 0
+
+            def _chunks():
+                with response:
+                    yield from iter(lambda: response.read(_CHUNK_SIZE), b"")
+
+            return actual_offset, _chunks()
+
+        return download_to_lfs_cache(repo, lfs_oid, size, _iter_chunks_from)
+
+
+def _get_remote_lfs_store(repo, remote_name):
+    """
+    Returns an object that can fetch LFS blobs from the given remote, or None if Kart doesn't know how to talk to this
+    remote directly - in which case git-lfs is used instead.
+    """
+    lfs_url = repo.get_config_str(
+        f"remote.{remote_name}.lfsurl"
+    ) or repo.get_config_str("lfs.url")
+    if lfs_url:
+        return (
+            _HttpLfsStore(lfs_url)
+            if urlparse(lfs_url).scheme in ("http", "https")
+            else None
+        )
+    try:
+        remote_url = repo.remotes[remote_name].url
+    except KeyError:
+        return None
+    if not remote_url:
+        return None
+    return _LocalLfsStore.from_remote_url(remote_url) or _HttpLfsStore.from_remote_url(
+        remote_url
+    )
+
+
+class LfsFetcher:
+    """
+    Fetches LFS blobs into the local LFS cache, using a pool of worker threads.
+    Usage:
+
+    with LfsFetcher(repo, remote_name) as fetcher:
+        fetcher.add(lfs_oid, size, url=None)
+        ...
+        fetcher.start()
+        ...
+        fetcher.wait_for(lfs_oid)  # Returns as soon as this particular blob has been fetched.
+
+    Exiting the context waits for all blobs to be fetched, and raises the first error encountered, if any.
+    Blobs are fetched roughly in the order they were added, so callers that consume blobs one at a time should
+    add them in the order they will be consumed.
+    """
+
+    def __init__(self, repo, remote_name=None, *, concurrency=None, quiet=False):
+        self.repo = repo
+        self.remote_name = remote_name
+        self.concurrency = concurrency or get_concurrent_transfers(repo)
+        self.quiet = quiet
+
+        self._urls = {}
+        self._remote_blobs = {}
+        self._futures = {}
+        self._fetched = []
+        self._executor = None
+        self._progress = None
+        self._lock = threading.Lock()
+        self._git_lfs_lock = threading.Lock()
+
+    def add(self, lfs_oid, size=None, url=None):
+        """Adds a blob to be fetched, either from the given URL, or if no URL is given, from the remote."""
+        if lfs_oid in self._futures:
+            raise RuntimeError("LfsFetcher has already started")
+        if url:
+            if not url.startswith("s3://"):
+                raise NotImplementedError(
+                    f"Invalid URL - only S3 URLs are currently supported for BYOD repos: {url}"
+                )
+            self._urls[lfs_oid] = (url, size)
+        else:
+            self._remote_blobs[lfs_oid] = size
+
+    def start(self):
+        """Start fetching blobs in the background."""
+        if self._executor is not None:
+            return
+        all_oids = list(self._urls) + list(self._remote_blobs)
+        for lfs_oid in all_oids:
+            self._futures[lfs_oid] = concurrent.futures.Future()
+        if not all_oids:
+            return
+
+        self._progress_context = progress_bar(
+            total=len(all_oids),
+            unit="blob",
+            desc="Fetching LFS blobs",
+            disable=True if self.quiet else None,
+        )
+        self._progress = self._progress_context.__enter__()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.concurrency
+        )
+
+        for lfs_oid, (url, size) in self._urls.items():
+            self._submit(lfs_oid, self._fetch_from_s3, lfs_oid, size, url)
+
+        if self._remote_blobs:
+            if not self.remote_name:
+                for lfs_oid in self._remote_blobs:
+                    self._set_exception(
+                        lfs_oid, LfsFetchError("No remote to fetch LFS blobs from")
+                    )
+                return
+            store = _get_remote_lfs_store(self.repo, self.remote_name)
+            remote_items = iter(self._remote_blobs.items())
+            while True:
+                batch = list(itertools.islice(remote_items, LFS_BATCH_SIZE))
+                if not batch:
+                    break
+                if store is None:
+                    self._executor.submit(
+                        self._catch_batch_errors, self._fetch_batch_using_git_lfs, batch
+                    )
+                else:
+                    self._executor.submit(
+                        self._catch_batch_errors, store.fetch_batch, self, batch
+                    )
+
+    def wait_for(self, lfs_oid):
+        """Blocks until the given blob has been fetched - raises an error if it couldn't be fetched."""
+        if lfs_oid.startswith("sha256:"):
+            lfs_oid = lfs_oid[7:]  # len("sha256:")
+        future = self._futures.get(lfs_oid)
+        if future is not None:
+            future.result()
+
+    def wait_all(self):
+        """Blocks until all blobs have been fetched - raises the first error encountered, if any."""
+        self.start()
+        try:
+            for future in self._futures.values():
+                future.result()
+        except BaseException:
+            self._shutdown(cancel_futures=True)
+            raise
+        self._shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.wait_all()
+        else:
+            for future in self._futures.values():
+                future.cancel()
+            self._shutdown(cancel_futures=True)
+
+    def _shutdown(self, cancel_futures=False):
+        # If cancel_futures is set, batches that haven't started fetching yet are dropped, rather than waited for.
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=cancel_futures)
+        if self._fetched:
+            self._record_fetched()
+        if self._progress is not None:
+            self._progress_context.__exit__(None, None, None)
+            self._progress = None
+
+    def _submit(self, lfs_oid, fn, *args):
+        """Runs fn(*args) on a worker thread, and resolves the future for lfs_oid with the result."""
+
+        def _run():
+            try:
+                self._set_result(lfs_oid, fn(*args))
+            except Exception as e:
+                self._set_exception(lfs_oid, e)
+
+        self._executor.submit(_run)
+
+    def _catch_batch_errors(self, fn, *args):
+        batch = args[-1]
+        try:
+            fn(*args)
+        except Exception as e:
+            for lfs_oid, size in batch:
+                self._set_exception(lfs_oid, e)
+
+    def _set_result(self, lfs_oid, result):
+        with self._lock:
+            future = self._futures[lfs_oid]
+            if not future.done():
+                future.set_result(result)
+                self._fetched.append((lfs_oid, result))
+                self._progress.update(1)
+
+    def _set_exception(self, lfs_oid, exception):
+        with self._lock:
+            future = self._futures[lfs_oid]
+            if not future.done():
+                future.set_exception(exception)
+                self._progress.update(1)
+
+    def _record_fetched(self):
+        from kart.lfs_index import record_lfs_objects
+
+        fetched, self._fetched = self._fetched, []
+        oids_and_sizes = []
+        for lfs_oid, path in fetched:
+            try:
+                oids_and_sizes.append((lfs_oid, path.stat().st_size))
+            except OSError:
+                pass
+        record_lfs_objects(self.repo, oids_and_sizes)
+
+    def _fetch_from_s3(self, lfs_oid, size, url):
+        from kart.s3_util import iter_s3_object_chunks
+
+        return download_to_lfs_cache(
+            self.repo,
+            lfs_oid,
+            size,
+            lambda offset: iter_s3_object_chunks(url, offset, chunk_size=_CHUNK_SIZE),
+        )
+
+    def _fetch_batch_using_git_lfs(self, batch):
+        # Git LFS does its own parallelism and progress reporting - only run one git-lfs process at once.
+        with self._git_lfs_lock:
+            fetch_lfs_oids_using_git_lfs(self.repo, batch, self.remote_name)
+        for lfs_oid, size in batch:
+            path = get_local_path_from_lfs_hash(self.repo, lfs_oid)
+            if path.is_file():
+                self._set_result(lfs_oid, path)
+            else:
+                self._set_exception(
+                    lfs_oid, LfsFetchError(f"git-lfs didn't fetch LFS blob {lfs_oid}")
+                )
+
+
+def fetch_lfs_oids_using_git_lfs(repo, lfs_oids_and_sizes, remote_name, quiet=True):
+    """Fetches the given LFS blobs - a list of (lfs_oid, size) tuples - from the given remote using git-lfs fetch."""
+    # TODO - directly instruct Git-LFS to fetch blobs instead of creating a tree to point Git-LFS to,
+    # as and when Git-LFS supports this.
+    next_blob_name = (str(i) for i in itertools.count(start=0, step=1))
+    object_builder = ObjectBuilder(repo, None)
+    for lfs_oid, size in lfs_oids_and_sizes:
+        pointer_file = dict_to_pointer_file_bytes(
+            {"oid": f"sha256:{lfs_oid}", "size": size}
+        )
+        object_builder.insert(next(next_blob_name), pointer_file)
+    tree = object_builder.flush()
+
+    try:
+        extra_kwargs = {"stdout": subprocess.DEVNULL} if quiet else {}
+        subprocess.check_call(
+            ["git-lfs", "fetch", remote_name, tree.hex],
+            cwd=repo.workdir_path,
+            **extra_kwargs,
+        )
+        if not quiet:
+            # git-lfs fetch generally leaves the cursor at the start of a line which it has already written on.
+            click.echo()
+    except subprocess.CalledProcessError as e:
+        raise SubprocessError(
+            f"There was a problem with git-lfs fetch: {e}", called_process_error=e
+        )
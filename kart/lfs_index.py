@@ -0,0 +1,255 @@
+import logging
+import re
+import time
+
+import pygit2
+from pysqlite3 import dbapi2 as sqlite
+from sqlalchemy import Column, Integer, Table, Text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.types import BLOB
+
+from kart.exceptions import SubprocessError
+from kart.lfs_util import get_hash_from_pointer_file
+from kart.repo import KartRepoFiles
+from kart.sqlalchemy import TableSet
+from kart.sqlalchemy.sqlite import sqlite_db
+from kart import subprocess_util as subprocess
+
+# An index of the contents of the local LFS cache, so that questions like "what's in the cache", "how big is it",
+# and "which of these blobs haven't been pushed yet" can be answered without statting every file in the cache or
+# walking every tile of every commit. Kept up to date whenever Kart writes to the cache (import, commit, fetch) or
+# reads from it (checkout).
+
+L = logging.getLogger(__name__)
+
+LFS_OID_PATTERN = re.compile("[0-9a-fA-F]{64}")
+
+TILE_POINTER_FILES_PATTERN = re.compile(
+    r"(.+)/\.(?:point-cloud|raster)-dataset[^/]*/tile/.+"
+)
+
+# Key in the lfs_index_state table: set once every blob in the LFS cache is known to be in the index.
+STATE_COMPLETE = "complete"
+
+
+class LfsIndexTables(TableSet):
+    """Tables for indexing the local LFS cache."""
+
+    def __init__(self):
+        super().__init__()
+
+        # "lfs_objects" has a row for every blob in the local LFS cache.
+        self.lfs_objects = Table(
+            "lfs_objects",
+            self.sqlalchemy_metadata,
+            # The LFS blob's sha256 hash, as 64 chars of hex.
+            Column("oid", Text, nullable=False, primary_key=True),
+            Column("size", Integer, nullable=False),
+            # When the blob was last written to or read from the cache, in seconds since the epoch.
+            Column("last_used", Integer, nullable=False),
+            sqlite_with_rowid=False,
+        )
+
+        # "indexed_commits" records every commit for which commit_lfs_objects has been populated.
+        self.indexed_commits = Table(
+            "indexed_commits",
+            self.sqlalchemy_metadata,
+            # The commit ID (the SHA-1 hash), in binary (20 bytes).
+            Column("commit_id", BLOB, nullable=False, primary_key=True),
+            sqlite_with_rowid=False,
+        )
+
+        # "commit_lfs_objects" records which LFS blobs are introduced by each commit - that is, which blobs are
+        # referenced by the commit but by none of its parents. Commits are immutable so this never goes stale.
+        self.commit_lfs_objects = Table(
+            "commit_lfs_objects",
+            self.sqlalchemy_metadata,
+            Column("commit_id", BLOB, nullable=False, primary_key=True),
+            Column("oid", Text, nullable=False, primary_key=True),
+            sqlite_with_rowid=False,
+        )
+
+        self.lfs_index_state = Table(
+            "lfs_index_state",
+            self.sqlalchemy_metadata,
+            Column("key", Text, nullable=False, primary_key=True),
+            Column("value", Text, nullable=False),
+        )
+
+
+LfsIndexTables.copy_tables_to_class()
+
+
+def lfs_index_db(repo):
+    """Context manager giving a connection to the LFS index of the given repo - commits on success."""
+    return sqlite_db(LfsIndexTables, str(repo.gitdir_file(KartRepoFiles.LFS_INDEX)))
+
+
+def _now():
+    return int(time.time())
+
+
+def record_lfs_objects(repo, oids_and_sizes, last_used=None):
+    """
+    Records that the given LFS blobs - a list of (oid, size) tuples - have been written to the LFS cache.
+    Failure to update the index is logged but otherwise ignored: it doesn't affect the operation being performed.
+    """
+    last_used = last_used or _now()
+    params = [(_strip_sha256(oid), size, last_used) for oid, size in oids_and_sizes]
+    if not params:
+        return
+    try:
+        with lfs_index_db(repo) as db:
+            db.executemany(
+                "INSERT INTO lfs_objects (oid, size, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT (oid) DO UPDATE SET size = excluded.size, last_used = excluded.last_used;",
+                params,
+            )
+    except (sqlite.Error, SQLAlchemyError) as e:
+        L.info("Couldn't update the LFS index: %s", e)
+
+
+def touch_lfs_objects(repo, oids):
+    """Records that the given LFS blobs have just been used (eg, written to the working copy)."""
+    now = _now()
+    params = [(now, _strip_sha256(oid)) for oid in oids]
+    if not params:
+        return
+    try:
+        with lfs_index_db(repo) as db:
+            db.executemany(
+                "UPDATE lfs_objects SET last_used = ? WHERE oid = ?;", params
+            )
+    except (sqlite.Error, SQLAlchemyError) as e:
+        L.info("Couldn't update the LFS index: %s", e)
+
+
+def forget_lfs_objects(repo, oids):
+    """
+    Records that the given LFS blobs are no longer in the LFS cache. Blobs that aren't in the index are ignored.
+    Failure to update the index is logged but otherwise ignored, the same as for record_lfs_objects.
+    """
+    params = [(_strip_sha256(oid),) for oid in oids]
+    if not params:
+        return
+    try:
+        with lfs_index_db(repo) as db:
+            db.executemany("DELETE FROM lfs_objects WHERE oid = ?;", params)
+    except (sqlite.Error, SQLAlchemyError) as e:
+        L.info("Couldn't update the LFS index: %s", e)
+
+
+def ensure_lfs_index_complete(repo, rescan=False):
+    """
+    Makes sure every blob in the LFS cache is in the LFS index. This involves scanning the entire LFS cache,
+    but only needs to happen once, since from then on the index is kept up to date - unless rescan is set,
+    which can be used if the LFS cache has been modified by something other than Kart.
+    """
+    with lfs_index_db(repo) as db:
+        is_complete = db.execute(
+            "SELECT value FROM lfs_index_state WHERE key = ?;", (STATE_COMPLETE,)
+        ).fetchone()
+        if is_complete and not rescan:
+            return
+
+        params = []
+        for file in (repo.gitdir_path / "lfs" / "objects").glob("**/*"):
+            if not file.is_file() or not LFS_OID_PATTERN.fullmatch(file.name):
+                continue  # Not an LFS blob at all.
+            stat = file.stat()
+            params.append((file.name, stat.st_size, int(stat.st_mtime)))
+
+        db.execute("DELETE FROM lfs_objects;")
+        db.executemany(
+            "INSERT INTO lfs_objects (oid, size, last_used) VALUES (?, ?, ?);", params
+        )
+        db.execute(
+            "INSERT OR REPLACE INTO lfs_index_state (key, value) VALUES (?, '1');",
+            (STATE_COMPLETE,),
+        )
+
+
+def list_lfs_objects(repo):
+    """Returns a list of (oid, size, last_used) for every LFS blob in the index, least recently used first."""
+    with lfs_index_db(repo) as db:
+        return db.execute(
+            "SELECT oid, size, last_used FROM lfs_objects ORDER BY last_used, oid;"
+        ).fetchall()
+
+
+def get_unpushed_lfs_oids(repo):
+    """
+    Returns the set of LFS blobs that are referenced by commits on local branches that have not been pushed to any
+    remote. Rather than walking every tile of every unpushed commit, this only looks at which blobs each unpushed
+    commit introduced - and that is computed at most once per commit, since the answer is stored in the index.
+    """
+    unpushed_commits = _rev_list_commits(repo, ["--branches"], ["--remotes"])
+    if not unpushed_commits:
+        return set()
+
+    with lfs_index_db(repo) as db:
+        db.execute(
+            "CREATE TEMP TABLE unpushed_commits (commit_id BLOB PRIMARY KEY) WITHOUT ROWID;"
+        )
+        db.executemany(
+            "INSERT OR IGNORE INTO unpushed_commits (commit_id) VALUES (?);",
+            [(bytes.fromhex(c),) for c in unpushed_commits],
+        )
+        commits_to_index = db.execute(
+            "SELECT commit_id FROM unpushed_commits "
+            "WHERE commit_id NOT IN (SELECT commit_id FROM indexed_commits);"
+        ).fetchall()
+        for (commit_id,) in commits_to_index:
+            introduced = _lfs_oids_introduced_by_commit(repo, repo[commit_id.hex()])
+            db.executemany(
+                "INSERT OR IGNORE INTO commit_lfs_objects (commit_id, oid) VALUES (?, ?);",
+                [(commit_id, oid) for oid in introduced],
+            )
+            db.execute(
+                "INSERT OR IGNORE INTO indexed_commits (commit_id) VALUES (?);",
+                (commit_id,),
+            )
+
+        return {
+            row[0]
+            for row in db.execute(
+                "SELECT DISTINCT oid FROM commit_lfs_objects "
+                "JOIN unpushed_commits USING (commit_id);"
+            )
+        }
+
+
+def _lfs_oids_introduced_by_commit(repo, commit):
+    """
+    Returns the set of LFS blobs that are referenced by the given commit but not by any of its parents.
+    Tree diffs skip identical subtrees, so this is proportional to the size of the change, not of the commit.
+    """
+    parent_trees = [p.tree for p in commit.parents] or [repo.empty_tree]
+    result = None
+    for parent_tree in parent_trees:
+        introduced = set()
+        for delta in parent_tree.diff_to_tree(commit.tree).deltas:
+            if delta.status not in (pygit2.GIT_DELTA_ADDED, pygit2.GIT_DELTA_MODIFIED):
+                continue
+            if not TILE_POINTER_FILES_PATTERN.fullmatch(delta.new_file.path):
+                continue
+            lfs_oid = get_hash_from_pointer_file(repo[delta.new_file.id])
+            if lfs_oid:
+                introduced.add(lfs_oid)
+        result = introduced if result is None else (result & introduced)
+    return result
+
+
+def _rev_list_commits(repo, start_commits, stop_commits):
+    cmd = ["git", "-C", repo.path, "rev-list", *start_commits, "--not", *stop_commits]
+    try:
+        output = subprocess.check_output(cmd, encoding="utf8")
+    except subprocess.CalledProcessError as e:
+        raise SubprocessError(
+            f"There was a problem with git rev-list: {e}", called_process_error=e
+        )
+    return output.split()
+
+
+def _strip_sha256(oid):
+    return oid[7:] if oid.startswith("sha256:") else oid  # len("sha256:")
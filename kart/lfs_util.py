@@ -349,6 +349,10 @@ def copy_file_to_local_lfs_cache(
         actual_object_path.parents[0].mkdir(parents=True, exist_ok=True)
         tmp_object_path.rename(actual_object_path)
 
+    from kart.lfs_index import record_lfs_objects
+
+    record_lfs_objects(repo, [(oid, size)])
+
     if not oid.startswith("sha256:"):
         oid = "sha256:" + oid
 
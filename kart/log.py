@@ -1,3 +1,4 @@
+import contextlib
 import sys
 import logging
 from datetime import datetime, timedelta, timezone
@@ -7,6 +8,7 @@ import click
 from kart import diff_estimation
 from kart.cli_util import OutputFormatType
 from kart.completion_shared import ref_or_repo_path_completer
+from kart.dataset_changes_index import DatasetChangesIndex
 from kart.exceptions import NotYetImplemented, SubprocessError
 from kart import subprocess_util as subprocess
 from kart.key_filters import RepoKeyFilter
@@ -295,26 +297,29 @@ def log(
             )
 
         commit_ids_and_refs_log = _parse_git_log_output(r.stdout.splitlines())
-        dataset_change_cache = {}
 
-        commit_log = (
-            commit_obj_to_json(
-                repo[commit_id],
-                repo,
-                refs,
-                dataset_changes,
-                dataset_change_cache,
-                with_feature_count,
-            )
-            for (commit_id, refs) in commit_ids_and_refs_log
+        dataset_change_index = (
+            DatasetChangesIndex(repo) if dataset_changes else contextlib.nullcontext()
         )
-        if output_type == "json-lines":
-            for item in commit_log:
-                # hardcoded style here; each item must be on one line.
-                dump_json_output(item, sys.stdout, "compact")
+        with dataset_change_index as dataset_change_cache:
+            commit_log = (
+                commit_obj_to_json(
+                    repo[commit_id],
+                    repo,
+                    refs,
+                    dataset_changes,
+                    dataset_change_cache,
+                    with_feature_count,
+                )
+                for (commit_id, refs) in commit_ids_and_refs_log
+            )
+            if output_type == "json-lines":
+                for item in commit_log:
+                    # hardcoded style here; each item must be on one line.
+                    dump_json_output(item, sys.stdout, "compact")
 
-        else:
-            dump_json_output(commit_log, sys.stdout, fmt)
+            else:
+                dump_json_output(commit_log, sys.stdout, fmt)
 
 
 def _parse_git_log_output(lines):
@@ -330,7 +335,7 @@ def commit_obj_to_json(
     repo=None,
     refs=None,
     dataset_changes=False,
-    dataset_change_cache={},
+    dataset_change_cache=None,
     with_feature_count=None,
 ):
     """Given a commit object, returns a dict ready for dumping as JSON."""
@@ -390,36 +395,12 @@ def commit_obj_to_json(
     return result
 
 
-def get_dataset_changes(repo, commit, dataset_change_cache):
-    """Given a commit, returns a list of datasets changed by that commit."""
-    cur_datasets = _get_dataset_tree_ids(repo, commit, dataset_change_cache)
-    prev_datasets = None
-    try:
-        if not commit.parents:
-            return sorted(list(cur_datasets.keys()))
-
-        parent = commit.parents[0]
-        prev_datasets = _get_dataset_tree_ids(repo, parent, dataset_change_cache)
-        changes = prev_datasets.items() ^ cur_datasets.items()
-        return sorted(list(set(ds for ds, tree in changes)))
-
-    except KeyError:
-        return sorted(list(cur_datasets.keys()))
-
-
-def _get_dataset_tree_ids(repo, commit, dataset_change_cache):
+def get_dataset_changes(repo, commit, dataset_change_cache=None):
     """
-    Given a commit, returns a dict of dataset SHAs at that commit eg:
-    {
-        "nz_building_outlines": "8f7dbff287b9d40a772a1315c47e208124028645",
-        ...
-    }
+    Given a commit, returns a list of datasets changed by that commit.
+    dataset_change_cache - a DatasetChangesIndex, which should be reused when getting the changes of many commits.
     """
-    commit_id = commit.id.hex
-    if commit_id not in dataset_change_cache:
-        result = {}
-        for dataset in repo.datasets(commit):
-            result[dataset.path] = dataset.tree.id.hex
-        dataset_change_cache[commit_id] = result
-
-    return dataset_change_cache[commit_id]
+    if dataset_change_cache is None:
+        with DatasetChangesIndex(repo) as dataset_change_cache:
+            return dataset_change_cache.get_dataset_changes(commit)
+    return dataset_change_cache.get_dataset_changes(commit)
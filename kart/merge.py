@@ -16,7 +16,6 @@ from .merge_util import (
     MergedIndex,
     WorkingCopyMerger,
     merge_status_to_text,
-    write_merged_index_flags,
 )
 from .output_util import dump_json_output
 from .pack_util import write_to_packfile
@@ -116,10 +115,14 @@ def do_merge(
         return merge_jdict
 
     tree3 = commit_with_ref3.map(lambda c: c.tree)
-    index = repo.merge_trees(**tree3.as_dict(), flags={"find_renames": False})
+    if dry_run:
+        # Only the conflicts are needed - don't write any merged trees to the repo.
+        merged_index = MergedIndex.from_tree_merge(repo, tree3, write_tree=False)
+    else:
+        with write_to_packfile(repo):
+            merged_index = MergedIndex.from_tree_merge(repo, tree3)
 
-    if index.conflicts:
-        merged_index = MergedIndex.from_pygit2_index(index)
+    if merged_index.conflicts:
         conflicts_writer_class = BaseConflictsWriter.get_conflicts_writer_class("json")
         conflicts_writer = conflicts_writer_class(
             repo, summarise=2, merged_index=merged_index, merge_context=merge_context
@@ -142,7 +145,7 @@ def do_merge(
     check_git_user(repo)
 
     with write_to_packfile(repo):
-        merge_tree_id = index.write_tree(repo, write_merged_index_flags(repo))
+        merge_tree_id = merged_index.write_resolved_tree(repo)
         L.debug(f"Merge tree: {merge_tree_id}")
 
         user = repo.default_signature
@@ -1,10 +1,18 @@
+import contextlib
 import functools
 import json
+import os
 import re
 from collections import namedtuple
+from collections.abc import MutableMapping
+from pathlib import Path
 
 import click
 import pygit2
+from pysqlite3 import dbapi2 as sqlite
+from sqlalchemy import Column, Integer, Table, Text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.types import BLOB
 
 from .lfs_util import pointer_file_bytes_to_dict, get_local_path_from_lfs_hash
 from .key_filters import RepoKeyFilter
@@ -13,8 +21,11 @@ from .structs import CommitWithReference
 from .tabular.feature_output import feature_as_geojson, feature_as_json, feature_as_text
 from .utils import ungenerator
 from kart.lfs_commands import fetch_lfs_blobs_for_commits
+from kart.object_builder import ObjectBuilder
 from kart.point_cloud.tilename_util import set_tile_extension
 from kart.reflink_util import try_reflink
+from kart.sqlalchemy import TableSet
+from kart.sqlalchemy.sqlite import sqlite_engine
 
 
 MERGE_HEAD = KartRepoFiles.MERGE_HEAD
@@ -88,12 +99,13 @@ AncestorOursTheirs.EMPTY = AncestorOursTheirs(None, None, None)
 class MergedIndex:
     """
     Like a pygit2.Index, but every conflict has a short key independent of its path,
-    and the entire index including conflicts can be serialised to an index file.
-    Resolutions to conflicts can also be stored, independently of entries of conflicts.
+    and the entire index including conflicts can be serialised to a file - see write.
+    Resolutions to conflicts can also be stored, independently of entries of conflicts
+    (resolutions are called "resolves" here for brevity and with consistency with the verb, ie "kart resolve").
     Conflicts are easier to modify than in a pygit2.Index (where they are backed by C iterators).
-    When serialised to an index file, conflicts will be added in a special .conflicts/ directory,
-    and resolutions will be added in a special .resolves/ directory (resolutions are called
-    "resolves" here for brevity and with consistency with the verb, ie "kart resolve").
+
+    A MergedIndex can also be sparse - see from_tree_merge. A sparse MergedIndex has a tree, which holds every entry
+    that was merged cleanly, so that the entries dict need only hold those entries that the merge changed.
     """
 
     # We could use pygit2.IndexEntry everywhere but it has unhelpful __eq__ and __repr__ behaviour.
@@ -104,10 +116,13 @@ class MergedIndex:
     # Note that MergedIndex only contains Entries, which are simple structs -
     # not RichConflicts, which refer to the entire RepoStructure to give extra functionality.
 
-    def __init__(self, entries, conflicts, resolves):
+    def __init__(self, entries, conflicts, resolves, tree=None):
         self.entries = entries
         self.conflicts = conflicts
         self.resolves = resolves
+        # The ID of the tree of cleanly merged entries, which self.entries is applied on top of - or None if
+        # self.entries holds every cleanly merged entry.
+        self.tree = tree
 
     @classmethod
     def from_pygit2_index(cls, index):
@@ -122,6 +137,54 @@ class MergedIndex:
         resolves = {}
         return MergedIndex(entries, conflicts, resolves)
 
+    @classmethod
+    def from_tree_merge(cls, repo, trees3, write_tree=True):
+        """
+        Does a three-way merge of the given AncestorOursTheirs of root trees, and returns the result as a sparse
+        MergedIndex. Unlike pygit2.Repository.merge_trees, this doesn't load every path of all three trees - it
+        only recurses into subtrees that differ between the three versions, and reuses all other subtrees as is.
+        The result has a tree containing every cleanly merged entry, entries for each blob that was changed
+        by merging in theirs (but not for the contents of entire subtrees that were taken from theirs), and
+        conflicts for each blob that was changed differently in ours and in theirs - conflicts are keyed by the
+        order of their paths, same as from_pygit2_index.
+
+        Falls back to pygit2.Repository.merge_trees in the rare cases it can't handle - when the same path is a
+        tree in one version and a blob in another - and for partial clones, since the merged tree could contain
+        promised blobs (and libgit2 won't write a tree that refers to blobs that are not present).
+
+        If write_tree is False, the merged tree is not written to the repo - the result only has the conflicts of the merge,
+        which is all that is needed for a dry run.
+        """
+        if repo.is_partial_clone:
+            return cls._from_libgit2_tree_merge(repo, trees3)
+
+        changes = []
+        conflicts = []
+        try:
+            _merge_trees3(trees3, "", changes, conflicts)
+        except _UnsupportedTreeMerge:
+            return cls._from_libgit2_tree_merge(repo, trees3)
+
+        conflicts = {str(k): c for k, c in enumerate(conflicts)}
+        if not write_tree:
+            return MergedIndex({}, conflicts, {})
+
+        object_builder = ObjectBuilder(repo, trees3.ours)
+        entries = {}
+        for path, value in changes:
+            if isinstance(value, cls.Entry):
+                object_builder.insert(path, value.id, mode=value.mode)
+                entries[path] = value
+            else:
+                object_builder.insert(path, value)
+        tree = object_builder.flush()
+        return MergedIndex(entries, conflicts, {}, tree=tree.id)
+
+    @classmethod
+    def _from_libgit2_tree_merge(cls, repo, trees3):
+        index = repo.merge_trees(**trees3.as_dict(), flags={"find_renames": False})
+        return cls.from_pygit2_index(index)
+
     def __eq__(self, other):
         if not isinstance(other, MergedIndex):
             return False
@@ -129,11 +192,13 @@ class MergedIndex:
             self.entries == other.entries
             and self.conflicts == other.conflicts
             and self.resolves == other.resolves
+            and self.tree == other.tree
         )
 
     def __repr__(self):
         contents = json.dumps(
             {
+                "tree": self.tree,
                 "entries": self.entries,
                 "conflicts": self.conflicts,
                 "resolves": self.resolves,
@@ -168,18 +233,6 @@ class MergedIndex:
     def remove_conflict(self, key):
         del self.conflicts[key]
 
-    @classmethod
-    def _serialise_conflict(cls, key, conflict):
-        for version, entry in zip(AncestorOursTheirs.NAMES, conflict):
-            if not entry:
-                continue
-            result_path = f".conflicts/{key}/{version}/{entry.path}"
-            yield cls.Entry(result_path, entry.id, entry.mode)
-
-    def _serialise_conflicts(self):
-        for key, conflict3 in self.conflicts.items():
-            yield from self._serialise_conflict(key, conflict3)
-
     _CONFLICT_PATTERN = re.compile(
         r"^.conflicts/(?P<key>[^/]+)/(?P<version>ancestor|ours|theirs)/(?P<path>.+)$"
     )
@@ -213,23 +266,6 @@ class MergedIndex:
     def remove_resolve(self, key):
         del self.resolves[key]
 
-    _EMPTY_OID = pygit2.Oid(hex="0" * 40)
-    _EMPTY_MODE = pygit2.GIT_FILEMODE_BLOB
-
-    @classmethod
-    def _serialise_resolve(cls, key, resolve):
-        # We always yield at least one entry per resolve, even when the resolve
-        # has no features - otherwise it would appear to be unresolved.
-        yield cls.Entry(f".resolves/{key}/resolved", cls._EMPTY_OID, cls._EMPTY_MODE)
-
-        for i, entry in enumerate(resolve):
-            result_path = f".resolves/{key}/{i}/{entry.path}"
-            yield cls.Entry(result_path, entry.id, entry.mode)
-
-    def _serialise_resolves(self):
-        for key, resolve3 in self.resolves.items():
-            yield from self._serialise_resolve(key, resolve3)
-
     _RESOLVED_PATTERN = re.compile(r"^.resolves/(?P<key>.+?)/resolved$")
     _RESOLVE_PART_PATTERN = re.compile(
         r"^.resolves/(?P<key>[^/]+)/(?P<i>[^/]+)/(?P<path>.+)$"
@@ -266,16 +302,210 @@ class MergedIndex:
         return {k: v for k, v in self.conflicts.items() if k not in self.resolves}
 
     @classmethod
-    def read(cls, path):
-        """Deserialise a MergedIndex from the given path."""
+    def read(cls, path, with_entries=True):
+        """
+        Deserialise a MergedIndex from the given path.
+        If with_entries is False, only the conflicts and the keys of the resolves are read up front: the entries
+        are not read at all (so the result can't be used to write the merged tree), and the entries of each resolve
+        are only read if that resolve is accessed - see read_resolve. This is all that is needed to find and resolve
+        conflicts, and is much quicker when the merge changed many features.
+        """
+        if not _is_merged_index_db(path):
+            return cls._read_legacy_index(path)
+
+        with _merged_index_db(path) as db:
+            row = db.execute(
+                "SELECT value FROM merged_index_state WHERE key = 'tree';"
+            ).fetchone()
+            tree = pygit2.Oid(hex=row[0]) if row else None
+
+            if not with_entries:
+                conflicts = cls._read_conflicts(db)
+                resolve_keys = [
+                    key
+                    for (key,) in db.execute("SELECT key FROM resolves ORDER BY key;")
+                ]
+                resolves = _LazyResolves(path, resolve_keys)
+                return MergedIndex(None, conflicts, resolves, tree=tree)
+
+            entries = {}
+            for row in db.execute("SELECT path, id, mode FROM entries ORDER BY path;"):
+                entries[row[0]] = cls._entry_from_row(row)
+
+            conflicts = cls._read_conflicts(db)
+
+            resolves = {
+                key: []
+                for (key,) in db.execute("SELECT key FROM resolves ORDER BY key;")
+            }
+            for key, *row in db.execute(
+                "SELECT key, path, id, mode FROM resolve_entries ORDER BY key, i;"
+            ):
+                resolves[key].append(cls._entry_from_row(row))
+
+        return MergedIndex(entries, conflicts, resolves, tree=tree)
+
+    @classmethod
+    def _read_conflicts(cls, db):
+        conflicts = {}
+        for key, version, *row in db.execute(
+            "SELECT key, version, path, id, mode FROM conflicts ORDER BY key;"
+        ):
+            conflicts.setdefault(key, AncestorOursTheirs.EMPTY)
+            conflicts[key] |= AncestorOursTheirs.partial(
+                **{version: cls._entry_from_row(row)}
+            )
+        return conflicts
+
+    @classmethod
+    def read_from_repo(cls, repo, with_entries=True):
+        """Deserialise a MergedIndex from the MERGED_INDEX file in the given repo - see read."""
+        return cls.read(repo.gitdir_file(MERGED_INDEX), with_entries=with_entries)
+
+    @classmethod
+    def read_conflict(cls, path, key):
+        """
+        Reads only the conflict with the given key from the MergedIndex serialised at the given path.
+        Returns None if there is no such conflict.
+        """
+        if not _is_merged_index_db(path):
+            return cls._read_legacy_index(path).conflicts.get(key)
+
+        with _merged_index_db(path) as db:
+            rows = db.execute(
+                "SELECT version, path, id, mode FROM conflicts WHERE key = ?;", (key,)
+            ).fetchall()
+        if not rows:
+            return None
+        return AncestorOursTheirs.partial(
+            **{version: cls._entry_from_row(row) for version, *row in rows}
+        )
+
+    @classmethod
+    def read_resolve(cls, path, key):
+        """
+        Reads only the resolve for the conflict with the given key from the MergedIndex serialised at the given path.
+        Returns None if that conflict is not resolved.
+        """
+        if not _is_merged_index_db(path):
+            return cls._read_legacy_index(path).resolves.get(key)
+
+        with _merged_index_db(path) as db:
+            if not db.execute(
+                "SELECT 1 FROM resolves WHERE key = ?;", (key,)
+            ).fetchone():
+                return None
+            return [
+                cls._entry_from_row(row)
+                for row in db.execute(
+                    "SELECT path, id, mode FROM resolve_entries WHERE key = ? ORDER BY i;",
+                    (key,),
+                )
+            ]
+
+    def write(self, path):
+        """
+        Serialise this MergedIndex to the given path, as a sqlite database - see MergedIndexTables.
+        Regular entries, conflicts, and resolves are each serialised separately,
+        so that they can be roundtripped accurately.
+        """
+        path = Path(path)
+        # Write to a temporary file and then move it into place, so that the file at path is never half-written.
+        temp_path = path.with_name(f"{path.name}.tmp")
+        if temp_path.exists():
+            temp_path.unlink()
+        _create_merged_index_db(temp_path)
+
+        with _merged_index_db(temp_path) as db:
+            if self.tree is not None:
+                db.execute(
+                    "INSERT INTO merged_index_state (key, value) VALUES ('tree', ?);",
+                    (str(self.tree),),
+                )
+            db.executemany(
+                "INSERT INTO entries (path, id, mode) VALUES (?, ?, ?);",
+                (self._entry_to_row(e) for e in self.entries.values()),
+            )
+            db.executemany(
+                "INSERT INTO conflicts (key, version, path, id, mode) VALUES (?, ?, ?, ?, ?);",
+                (
+                    (key, version, *self._entry_to_row(entry))
+                    for key, conflict in self.conflicts.items()
+                    for version, entry in zip(AncestorOursTheirs.NAMES, conflict)
+                    if entry
+                ),
+            )
+            self._write_resolves(db, self.resolves.keys())
+
+        os.replace(temp_path, path)
+
+    def write_to_repo(self, repo):
+        """Serialise this MergedIndex to the MERGED_INDEX file in the given repo."""
+        self.write(repo.gitdir_file(MERGED_INDEX))
+
+    def write_resolves(self, path, keys):
+        """
+        Updates only the resolves for the conflicts with the given keys, in the MergedIndex serialised at the given
+        path, so that they match the resolves of this MergedIndex. The rest of the file is not rewritten - it is
+        assumed to already match this MergedIndex, ie, that this MergedIndex was read from that path.
+        """
+        if not _is_merged_index_db(path):
+            # Written by an older version of Kart - convert it to the current format.
+            self.write(path)
+            return
+
+        with _merged_index_db(path) as db:
+            db.executemany(
+                "DELETE FROM resolves WHERE key = ?;", ((key,) for key in keys)
+            )
+            db.executemany(
+                "DELETE FROM resolve_entries WHERE key = ?;", ((key,) for key in keys)
+            )
+            self._write_resolves(db, [key for key in keys if key in self.resolves])
+
+    def write_resolves_to_repo(self, repo, keys):
+        """Updates only the resolves for the given keys in the MERGED_INDEX file in the given repo."""
+        self.write_resolves(repo.gitdir_file(MERGED_INDEX), keys)
+
+    def _write_resolves(self, db, keys):
+        # We always write a row to resolves for each resolve, even when the resolve
+        # has no features - otherwise it would appear to be unresolved.
+        db.executemany("INSERT INTO resolves (key) VALUES (?);", ((k,) for k in keys))
+        db.executemany(
+            "INSERT INTO resolve_entries (key, i, path, id, mode) VALUES (?, ?, ?, ?, ?);",
+            (
+                (key, i, *self._entry_to_row(entry))
+                for key in keys
+                for i, entry in enumerate(self.resolves[key])
+            ),
+        )
+
+    @classmethod
+    def _entry_to_row(cls, entry):
+        return entry.path, entry.id.raw, entry.mode
+
+    @classmethod
+    def _entry_from_row(cls, row):
+        path, raw_id, mode = row
+        return cls.Entry(path, pygit2.Oid(raw=raw_id), mode)
+
+    # Older versions of Kart serialised a MergedIndex as a pygit2.Index - with conflicts in a special .conflicts/
+    # directory, resolves in a special .resolves/ directory, and the tree of a sparse MergedIndex at this path:
+    _TREE_PATH = ".merged-tree"
+
+    @classmethod
+    def _read_legacy_index(cls, path):
         index = pygit2.Index(str(path))
         if index.conflicts:
             raise RuntimeError("pygit2.Index conflicts should be empty")
         entries = {}
         conflicts = {}
         resolves = {}
+        tree = None
         for e in index:
-            if e.path.startswith(".conflicts/"):
+            if e.path == cls._TREE_PATH:
+                tree = e.id
+            elif e.path.startswith(".conflicts/"):
                 key, conflict_part = cls._deserialise_conflict_part(e)
                 conflicts.setdefault(key, AncestorOursTheirs.EMPTY)
                 conflicts[key] |= conflict_part
@@ -287,33 +517,7 @@ class MergedIndex:
             else:
                 entries[e.path] = cls._ensure_entry(e)
 
-        return MergedIndex(entries, conflicts, resolves)
-
-    @classmethod
-    def read_from_repo(cls, repo):
-        """Deserialise a MergedIndex from the MERGED_INDEX file in the given repo."""
-        return cls.read(repo.gitdir_file(MERGED_INDEX))
-
-    def write(self, path):
-        """
-        Serialise this MergedIndex to the given path.
-        Regular entries, conflicts, and resolves are each serialised separately,
-        so that they can be roundtripped accurately.
-        """
-        index = pygit2.Index(str(path))
-        index.clear()
-
-        for e in self.entries.values():
-            index.add(pygit2.IndexEntry(e.path, e.id, e.mode))
-        for e in self._serialise_conflicts():
-            index.add(pygit2.IndexEntry(e.path, e.id, e.mode))
-        for e in self._serialise_resolves():
-            index.add(pygit2.IndexEntry(e.path, e.id, e.mode))
-        index.write()
-
-    def write_to_repo(self, repo):
-        """Serialise this MergedIndex to the MERGED_INDEX file in the given repo."""
-        self.write(repo.gitdir_file(MERGED_INDEX))
+        return MergedIndex(entries, conflicts, resolves, tree=tree)
 
     def write_resolved_tree(self, repo, resolve_conflict_fn=None):
         """
@@ -326,6 +530,11 @@ class MergedIndex:
         if resolve_conflict_fn is None:
             assert not unresolved_conflicts
 
+        if self.tree is not None:
+            return self._write_resolved_sparse_tree(
+                repo, unresolved_conflicts, resolve_conflict_fn
+            )
+
         index = pygit2.Index()
 
         # Entries that were merged automatically by libgit2, often trivially:
@@ -348,6 +557,24 @@ class MergedIndex:
 
         return index.write_tree(repo, write_merged_index_flags(repo))
 
+    def _write_resolved_sparse_tree(
+        self, repo, unresolved_conflicts, resolve_conflict_fn
+    ):
+        # Conflicts have already been left out of self.tree, so we need only add the merged entries and resolves.
+        object_builder = ObjectBuilder(repo, repo[self.tree])
+        for e in self.entries.values():
+            object_builder.insert(e.path, e.id, mode=e.mode)
+
+        if resolve_conflict_fn and unresolved_conflicts:
+            for c in unresolved_conflicts.values():
+                for e in resolve_conflict_fn(c):
+                    object_builder.insert(e.path, e.id, mode=e.mode)
+
+        for e in self._resolves_entries():
+            object_builder.insert(e.path, e.id, mode=e.mode)
+
+        return object_builder.flush().id
+
     @classmethod
     def _ensure_entry(cls, entry):
         if entry is None or isinstance(entry, cls.Entry):
@@ -380,6 +607,212 @@ class MergedIndex:
         return [cls._ensure_entry(e) for e in resolve]
 
 
+class MergedIndexTables(TableSet):
+    """Tables for serialising a MergedIndex - see MergedIndex.write."""
+
+    def __init__(self):
+        super().__init__()
+
+        # "merged_index_state" has a row for each property of the MergedIndex that isn't a collection -
+        # currently just "tree", the hex ID of the tree of a sparse MergedIndex (see MergedIndex.from_tree_merge).
+        self.merged_index_state = Table(
+            "merged_index_state",
+            self.sqlalchemy_metadata,
+            Column("key", Text, nullable=False, primary_key=True),
+            Column("value", Text, nullable=False),
+        )
+
+        # In each of the following tables, an entry is stored as a path, a blob ID (in binary, 20 bytes) and a mode.
+        self.entries = Table(
+            "entries",
+            self.sqlalchemy_metadata,
+            Column("path", Text, nullable=False, primary_key=True),
+            Column("id", BLOB, nullable=False),
+            Column("mode", Integer, nullable=False),
+            sqlite_with_rowid=False,
+        )
+
+        # "conflicts" has a row for each version - ancestor, ours, or theirs - of each conflict, keyed by conflict key.
+        self.conflicts = Table(
+            "conflicts",
+            self.sqlalchemy_metadata,
+            Column("key", Text, nullable=False, primary_key=True),
+            Column("version", Text, nullable=False, primary_key=True),
+            Column("path", Text, nullable=False),
+            Column("id", BLOB, nullable=False),
+            Column("mode", Integer, nullable=False),
+            sqlite_with_rowid=False,
+        )
+
+        # "resolves" has a row for each resolved conflict, and "resolve_entries" has a row for each entry that
+        # the conflict was resolved to - which may be none at all, if it was resolved by deleting it.
+        self.resolves = Table(
+            "resolves",
+            self.sqlalchemy_metadata,
+            Column("key", Text, nullable=False, primary_key=True),
+            sqlite_with_rowid=False,
+        )
+        self.resolve_entries = Table(
+            "resolve_entries",
+            self.sqlalchemy_metadata,
+            Column("key", Text, nullable=False, primary_key=True),
+            Column("i", Integer, nullable=False, primary_key=True),
+            Column("path", Text, nullable=False),
+            Column("id", BLOB, nullable=False),
+            Column("mode", Integer, nullable=False),
+            sqlite_with_rowid=False,
+        )
+
+
+MergedIndexTables.copy_tables_to_class()
+
+_SQLITE_HEADER = b"SQLite format 3\0"
+
+
+def _is_merged_index_db(path):
+    with open(path, "rb") as f:
+        return f.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER
+
+
+def _create_merged_index_db(db_path):
+    engine = sqlite_engine(str(db_path))
+    with sessionmaker(bind=engine)() as sess:
+        MergedIndexTables.create_all(sess)
+        sess.commit()
+    engine.dispose()
+
+
+@contextlib.contextmanager
+def _merged_index_db(db_path):
+    """Context manager giving a connection to a serialised MergedIndex - commits on success."""
+    db = sqlite.connect(str(db_path))
+    try:
+        with db:
+            yield db
+    finally:
+        db.close()
+
+
+class _LazyResolves(MutableMapping):
+    """
+    The resolves of a MergedIndex serialised at the given path, where the keys are known up front but the entries of
+    each resolve are only read when that resolve is accessed. Resolves that are added or replaced are kept in memory.
+    """
+
+    _NOT_READ = object()
+
+    def __init__(self, path, keys):
+        self._path = path
+        self._resolves = dict.fromkeys(keys, self._NOT_READ)
+
+    def __getitem__(self, key):
+        resolve = self._resolves[key]
+        if resolve is self._NOT_READ:
+            resolve = MergedIndex.read_resolve(self._path, key)
+            self._resolves[key] = resolve
+        return resolve
+
+    def __setitem__(self, key, resolve):
+        self._resolves[key] = resolve
+
+    def __delitem__(self, key):
+        del self._resolves[key]
+
+    def __iter__(self):
+        return iter(self._resolves)
+
+    def __len__(self):
+        return len(self._resolves)
+
+    def __contains__(self, key):
+        return key in self._resolves
+
+
+class _UnsupportedTreeMerge(Exception):
+    """Raised by _merge_trees3 when it finds something it can't merge - see MergedIndex.from_tree_merge."""
+
+
+def _merge_trees3(trees3, path, changes, conflicts):
+    """
+    Three-way merges the given AncestorOursTheirs of trees (any of which can be None) found at the given path.
+    Appends (path, value) to changes for every change that must be made to ours to get the merged tree - where
+    value is a pygit2.Tree, a MergedIndex.Entry of a blob, or None to delete it - and appends an AncestorOursTheirs
+    of MergedIndex.Entry to conflicts for every conflict. Conflicted blobs are left out of the merged tree.
+    Returns True if the merged tree is non-empty.
+    """
+    children3 = trees3.map(lambda tree: {obj.name: obj for obj in tree})
+
+    def sort_key(name):
+        # Git sorts trees as if their names end with "/" - which means we find conflicts in the same order as their
+        # paths would be in an index.
+        for children in children3:
+            if children and name in children:
+                return f"{name}/" if children[name].type_str == "tree" else name
+
+    all_names = set()
+    for children in children3:
+        if children:
+            all_names.update(children)
+
+    result_is_empty = True
+    for name in sorted(all_names, key=sort_key):
+        ancestor, ours, theirs = (
+            children.get(name) if children else None for children in children3
+        )
+        # A change to just the filemode of a blob is a change too.
+        ancestor_key, ours_key, theirs_key = (
+            (obj.id, obj.filemode) if obj is not None else None
+            for obj in (ancestor, ours, theirs)
+        )
+        child_path = f"{path}{name}"
+
+        if ours_key == theirs_key or ancestor_key == theirs_key:
+            # Either both sides made the same change, or only ours changed.
+            merged_is_empty = ours is None
+        elif ancestor_key == ours_key:
+            # Only theirs changed.
+            if theirs is None:
+                changes.append((child_path, None))
+            elif theirs.type_str == "tree":
+                changes.append((child_path, theirs))
+            else:
+                entry = MergedIndex.Entry(child_path, theirs.id, theirs.filemode)
+                changes.append((child_path, entry))
+            merged_is_empty = theirs is None
+        else:
+            types = {
+                obj.type_str for obj in (ancestor, ours, theirs) if obj is not None
+            }
+            if types == {"tree"}:
+                child_trees3 = AncestorOursTheirs(ancestor, ours, theirs)
+                merged_is_empty = not _merge_trees3(
+                    child_trees3, f"{child_path}/", changes, conflicts
+                )
+                if merged_is_empty and ours is not None:
+                    changes.append((child_path, None))
+            elif types == {"blob"}:
+                conflicts.append(
+                    AncestorOursTheirs(
+                        *(
+                            MergedIndex.Entry(child_path, obj.id, obj.filemode)
+                            if obj is not None
+                            else None
+                            for obj in (ancestor, ours, theirs)
+                        )
+                    )
+                )
+                if ours is not None:
+                    changes.append((child_path, None))
+                merged_is_empty = True
+            else:
+                raise _UnsupportedTreeMerge(child_path)
+
+        if not merged_is_empty:
+            result_is_empty = False
+
+    return not result_is_empty
+
+
 class VersionContext:
     """
     The necessary context for categorising or outputting a single version of a conflict.
@@ -62,10 +62,18 @@ class ObjectBuilder:
         finally:
             self.cur_path = self.path_stack.pop()
 
-    def insert(self, path, writeable):
-        """Writes the given data - a tree, a blob, a bytes, or None - at the given relative path."""
+    def insert(self, path, writeable, mode=None):
+        """
+        Writes the given data - a tree, a blob, a bytes, or None - at the given relative path.
+        An existing blob can also be written by passing just its pygit2.Oid - it is written with the given mode
+        if one is given, or as a regular file (pygit2.GIT_FILEMODE_BLOB) otherwise.
+        """
         path = self._resolve_path(path)
         self._ensure_writeable(writeable)
+        if mode is not None:
+            if not isinstance(writeable, pygit2.Oid):
+                raise ValueError("A mode can only be given when writing a pygit2.Oid")
+            writeable = (writeable, mode)
 
         cur_dict = self.root_dict
         for name in path[:-1]:
@@ -102,7 +110,8 @@ class ObjectBuilder:
 
     def _ensure_writeable(self, writeable):
         if not isinstance(
-            writeable, (pygit2.Tree, pygit2.Blob, bytes, bytearray, type(None))
+            writeable,
+            (pygit2.Tree, pygit2.Blob, pygit2.Oid, bytes, bytearray, type(None)),
         ):
             raise ValueError(f"Expected a writeable type but found {type(writeable)}")
 
@@ -111,7 +120,8 @@ def copy_and_modify_tree(repo, tree, changes):
     """
     Given a tree, and a nested dictionary of changes to be made to that tree, returns a modified copy of that tree.
     Each dicts keys are path components, and the leaf values must be the desired new value at that path -
-    either pygit2.Tree, a pygi2.Blob, a bytes, or None (None means delete the data at the specified path).
+    either pygit2.Tree, a pygi2.Blob, a pygit2.Oid of a blob, a tuple (pygit2.Oid of a blob, filemode), a bytes,
+    or None (None means delete the data at the specified path).
     Conflicts are not detected.
     """
     if tree is None:
@@ -132,6 +142,11 @@ def copy_and_modify_tree(repo, tree, changes):
             tree_builder.insert(name, new_value.oid, pygit2.GIT_FILEMODE_TREE)
         elif isinstance(new_value, pygit2.Blob):
             tree_builder.insert(name, new_value.oid, pygit2.GIT_FILEMODE_BLOB)
+        elif isinstance(new_value, pygit2.Oid):
+            tree_builder.insert(name, new_value, pygit2.GIT_FILEMODE_BLOB)
+        elif isinstance(new_value, tuple):
+            blob_oid, mode = new_value
+            tree_builder.insert(name, blob_oid, mode)
         elif isinstance(new_value, bytes):
             blob_oid = repo.create_blob(new_value)
             tree_builder.insert(name, blob_oid, pygit2.GIT_FILEMODE_BLOB)
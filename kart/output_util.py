@@ -21,6 +21,9 @@ JSON_PARAMS = {
     "extracompact": {"separators": (",", ":")},
 }
 
+# How much JSON to collect before writing it to the output stream, when the output isn't highlit.
+JSON_OUTPUT_CHUNK_SIZE = 64 * 1024
+
 
 class SerializableGenerator(list):
     """Generator that is serializable by JSON"""
@@ -203,8 +206,17 @@ def dump_json_output(
             fp.write(pygments.format(token_generator, get_terminal_formatter()))
 
     else:
+        # iterencode yields lots of tiny chunks - collect them and write them to the stream in large blocks.
+        buffer = []
+        buffer_size = 0
         for chunk in json_encoder.iterencode(output):
-            fp.write(chunk)
+            buffer.append(chunk)
+            buffer_size += len(chunk)
+            if buffer_size >= JSON_OUTPUT_CHUNK_SIZE:
+                fp.write("".join(buffer))
+                buffer.clear()
+                buffer_size = 0
+        fp.write("".join(buffer))
     fp.write("\n")
 
 
@@ -0,0 +1,254 @@
+import mmap
+import struct
+from pathlib import Path
+
+# Reads the public header block and the (extended) variable length records of a LAS 1.x / LAZ / COPC file,
+# without spawning a PDAL process. Only the fields that Kart stores in format.json, schema.json, crs.wkt
+# and the tile pointer file are extracted - the point data itself is never read.
+
+# The header format is documented here:
+# https://www.asprs.org/wp-content/uploads/2019/07/LAS_1_4_r15.pdf
+# And the COPC info VLR here:
+# https://copc.io/
+
+
+class UnsupportedLasHeader(Exception):
+    """
+    Raised when a LAS file is valid (as far as we know) but uses some feature that this parser doesn't handle -
+    the caller should fall back to reading the file using PDAL.
+    """
+
+
+LAS_SIGNATURE = b"LASF"
+
+# Offsets and formats of the header fields that we need.
+# LAS 1.0 - 1.2 headers are 227 bytes, LAS 1.3 headers are 235 bytes, LAS 1.4 headers are 375 bytes.
+_HEADER_1_0 = struct.Struct(
+    "<4s"  # 0: File signature
+    "H"  # 4: File source ID
+    "H"  # 6: Global encoding
+    "16s"  # 8: Project ID (GUID)
+    "B"  # 24: Version major
+    "B"  # 25: Version minor
+    "32s"  # 26: System identifier
+    "32s"  # 58: Generating software
+    "H"  # 90: File creation day of year
+    "H"  # 92: File creation year
+    "H"  # 94: Header size
+    "I"  # 96: Offset to point data
+    "I"  # 100: Number of variable length records
+    "B"  # 104: Point data record format
+    "H"  # 105: Point data record length
+    "I"  # 107: Legacy number of point records
+    "20s"  # 111: Legacy number of points by return
+    "3d"  # 131: X, Y, Z scale factors
+    "3d"  # 155: X, Y, Z offsets
+    "6d"  # 179: Max X, Min X, Max Y, Min Y, Max Z, Min Z
+)
+_HEADER_1_4_EXTRA = struct.Struct(
+    "<Q"  # 227: Start of waveform data packet record
+    "Q"  # 235: Start of first extended variable length record
+    "I"  # 243: Number of extended variable length records
+    "Q"  # 247: Number of point records
+)
+_HEADER_1_4_EXTRA_OFFSET = 227
+
+_VLR_HEADER = struct.Struct(
+    "<H"  # Reserved
+    "16s"  # User ID
+    "H"  # Record ID
+    "H"  # Record length after header
+    "32s"  # Description
+)
+_EVLR_HEADER = struct.Struct(
+    "<H"  # Reserved
+    "16s"  # User ID
+    "H"  # Record ID
+    "Q"  # Record length after header
+    "32s"  # Description
+)
+
+# Well-known VLRs - (user_id, record_id)
+LASF_PROJECTION = "LASF_Projection"
+OGC_WKT_RECORD_ID = 2112
+GEOKEY_DIRECTORY_RECORD_ID = 34735
+
+LASF_SPEC = "LASF_Spec"
+EXTRA_BYTES_RECORD_ID = 4
+
+COPC_USER_ID = "copc"
+COPC_INFO_RECORD_ID = 1
+
+LASZIP_USER_ID = "laszip encoded"
+LASZIP_RECORD_ID = 22204
+
+# The point data record formats that PDAL (and therefore Kart) knows how to load.
+SUPPORTED_PDRFS = (0, 1, 2, 3, 6, 7, 8)
+
+
+def _decode_str(raw_bytes):
+    return raw_bytes.split(b"\0", 1)[0].decode("ascii", errors="replace")
+
+
+def _pdal_double(value):
+    """
+    PDAL outputs doubles in its metadata with 15 significant digits - so for example -1.6600000000000001 is output as
+    -1.66. We do the same so that the extents we store are the same as they would be if PDAL had read the header.
+    """
+    return float(f"{value:.15g}")
+
+
+def _read_vlrs(read_at, file_size, offset, count, header_struct):
+    """
+    Yields (user_id, record_id, data_offset, data_length) for each VLR or EVLR starting at the given offset.
+    Only the record headers are read - the caller can read the data of any records it is interested in.
+    """
+    for _ in range(count):
+        if offset + header_struct.size > file_size:
+            raise UnsupportedLasHeader("Truncated variable length record")
+        _, user_id, record_id, record_length, _ = header_struct.unpack(
+            read_at(offset, header_struct.size)
+        )
+        offset += header_struct.size
+        yield _decode_str(user_id), record_id, offset, record_length
+        offset += record_length
+
+
+def read_las_header(path):
+    """
+    Reads the header and VLRs of the LAS / LAZ / COPC file at the given path, and returns the same subset of
+    metadata that PDAL's readers.las outputs as its metadata, which Kart uses.
+
+    Raises UnsupportedLasHeader if the file uses some feature that means it should be read using PDAL instead.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file - can't be mmapped.
+            raise UnsupportedLasHeader("Empty file")
+        try:
+            return _read_las_header(
+                lambda offset, length: buf[offset : offset + length], len(buf)
+            )
+        finally:
+            buf.close()
+
+
+def read_las_header_from_s3(s3_url, size=None):
+    """
+    Like read_las_header, but for a LAS / LAZ / COPC file on S3. Only the byte ranges that contain the header and
+    the (extended) variable length records are fetched - typically a few kilobytes, no matter how big the file is.
+    """
+    from kart.s3_util import S3RangeReader
+
+    reader = S3RangeReader(s3_url, size=size)
+    return _read_las_header(reader.read_at, reader.size)
+
+
+def _read_las_header(read_at, file_size):
+    """
+    Parses the header of a LAS file, given a function read_at(offset, length) that returns that range of the file
+    as bytes, and the total size of the file.
+    """
+    # The largest header we need to parse is the LAS 1.4 header - older headers are a prefix of it.
+    buf = read_at(0, min(file_size, _HEADER_1_4_EXTRA_OFFSET + _HEADER_1_4_EXTRA.size))
+    if len(buf) < _HEADER_1_0.size or buf[0:4] != LAS_SIGNATURE:
+        raise UnsupportedLasHeader("Not a LAS file")
+
+    (
+        _,
+        _,
+        _,
+        _,
+        major_version,
+        minor_version,
+        _,
+        _,
+        _,
+        _,
+        header_size,
+        _,
+        num_vlrs,
+        raw_pdrf,
+        point_length,
+        legacy_point_count,
+        _,
+        *scale_and_offset,
+        maxx,
+        minx,
+        maxy,
+        miny,
+        maxz,
+        minz,
+    ) = _HEADER_1_0.unpack_from(buf, 0)
+
+    if major_version != 1 or minor_version > 4:
+        raise UnsupportedLasHeader(
+            f"Unsupported LAS version {major_version}.{minor_version}"
+        )
+
+    # The top two bits of the PDRF are used by LASzip to flag compressed data.
+    is_compressed = bool(raw_pdrf & 0xC0)
+    pdrf = raw_pdrf & 0x3F
+    if pdrf not in SUPPORTED_PDRFS:
+        raise UnsupportedLasHeader(f"Unsupported point data record format {pdrf}")
+
+    point_count = legacy_point_count
+    num_evlrs = 0
+    evlr_offset = 0
+    if minor_version >= 4:
+        min_header_size = _HEADER_1_4_EXTRA_OFFSET + _HEADER_1_4_EXTRA.size
+        if header_size < min_header_size or len(buf) < min_header_size:
+            raise UnsupportedLasHeader("Truncated LAS 1.4 header")
+        _, evlr_offset, num_evlrs, point_count = _HEADER_1_4_EXTRA.unpack_from(
+            buf, _HEADER_1_4_EXTRA_OFFSET
+        )
+
+    vlrs = list(_read_vlrs(read_at, file_size, header_size, num_vlrs, _VLR_HEADER))
+    if num_evlrs and evlr_offset:
+        vlrs += list(
+            _read_vlrs(read_at, file_size, evlr_offset, num_evlrs, _EVLR_HEADER)
+        )
+
+    wkt = None
+    has_geokeys = False
+    is_copc = False
+    for i, (user_id, record_id, data_offset, data_length) in enumerate(vlrs):
+        if user_id == LASF_PROJECTION and record_id == OGC_WKT_RECORD_ID:
+            wkt = _decode_str(read_at(data_offset, data_length)).strip() or None
+        elif user_id == LASF_PROJECTION and record_id == GEOKEY_DIRECTORY_RECORD_ID:
+            has_geokeys = True
+        elif user_id == LASF_SPEC and record_id == EXTRA_BYTES_RECORD_ID:
+            # Extra dimensions change the schema in ways that we leave PDAL to describe.
+            raise UnsupportedLasHeader("File has extra bytes")
+        elif user_id == COPC_USER_ID and record_id == COPC_INFO_RECORD_ID and i == 0:
+            # COPC requires that the COPC info VLR is the first VLR.
+            is_copc = True
+        elif user_id == LASZIP_USER_ID and record_id == LASZIP_RECORD_ID:
+            is_compressed = True
+
+    if wkt is None:
+        # CRS is either stored as GeoTIFF keys, which need to be converted to WKT, or is missing entirely.
+        # Either way, PDAL knows best what to do.
+        raise UnsupportedLasHeader(
+            "CRS is stored as GeoTIFF keys" if has_geokeys else "No CRS found"
+        )
+
+    return {
+        "major_version": major_version,
+        "minor_version": minor_version,
+        "dataformat_id": pdrf,
+        "point_length": point_length,
+        "compressed": is_compressed,
+        "copc": is_copc,
+        "count": point_count,
+        "minx": _pdal_double(minx),
+        "maxx": _pdal_double(maxx),
+        "miny": _pdal_double(miny),
+        "maxy": _pdal_double(maxy),
+        "minz": _pdal_double(minz),
+        "maxz": _pdal_double(maxz),
+        "wkt": wkt,
+    }
@@ -7,15 +7,21 @@ from subprocess import CalledProcessError
 
 from osgeo import osr
 
-from kart.crs_util import normalise_wkt
+from kart.crs_util import make_transform, normalise_wkt
 from kart.exceptions import (
     InvalidOperation,
     INVALID_FILE_FORMAT,
 )
 from kart.list_of_conflicts import ListOfConflicts
 from kart.lfs_util import get_hash_and_size_of_file
+from kart.s3_util import fetch_from_s3
 from kart.geometry import ring_as_wkt
 from kart.point_cloud import pdal_execute_pipeline
+from kart.point_cloud.las_header import (
+    read_las_header,
+    read_las_header_from_s3,
+    UnsupportedLasHeader,
+)
 from kart.point_cloud.schema_util import (
     get_schema_from_pdrf,
     get_record_length_from_pdrf,
@@ -143,7 +149,7 @@ def get_native_extent(info):
 
 def extract_pc_tile_metadata(pc_tile_path, oid_and_size=None):
     """
-    Use pdal to get any and all point-cloud metadata we can make use of in Kart.
+    Get any and all point-cloud metadata we can make use of in Kart.
     This includes metadata that must be dataset-homogenous and would be stored in the dataset's /meta/ folder,
     along with other metadata that is tile-specific and would be stored in the tile's pointer file.
 
@@ -160,32 +166,40 @@ def extract_pc_tile_metadata(pc_tile_path, oid_and_size=None):
     describe *all* of the tiles in that dataset. The "tile" field is where we keep all information
     that can be different for every tile in the dataset, which is why it must be stored in pointer files.
 
+    Tiles are read directly by Kart's own LAS header parser, which avoids the cost of spawning a PDAL process
+    for every tile - and for tiles on S3, only fetches the ranges of the file that contain the header and VLRs.
+    Anything the parser doesn't handle (GeoTIFF-key CRSs, extra-bytes dimensions, etc) falls back to PDAL
+    (which for tiles on S3, means downloading the whole tile first).
+
     pc_tile_path - a pathlib.Path or a string containing the path to a file or an S3 url.
     oid_and_size - a tuple (sha256_oid, filesize) if already known, to avoid repeated work.
     """
     pc_tile_path = str(pc_tile_path)
 
-    pipeline = [
-        {
-            "type": "readers.las",
-            "filename": pc_tile_path,
-            "count": 0,  # Don't read any individual points.
-        },
-        {"type": "filters.info"},
-    ]
-
+    is_s3 = pc_tile_path.startswith("s3://")
+    info = None
     try:
-        metadata = pdal_execute_pipeline(pipeline)
-    except CalledProcessError:
-        raise InvalidOperation(
-            f"Error reading {pc_tile_path}", exit_code=INVALID_FILE_FORMAT
-        )
-
-    info = metadata["readers.las"]
+        if is_s3:
+            size = oid_and_size[1] if oid_and_size else None
+            info = read_las_header_from_s3(pc_tile_path, size=size)
+        else:
+            info = read_las_header(pc_tile_path)
+    except UnsupportedLasHeader as e:
+        L.debug("Reading %s using PDAL: %s", pc_tile_path, e)
+
+    if info is not None:
+        compound_crs = info["wkt"]
+        horizontal_crs = get_horizontal_wkt(compound_crs)
+        schema_json = get_schema_from_pdrf(info["dataformat_id"])
+    else:
+        if is_s3:
+            info, schema_json = _extract_s3_pc_tile_info_using_pdal(pc_tile_path)
+        else:
+            info, schema_json = _extract_pc_tile_info_using_pdal(pc_tile_path)
+        compound_crs = info["srs"].get("compoundwkt")
+        horizontal_crs = info["srs"].get("wkt")
 
     native_extent = get_native_extent(info)
-    compound_crs = info["srs"].get("compoundwkt")
-    horizontal_crs = info["srs"].get("wkt")
     is_copc = info.get("copc") or False
     format_json = {
         "compression": "laz" if info["compressed"] else "las",
@@ -196,7 +210,6 @@ def extract_pc_tile_metadata(pc_tile_path, oid_and_size=None):
         "pointDataRecordLength": info["point_length"],
     }
 
-    schema_json = pdal_schema_to_kart_schema(metadata["filters.info"]["schema"])
     if oid_and_size:
         oid, size = oid_and_size
     else:
@@ -231,6 +244,54 @@ def extract_pc_tile_metadata(pc_tile_path, oid_and_size=None):
     return result
 
 
+def _extract_pc_tile_info_using_pdal(pc_tile_path):
+    """
+    Use pdal to read the header of the given tile. Returns a tuple (info, schema_json) where info is the
+    readers.las metadata as output by PDAL.
+    """
+    pipeline = [
+        {
+            "type": "readers.las",
+            "filename": pc_tile_path,
+            "count": 0,  # Don't read any individual points.
+        },
+        {"type": "filters.info"},
+    ]
+
+    try:
+        metadata = pdal_execute_pipeline(pipeline)
+    except CalledProcessError:
+        raise InvalidOperation(
+            f"Error reading {pc_tile_path}", exit_code=INVALID_FILE_FORMAT
+        )
+
+    info = metadata["readers.las"]
+    schema_json = pdal_schema_to_kart_schema(metadata["filters.info"]["schema"])
+    return info, schema_json
+
+
+def _extract_s3_pc_tile_info_using_pdal(s3_url):
+    """Like _extract_pc_tile_info_using_pdal, but first downloads the tile from S3 to a temporary file."""
+    tmp_downloaded_tile = fetch_from_s3(s3_url)
+    try:
+        return _extract_pc_tile_info_using_pdal(str(tmp_downloaded_tile))
+    finally:
+        tmp_downloaded_tile.unlink()
+
+
+def get_horizontal_wkt(wkt):
+    """
+    Given the WKT of a CRS which may be a compound CRS, returns the WKT of only the horizontal part -
+    much like PDAL does when it outputs "wkt" as well as "compoundwkt".
+    """
+    srs = osr.SpatialReference()
+    srs.ImportFromWkt(wkt)
+    if not srs.IsCompound() or not hasattr(srs, "StripVertical"):
+        return wkt
+    srs.StripVertical()
+    return srs.ExportToWkt()
+
+
 def _format_list_as_str(array):
     """
     We treat a pointer file as a place to store JSON, but its really for storing string-string key-value pairs only.
@@ -266,7 +327,7 @@ def _calc_crs84_extent(src_extent, src_crs):
     dest_srs = osr.SpatialReference()
     dest_srs.SetWellKnownGeogCS("CRS84")
 
-    transform = osr.CoordinateTransformation(src_srs, dest_srs)
+    transform = make_transform(src_srs, dest_srs)
     min_x, max_x, min_y, max_y, min_z, max_z = src_extent
     result = transform.TransformPoints(
         [
@@ -123,11 +123,22 @@ class FetchPromisedBlobsProcess:
             # we'll deal with it below
             pass
 
-    def finish(self):
+    def close(self):
+        """
+        Signals that no more blobs will be requested. git fetch doesn't start fetching until it has read all
+        of its input, so this starts the fetch without waiting for it to complete.
+        """
         try:
             self.proc.stdin.close()
         except (BrokenPipeError, OSError):
             pass
+
+    @property
+    def is_running(self):
+        return self.proc.poll() is None
+
+    def finish(self):
+        self.close()
         self.proc.wait()
         return_code = self.proc.returncode
         if return_code != 0:
@@ -143,7 +154,89 @@ def fetch_promised_blobs_process(repo):
     fetch_proc.finish()
 
 
-def fetch_promised_blobs(repo, promised_blob_ids):
-    with fetch_promised_blobs_process(repo) as p:
+class PromisedBlobsPrefetch:
+    """
+    Fetches promised blobs from the promisor remote, split into chunks that are fetched in parallel by several
+    git fetch processes. A chunk starts fetching in the background as soon as enough blobs have been requested to
+    fill it, so when the caller requests every blob it will need up front, it can get on with decoding the blobs that
+    are already present while the rest arrive. Call start to start fetching any blobs that don't fill a whole chunk,
+    and finish to block until everything requested has been fetched.
+    """
+
+    DEFAULT_MAX_PROCESSES = 4
+    # Each git fetch process has to negotiate with the remote, so a chunk shouldn't be too small.
+    DEFAULT_CHUNK_SIZE = 500
+
+    def __init__(self, repo, promised_blob_ids=(), max_processes=None, chunk_size=None):
+        self.repo = repo
+        self.max_processes = max_processes or self.DEFAULT_MAX_PROCESSES
+        self.chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        self.requested = set()
+        self._pending = []
+        self._processes = []
+        for promised_blob_id in promised_blob_ids:
+            self.fetch(promised_blob_id)
+
+    def __contains__(self, promised_blob_id):
+        return promised_blob_id in self.requested
+
+    def __len__(self):
+        return len(self.requested)
+
+    def fetch(self, promised_blob_id):
+        """Requests the given blob. Blobs that have already been requested are ignored."""
+        if promised_blob_id in self.requested:
+            return
+        self.requested.add(promised_blob_id)
+        self._pending.append(promised_blob_id)
+        if (
+            len(self._pending) >= self.chunk_size
+            and self._num_running() < self.max_processes
+        ):
+            self._start_process(self._pending)
+            self._pending = []
+
+    def start(self):
+        """Starts fetching every blob requested so far, using as many processes as are free (but at least one)."""
+        if not self._pending:
+            return
+        num_free = self.max_processes - self._num_running()
+        num_chunks = max(1, min(num_free, -(-len(self._pending) // self.chunk_size)))
+        chunk_size = -(-len(self._pending) // num_chunks)
+        for i in range(0, len(self._pending), chunk_size):
+            self._start_process(self._pending[i : i + chunk_size])
+        self._pending = []
+
+    def finish(self):
+        """Blocks until every blob that was requested has been fetched."""
+        self.start()
+        errors = []
+        for process in self._processes:
+            try:
+                process.finish()
+            except SubprocessError as e:
+                errors.append(e)
+        self._processes = []
+        if errors:
+            raise errors[0]
+
+    def _num_running(self):
+        return sum(1 for process in self._processes if process.is_running)
+
+    def _start_process(self, promised_blob_ids):
+        process = FetchPromisedBlobsProcess(self.repo)
         for promised_blob_id in promised_blob_ids:
-            p.fetch(promised_blob_id)
+            process.fetch(promised_blob_id)
+        process.close()
+        self._processes.append(process)
+
+
+def fetch_promised_blobs(repo, promised_blob_ids):
+    PromisedBlobsPrefetch(repo, promised_blob_ids).finish()
+
+
+def promised_blob_ids(repo, blobs):
+    """Yields the IDs (as hex strings) of those of the given blobs that aren't present locally."""
+    for blob in blobs:
+        if blob.id not in repo:
+            yield blob.id.hex
@@ -1,3 +1,4 @@
+import contextlib
 from enum import IntFlag
 import logging
 from pathlib import Path
@@ -113,6 +114,29 @@ def _rewrite_format(format_json, rewrite_metadata):
     return format_json
 
 
+@contextlib.contextmanager
+def _gdal_range_read_options(is_remote):
+    """
+    GDAL reads remote (eg /vsis3/) tiles using HTTP range requests, so only the header and the blocks that are needed
+    are fetched. However, by default it also lists the entire "directory" containing the tile when it is opened, to
+    look for sidecar files - for a bucket prefix containing many thousands of tiles, that is far more expensive than
+    reading the tile's header. Sidecar files are still found, by checking for each one individually.
+    """
+    from osgeo import gdal
+
+    if not is_remote:
+        yield
+        return
+
+    option = "GDAL_DISABLE_READDIR_ON_OPEN"
+    old_value = gdal.GetThreadLocalConfigOption(option, None)
+    gdal.SetThreadLocalConfigOption(option, "TRUE")
+    try:
+        yield
+    finally:
+        gdal.SetThreadLocalConfigOption(option, old_value)
+
+
 def extract_raster_tile_metadata(raster_tile_path, oid_and_size=None):
     """
     Use gdalinfo to get any and all raster metadata we can make use of in Kart.
@@ -142,10 +166,13 @@ def extract_raster_tile_metadata(raster_tile_path, oid_and_size=None):
     gdal_path_spec = raster_tile_path
     if gdal_path_spec.startswith("s3://"):
         gdal_path_spec = gdal_path_spec.replace("s3://", "/vsis3/")
-    metadata = gdal.Info(gdal_path_spec, options=["-json", "-norat", "-noct"])
+    is_remote = gdal_path_spec.startswith("/vsi")
 
-    full_check = not gdal_path_spec.startswith("/vsi")
-    warnings, errors, details = validate_cogtiff(gdal_path_spec, full_check=full_check)
+    with _gdal_range_read_options(is_remote):
+        metadata = gdal.Info(gdal_path_spec, options=["-json", "-norat", "-noct"])
+        warnings, errors, details = validate_cogtiff(
+            gdal_path_spec, full_check=not is_remote
+        )
     is_cog = not errors
 
     format_json = {
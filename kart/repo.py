@@ -49,12 +49,24 @@ class KartRepoFiles:
 
     # Kart-specific files:
     MERGE_BRANCH = "MERGE_BRANCH"  # The branch name that we merged with, if any.
-    # An index file containing the current state of the merge, including cleanly merged items, conflicts, and resolutions.
+    # A sqlite database containing the current state of the merge, including cleanly merged items, conflicts, and resolutions.
     MERGED_INDEX = "MERGED_INDEX"
     # A tree containing the current state of the merge - or near enough - it can't store unresolved conflicts:
     MERGED_TREE = "MERGED_TREE"
+    # The progress of an ongoing `kart upgrade`, so that it can be resumed if it is interrupted:
+    UPGRADE_CHECKPOINT = "UPGRADE_CHECKPOINT"
     # A sqlite table that maps each feature SHA to its EPSG:4326 envelope. Used for spatial filtered clones.
     FEATURE_ENVELOPES = "feature_envelopes.db"
+    # A sqlite database indexing the local LFS cache - which blobs it contains, their sizes, and when each was last used.
+    LFS_INDEX = "lfs_index.db"
+    # A sqlite database indexing the extent of every tile in each tile tree. Used for spatially filtering tiles.
+    TILE_EXTENTS = "tile_extents.db"
+    # A sqlite database recording which datasets were changed by each commit. Used by `kart log --dataset-changes`.
+    DATASET_CHANGES = "dataset_changes.db"
+    # A sqlite database of hashes of the source rows of each re-imported dataset. Used by `kart import --replace-existing`.
+    IMPORT_CACHE = "import_cache.db"
+    # A sqlite database recording where the datasets are in recently used root trees. Used by RepoStructure.datasets().
+    STRUCTURE_CACHE = "structure_cache.db"
 
 
 class KartRepoState(Enum):
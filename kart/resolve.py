@@ -92,7 +92,7 @@ def _load_file_resolve_for_feature(rich_conflict, file_path):
 
 
 def _load_file_resolve_for_tile(rich_conflict, file_path):
-    from kart.lfs_util import get_local_path_from_lfs_hash, dict_to_pointer_file_bytes
+    from kart.lfs_util import copy_file_to_local_lfs_cache, dict_to_pointer_file_bytes
 
     tilename = rich_conflict.decoded_path[2]
     dataset = load_dataset(rich_conflict)
@@ -107,10 +107,9 @@ def _load_file_resolve_for_tile(rich_conflict, file_path):
             f"The tile at {rel_tile_path} does not match the dataset's format"
         )
 
-    path_in_lfs_cache = get_local_path_from_lfs_hash(repo, tile_summary["oid"])
-    if not path_in_lfs_cache.is_file():
-        path_in_lfs_cache.parents[0].mkdir(parents=True, exist_ok=True)
-        try_reflink(file_path, path_in_lfs_cache)
+    # This also records the tile in the LFS index.
+    oid_and_size = tile_summary["oid"], tile_summary["size"]
+    copy_file_to_local_lfs_cache(repo, file_path, oid_and_size=oid_and_size)
     pointer_data = dict_to_pointer_file_bytes(tile_summary)
     blob_path = dataset.tilename_to_blob_path(tilename)
     blob_id = repo.create_blob(pointer_data)
@@ -186,6 +185,12 @@ def _load_workingcopy_resolve_for_tile(rich_conflict):
     return _load_file_resolve_for_tile(rich_conflict, matching_files[0])
 
 
+_MULTIPLE_CONFLICTS_NOT_SUPPORTED = (
+    "Sorry, resolving multiple conflicts at once is only supported when using "
+    "--with=ancestor, --with=ours, --with=theirs, --with=delete or --renumber"
+)
+
+
 def find_single_conflict_to_resolve(merged_index, merge_context, conflict_labels):
     """
     Given a single conflict label that the user wants to resolve - eg mydataset:feature:1 -
@@ -198,8 +203,7 @@ def find_single_conflict_to_resolve(merged_index, merge_context, conflict_labels
 
     if len(conflict_labels) > 1:
         raise NotYetImplemented(
-            "Sorry, resolving multiple conflicts at once is not yet supported (except when using --renumber)",
-            exit_code=NO_CONFLICT,
+            _MULTIPLE_CONFLICTS_NOT_SUPPORTED, exit_code=NO_CONFLICT
         )
 
     conflict_label = conflict_labels[0]
@@ -233,8 +237,7 @@ def find_single_conflict_to_resolve(merged_index, merge_context, conflict_labels
             merged_index, merge_context, [conflict_label]
         ):
             raise NotYetImplemented(
-                "Sorry, resolving multiple conflicts at once is not yet supported (except when using --renumber)",
-                exit_code=NO_CONFLICT,
+                _MULTIPLE_CONFLICTS_NOT_SUPPORTED, exit_code=NO_CONFLICT
             )
         else:
             raise NotFound(
@@ -244,6 +247,67 @@ def find_single_conflict_to_resolve(merged_index, merge_context, conflict_labels
     return result
 
 
+def find_conflicts_to_resolve(merged_index, merge_context, conflict_labels):
+    """
+    Given one or more conflict labels that the user wants to resolve - eg mydataset:feature:1 - or filters that
+    match the conflicts they want to resolve - eg mydataset:feature - loads all the matching unresolved conflicts
+    from the merge index, as RichConflicts. A label that exactly matches an unresolved conflict matches only that
+    conflict (this matters for meta-items, which can't be filtered individually - see RichConflictVersion).
+    Raises an error if there are no matching conflicts, or if some of them cannot yet be resolved.
+    """
+    if len(conflict_labels) == 0:
+        raise click.UsageError("Missing argument: CONFLICT_LABEL")
+
+    unresolved_conflicts = {
+        c.label: c
+        for c in rich_conflicts(
+            merged_index.unresolved_conflicts.items(), merge_context
+        )
+    }
+    exact_labels = [l for l in conflict_labels if l in unresolved_conflicts]
+    filters = [l for l in conflict_labels if l not in unresolved_conflicts]
+
+    conflicts = {}
+    for label in exact_labels:
+        conflict = unresolved_conflicts[label]
+        conflicts[conflict.key] = conflict
+    if filters:
+        for conflict in find_multiple_conflicts_to_resolve(
+            merged_index, merge_context, filters
+        ):
+            conflicts.setdefault(conflict.key, conflict)
+
+    if not conflicts:
+        if len(conflict_labels) == 1:
+            conflict_label = conflict_labels[0]
+            resolved_conflicts = rich_conflicts(
+                merged_index.resolved_conflicts.items(), merge_context
+            )
+            if any(c.label == conflict_label for c in resolved_conflicts):
+                raise InvalidOperation(
+                    f"Conflict at {conflict_label} is already resolved"
+                )
+            raise NotFound(
+                f"No conflict found at {conflict_label}", exit_code=NO_CONFLICT
+            )
+        raise NotFound("No matching conflict(s) found", exit_code=NO_CONFLICT)
+
+    # Meta-item conflicts must be resolved before any other conflicts in the same dataset - or at the same time.
+    non_meta_ds_paths = set(
+        c.decoded_path[0] for c in conflicts.values() if c.decoded_path[1] != "meta"
+    )
+    for ds_path in sorted(non_meta_ds_paths):
+        meta_conflicts = find_multiple_conflicts_to_resolve(
+            merged_index, merge_context, [f"{ds_path}:meta"]
+        )
+        if any(c.key not in conflicts for c in meta_conflicts):
+            raise InvalidOperation(
+                f"There are still unresolved meta-item conflicts for dataset {ds_path}. These need to be resolved first."
+            )
+
+    return list(conflicts.values())
+
+
 def find_multiple_conflicts_to_resolve(merged_index, merge_context, user_key_filters):
     """
     Given filters that match the conflicts the user wants to resolve - eg mydataset:feature -
@@ -259,51 +323,91 @@ def find_multiple_conflicts_to_resolve(merged_index, merge_context, user_key_fil
     return conflicts
 
 
-def update_workingcopy_with_resolve(
-    repo, merged_index, merge_context, rich_conflict, res
-):
-    ds_part = rich_conflict.decoded_path[1]
-    if ds_part == "meta":
+def update_workingcopy_with_resolves(repo, merge_context, resolves):
+    """
+    Updates the working copy to contain the given resolves - a list of (rich_conflict, res) tuples, where each res is
+    the list of entries that the conflict was resolved to. All the resolves are applied in one go: the features or
+    tiles of all the conflicts are deleted from the working copy, and then the resolved versions are written in
+    their place - except that if any meta-item conflict is resolved, the entire working copy is reset to the
+    merged tree instead (which contains all the resolves so far).
+    """
+    if any(rich_conflict.decoded_path[1] == "meta" for rich_conflict, res in resolves):
         # If a meta conflict has been resolved, we update the merged_tree and then reset the WC to it.
+        # This needs every entry of the merged index - which has already been updated to contain the resolves.
+        merged_index = MergedIndex.read_from_repo(repo)
         working_copy_merger = WorkingCopyMerger(repo, merge_context)
         # The merged_tree is used mostly for updating the working copy, but is also used for
         # serialising feature resolves, so we write it even if there's no WC.
         merged_tree = working_copy_merger.write_merged_tree(merged_index)
         if repo.working_copy.exists():
             working_copy_merger.update_working_copy(merged_index, merged_tree)
+        return
 
-    elif ds_part == "feature":
-        wc = repo.working_copy.tabular
-        if wc is None:
-            return
-        dataset = load_dataset(rich_conflict)
-        features = [
-            dataset.get_feature_with_crs_id(path=r.path, data=repo[r.id]) for r in res
-        ]
-        with wc.session() as sess:
-            wc.delete_features(sess, rich_conflict.as_key_filter())
+    # ds_part -> ds_path -> list of (rich_conflict, res)
+    resolves_by_dataset = {"feature": {}, "tile": {}}
+    for rich_conflict, res in resolves:
+        ds_path, ds_part = rich_conflict.decoded_path[:2]
+        if ds_part in resolves_by_dataset:
+            resolves_by_dataset[ds_part].setdefault(ds_path, []).append(
+                (rich_conflict, res)
+            )
+
+    if resolves_by_dataset["feature"]:
+        _update_workingcopy_with_feature_resolves(repo, resolves_by_dataset["feature"])
+    if resolves_by_dataset["tile"]:
+        _update_workingcopy_with_tile_resolves(repo, resolves_by_dataset["tile"])
+
+
+def _key_filter_for_conflicts(conflicts_to_resolve):
+    result = RepoKeyFilter()
+    for rich_conflict in conflicts_to_resolve:
+        for version in rich_conflict.true_versions:
+            result.recursive_set(version.decoded_path, True)
+    return result
+
+
+def _update_workingcopy_with_feature_resolves(repo, ds_path_to_resolves):
+    wc = repo.working_copy.tabular
+    if wc is None:
+        return
+
+    with wc.session() as sess:
+        for ds_path, resolves in ds_path_to_resolves.items():
+            dataset = load_dataset(resolves[0][0])
+            wc.delete_features(
+                sess, _key_filter_for_conflicts(c for c, res in resolves)
+            )
+            features = [
+                dataset.get_feature_with_crs_id(path=r.path, data=repo[r.id])
+                for rich_conflict, res in resolves
+                for r in res
+            ]
             if features:
                 sess.execute(wc.insert_or_replace_into_dataset_cmd(dataset), features)
 
-    elif ds_part == "tile":
-        workdir = repo.working_copy.workdir
-        if workdir is None:
-            return
-        dataset = load_dataset(rich_conflict)
+
+def _update_workingcopy_with_tile_resolves(repo, ds_path_to_resolves):
+    workdir = repo.working_copy.workdir
+    if workdir is None:
+        return
+
+    for ds_path, resolves in ds_path_to_resolves.items():
+        dataset = load_dataset(resolves[0][0])
         workdir.delete_tiles_for_dataset(
             dataset,
-            rich_conflict.as_key_filter()[dataset.path],
+            _key_filter_for_conflicts(c for c, res in resolves)[dataset.path],
             including_conflict_versions=True,
         )
-        for r in res:
-            tilename = dataset.tilename_from_path(r.path)
-            pointer_dict = pointer_file_bytes_to_dict(repo[r.id])
-            lfs_path = get_local_path_from_lfs_hash(repo, pointer_dict["oid"])
-            filename = set_tile_extension(tilename, tile_format=pointer_dict)
-            workdir_path = workdir.path / dataset.path / filename
-            if workdir_path.is_file():
-                workdir_path.unlink()
-            try_reflink(lfs_path, workdir_path)
+        for rich_conflict, res in resolves:
+            for r in res:
+                tilename = dataset.tilename_from_path(r.path)
+                pointer_dict = pointer_file_bytes_to_dict(repo[r.id])
+                lfs_path = get_local_path_from_lfs_hash(repo, pointer_dict["oid"])
+                filename = set_tile_extension(tilename, tile_format=pointer_dict)
+                workdir_path = workdir.path / dataset.path / filename
+                if workdir_path.is_file():
+                    workdir_path.unlink()
+                try_reflink(lfs_path, workdir_path)
 
 
 def resolve_conflicts_with_renumber(repo, renumber, conflict_labels):
@@ -319,7 +423,7 @@ def resolve_conflicts_with_renumber(repo, renumber, conflict_labels):
     """
     assert renumber in ("ours", "theirs")
 
-    merged_index = MergedIndex.read_from_repo(repo)
+    merged_index = MergedIndex.read_from_repo(repo, with_entries=False)
     merge_context = MergeContext.read_from_repo(repo)
 
     matching_conflicts = find_renumber_conflicts_to_resolve(
@@ -340,7 +444,7 @@ def resolve_conflicts_with_renumber(repo, renumber, conflict_labels):
     theirs_datasets = repo.datasets(merge_context.versions.theirs.commit_id)
     merged_datasets = repo.datasets("MERGED_TREE")
 
-    resolved_conflicts = 0
+    resolved_keys = []
     ds_path_to_features = {}
 
     # Renumber either ours or theirs, write the resolves to the merge index.
@@ -378,11 +482,11 @@ def resolve_conflicts_with_renumber(repo, renumber, conflict_labels):
             ]
 
             merged_index.add_resolve(conflict.key, res)
-            resolved_conflicts += 1
+            resolved_keys.append(conflict.key)
             ds_features.append(keep_feature)
             ds_features.append(renumber_feature)
 
-    merged_index.write_to_repo(repo)
+    merged_index.write_resolves_to_repo(repo, resolved_keys)
 
     # Update the working copy to contain the resolves.
     wc = repo.working_copy.tabular
@@ -396,7 +500,7 @@ def resolve_conflicts_with_renumber(repo, renumber, conflict_labels):
 
     unresolved_conflicts = len(merged_index.unresolved_conflicts)
     click.echo(
-        f"Resolved {_pc(resolved_conflicts)}. {_pc(unresolved_conflicts)} to go."
+        f"Resolved {_pc(len(resolved_keys))}. {_pc(unresolved_conflicts)} to go."
     )
     if unresolved_conflicts == 0:
         click.echo("Use `kart merge --continue` to complete the merge")
@@ -541,7 +645,11 @@ def _fix_conflict_label(conflict_label):
     shell_complete=conflict_completer,
 )
 def resolve(ctx, with_version, file_path, renumber, conflict_labels):
-    """Resolve a merge conflict, using one of the conflicting versions, or with a user-supplied resolution."""
+    """
+    Resolve one or more merge conflicts, using one of the conflicting versions, or with a user-supplied resolution.
+    When resolving using --with=ancestor, --with=ours, --with=theirs or --with=delete, the conflict labels can also
+    be filters that match many conflicts at once - eg mydataset:feature - all of which are resolved the same way.
+    """
 
     repo = ctx.obj.get_repo(allowed_states=KartRepoState.MERGING)
 
@@ -556,42 +664,64 @@ def resolve(ctx, with_version, file_path, renumber, conflict_labels):
         resolve_conflicts_with_renumber(repo, renumber, conflict_labels)
         return
 
-    merged_index = MergedIndex.read_from_repo(repo)
+    merged_index = MergedIndex.read_from_repo(repo, with_entries=False)
     merge_context = MergeContext.read_from_repo(repo)
 
-    rich_conflict = find_single_conflict_to_resolve(
-        merged_index, merge_context, conflict_labels
-    )
-
-    if file_path:
-        res = load_file_resolve(rich_conflict, Path(file_path))
-    elif with_version == "workingcopy":
-        res = load_workingcopy_resolve(rich_conflict)
-    elif with_version == "delete":
-        res = []
-    else:
-        assert with_version in ("ancestor", "ours", "theirs")
-        version = getattr(rich_conflict.versions, with_version)
-        if version is None:
-            click.echo(
-                f'Version "{with_version}" does not exist - resolving conflict by deleting.'
-            )
-            res = []
+    if file_path or with_version == "workingcopy":
+        rich_conflict = find_single_conflict_to_resolve(
+            merged_index, merge_context, conflict_labels
+        )
+        if file_path:
+            res = load_file_resolve(rich_conflict, Path(file_path))
         else:
-            res = [version.entry]
+            res = load_workingcopy_resolve(rich_conflict)
+        resolves = [(rich_conflict, res)]
+    else:
+        resolves = resolves_with_version(
+            find_conflicts_to_resolve(merged_index, merge_context, conflict_labels),
+            with_version,
+        )
 
-    merged_index.add_resolve(rich_conflict.key, res)
-    merged_index.write_to_repo(repo)
-    update_workingcopy_with_resolve(
-        repo, merged_index, merge_context, rich_conflict, res
+    for rich_conflict, res in resolves:
+        merged_index.add_resolve(rich_conflict.key, res)
+    merged_index.write_resolves_to_repo(
+        repo, [rich_conflict.key for rich_conflict, res in resolves]
     )
+    update_workingcopy_with_resolves(repo, merge_context, resolves)
 
     unresolved_conflicts = len(merged_index.unresolved_conflicts)
-    click.echo(f"Resolved 1 conflict. {_pc(unresolved_conflicts)} to go.")
+    click.echo(f"Resolved {_pc(len(resolves))}. {_pc(unresolved_conflicts)} to go.")
     if unresolved_conflicts == 0:
         click.echo("Use `kart merge --continue` to complete the merge")
 
 
+def resolves_with_version(conflicts, with_version):
+    """
+    Resolves each of the given conflicts using the given version - one of "ancestor", "ours", "theirs" or "delete".
+    Returns a list of (rich_conflict, res) tuples, where res is the list of entries the conflict is resolved to.
+    """
+    assert with_version in ("ancestor", "ours", "theirs", "delete")
+    result = []
+    deleted_count = 0
+    for rich_conflict in conflicts:
+        version = None
+        if with_version != "delete":
+            version = getattr(rich_conflict.versions, with_version)
+            if version is None:
+                deleted_count += 1
+        result.append((rich_conflict, [version.entry] if version else []))
+
+    if deleted_count == 1 and len(result) == 1:
+        click.echo(
+            f'Version "{with_version}" does not exist - resolving conflict by deleting.'
+        )
+    elif deleted_count:
+        click.echo(
+            f'Version "{with_version}" does not exist for {_pc(deleted_count)} - resolving by deleting.'
+        )
+    return result
+
+
 def _pc(count):
     """Simple pluraliser for conflict/conflicts"""
     if count == 1:
@@ -1,5 +1,4 @@
 from base64 import standard_b64decode
-import concurrent.futures
 import logging
 import functools
 import os
@@ -13,7 +12,6 @@ import click
 
 from kart.exceptions import NotFound, NO_IMPORT_SOURCE, NO_CHECKSUM
 from kart.lfs_util import get_hash_and_size_of_file
-from kart.progress_util import progress_bar
 
 # Utility functions for dealing with S3 - not yet launched.
 
@@ -146,35 +144,17 @@ def fetch_from_s3(s3_url, output_path=None, sha256_hash=None):
     return output_path
 
 
-# Fetching from S3 and writing to disk is I/O bound, so, we don't have a theoretical way of deciding how many threads to
-# use (if it was compute bound, then $NUM_CORES threads would be a good place to start).
-# But, in practise, 8 threads seems to be fast.
-_FETCH_MULTIPLE_FROM_S3_WORKER_COUNT = 8
-
-
-def fetch_multiple_from_s3(s3_urls_and_paths, quiet=False):
+def iter_s3_object_chunks(s3_url, offset=0, chunk_size=1024 * 1024):
     """
-    Given a list of tuples [(s3_url, pathlib_Path, sha256_hash), ...] downloads each URL to the given output path,
-    and verifies that the downloaded file has the appropriate hash, using _FETCH_MULTIPLE_FROM_S3_WORKER_COUNT worker threads.
-    The sha_256 is optional, it can be set to None or ommitted from the tuple entirely.
-
-    Displays a progress bar unless disabled using quiet=True.
+    Streams the object at s3_url, starting at the given byte offset. Yields chunks of bytes.
+    Used for fetching objects that were partially fetched previously.
     """
-    disable = True if quiet else None
-    progress = progress_bar(
-        total=len(s3_urls_and_paths),
-        unit="object",
-        desc="Fetching S3 objects",
-        disable=disable,
+    bucket, key = parse_s3_url(s3_url)
+    extra_kwargs = {"Range": f"bytes={offset}-"} if offset else {}
+    response = get_s3_client(bucket=bucket).get_object(
+        Bucket=bucket, Key=key, **extra_kwargs
     )
-
-    with progress as p, concurrent.futures.ThreadPoolExecutor(
-        max_workers=_FETCH_MULTIPLE_FROM_S3_WORKER_COUNT
-    ) as executor:
-        futures = [executor.submit(fetch_from_s3, *args) for args in s3_urls_and_paths]
-        for future in concurrent.futures.as_completed(futures):
-            future.result()  # Raises any exception that occurred in the worker thread.
-            p.update(1)
+    yield from response["Body"].iter_chunks(chunk_size)
 
 
 def expand_s3_glob(source_spec):
@@ -243,3 +223,65 @@ def get_error_code(client_error):
     if code and code.isdigit():
         code = int(code)
     return code
+
+
+class S3RangeReader:
+    """
+    Reads arbitrary byte ranges of an S3 object, without downloading the whole object. Ranges are fetched in blocks,
+    and blocks that have already been fetched are kept, so a parser that makes lots of small reads close together -
+    such as a file-header parser - makes only a few requests in total. Neighbouring blocks that are needed at the
+    same time are fetched using a single request.
+    """
+
+    DEFAULT_BLOCK_SIZE = 16 * 1024
+
+    def __init__(self, s3_url, size=None, block_size=None):
+        self.s3_url = s3_url
+        self.bucket, self.key = parse_s3_url(s3_url)
+        self.block_size = block_size or self.DEFAULT_BLOCK_SIZE
+        self._size = size
+        self._blocks = {}
+
+    @property
+    def size(self):
+        """The total size of the S3 object."""
+        if self._size is None:
+            response = get_s3_client(bucket=self.bucket).head_object(
+                Bucket=self.bucket, Key=self.key
+            )
+            self._size = response["ContentLength"]
+        return self._size
+
+    def read_at(self, offset, length):
+        """Returns the given range of the S3 object as bytes - shorter than length if it goes past the end."""
+        end = min(offset + length, self.size)
+        if end <= offset:
+            return b""
+        first_block = offset // self.block_size
+        last_block = (end - 1) // self.block_size
+        self._fetch_blocks(first_block, last_block)
+
+        data = b"".join(self._blocks[i] for i in range(first_block, last_block + 1))
+        start = offset - first_block * self.block_size
+        return data[start : start + (end - offset)]
+
+    def _fetch_blocks(self, first_block, last_block):
+        run_start = None
+        for i in range(first_block, last_block + 2):
+            missing = i <= last_block and i not in self._blocks
+            if missing and run_start is None:
+                run_start = i
+            elif not missing and run_start is not None:
+                self._fetch_block_run(run_start, i - 1)
+                run_start = None
+
+    def _fetch_block_run(self, first_block, last_block):
+        range_start = first_block * self.block_size
+        range_end = min((last_block + 1) * self.block_size, self.size) - 1
+        response = get_s3_client(bucket=self.bucket).get_object(
+            Bucket=self.bucket, Key=self.key, Range=f"bytes={range_start}-{range_end}"
+        )
+        data = response["Body"].read()
+        for i in range(first_block, last_block + 1):
+            block_offset = (i - first_block) * self.block_size
+            self._blocks[i] = data[block_offset : block_offset + self.block_size]
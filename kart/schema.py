@@ -1,4 +1,5 @@
 import functools
+import operator
 import re
 import uuid
 
@@ -287,6 +288,9 @@ class Schema(tuple):
             for c in sorted(self.columns, key=pk_index_ordering)
             if c.pk_index is not None
         )
+        # Row getters and feature decoders, keyed by legend - see row_getter_for_legend.
+        self._row_getters = {}
+        self._feature_decoders = {}
 
     @classmethod
     def from_schema_or_none(cls, schema):
@@ -414,6 +418,63 @@ class Schema(tuple):
         """
         return {c.name: raw_dict.get(c.id, None) for c in self.columns}
 
+    def row_getter_for_legend(self, legend):
+        """
+        Returns a function that takes the (pk_values, non_pk_values) of a feature stored using the given legend,
+        and returns a tuple with one value for each column of this schema, in schema order - None for any column
+        that isn't in the legend. The legend's columns are matched to this schema's columns once, up front.
+        """
+        row_getter = self._row_getters.get(legend)
+        if row_getter is None:
+            row_getter = self._row_getters[legend] = self._make_row_getter(legend)
+        return row_getter
+
+    def _make_row_getter(self, legend):
+        legend_columns = legend.pk_columns + legend.non_pk_columns
+        positions = {column_id: i for i, column_id in enumerate(legend_columns)}
+        # Columns that aren't in the legend get the None that is appended to the stored values.
+        missing = len(legend_columns)
+        indices = [positions.get(c.id, missing) for c in self.columns]
+        num_pk_values = len(legend.pk_columns)
+        num_non_pk_values = len(legend.non_pk_columns)
+
+        if len(indices) == 1:
+            index = indices[0]
+            getter = lambda values: (values[index],)
+        elif not indices:
+            getter = lambda values: ()
+        else:
+            getter = operator.itemgetter(*indices)
+
+        def get_row(pk_values, non_pk_values):
+            assert len(pk_values) == num_pk_values
+            assert len(non_pk_values) == num_non_pk_values
+            return getter((*pk_values, *non_pk_values, None))
+
+        return get_row
+
+    def feature_decoder_for_legend(self, legend):
+        """
+        Returns a function that takes the (pk_values, non_pk_values) of a feature stored using the given legend,
+        and returns the feature - a dict of values keyed by column name. This is the same as
+        self.feature_from_raw_dict(legend.value_tuples_to_raw_dict(pk_values, non_pk_values)), only faster.
+        """
+        decoder = self._feature_decoders.get(legend)
+        if decoder is None:
+            decoder = self._feature_decoders[legend] = self._make_feature_decoder(
+                legend
+            )
+        return decoder
+
+    def _make_feature_decoder(self, legend):
+        column_names = tuple(self.column_names)
+        get_row = self.row_getter_for_legend(legend)
+
+        def decode_feature(pk_values, non_pk_values):
+            return dict(zip(column_names, get_row(pk_values, non_pk_values)))
+
+        return decode_feature
+
     def feature_to_raw_dict(self, feature):
         """
         Takes a feature - either a dict of values keyed by column name,
@@ -9,7 +9,7 @@ import click
 import pygit2
 
 from kart.cli_util import KartGroup, StringFromFile, add_help_subcommand
-from kart.crs_util import make_crs
+from kart.crs_util import make_crs, make_transform
 from kart.exceptions import (
     NO_SPATIAL_FILTER,
     CrsError,
@@ -297,10 +297,8 @@ class ResolvedSpatialFilterSpec(SpatialFilterSpec):
         return hexhash(self.crs_spec.strip(), self.geometry.to_wkb())
 
     def envelope_wgs84(self):
-        from osgeo import osr
-
         try:
-            transform = osr.CoordinateTransformation(self.crs, make_crs("EPSG:4326"))
+            transform = make_transform(self.crs, make_crs("EPSG:4326"))
             geom_ogr = self.geometry.to_ogr()
             geom_ogr.Transform(transform)
             w, e, s, n = geom_ogr.GetEnvelope()
@@ -569,22 +567,19 @@ class SpatialFilter:
 
         err = None
         feature_env = None
-        feature_ogr = None
 
         # Quick check - envelope intersects envelope?
         if self.filter_env is not None:
             try:
-                # Don't call envelope() with calculate_if_missing=True - calculating the envelope
-                # involves loading it into OGR, which we don't want to do twice (see below).
-                feature_env = feature_geometry.envelope(only_2d=True)
-
-                # Envelope might be missing (for POINT geometries, or, for unknown reasons).
-                # In this case, we use OGR to calculate it, but we keep the OGR geometry too.
-                if feature_env is None:
-                    feature_ogr = feature_geometry.to_ogr()
-                    feature_env = feature_ogr.GetEnvelope()
-
-                if not bbox_intersects_fast(self.filter_env, feature_env):
+                # The envelope is read from the GPKG header - or if it's missing (as it is for POINT geometries),
+                # it is calculated by scanning the WKB. Either way, there's no need to load the geometry into OGR.
+                feature_env = feature_geometry.envelope(
+                    only_2d=True, calculate_if_missing=True
+                )
+                # (No envelope means an empty geometry - the slow check handles that.)
+                if feature_env is not None and not bbox_intersects_fast(
+                    self.filter_env, feature_env
+                ):
                     # Geometries definitely don't intersect if envelopes don't intersect.
                     return MatchResult.NON_MATCHING
             except Exception as e:
@@ -593,8 +588,7 @@ class SpatialFilter:
 
         # Slow check - geometry intersects geometry?
         try:
-            if feature_ogr is None:
-                feature_ogr = feature_geometry.to_ogr()
+            feature_ogr = feature_geometry.to_ogr()
             intersects = self.filter_prep.Intersects(feature_ogr)
             return MatchResult.MATCHING if intersects else MatchResult.NON_MATCHING
         except Exception as e:
@@ -769,15 +763,13 @@ class OriginalSpatialFilter(SpatialFilter):
         if self.match_all:
             return SpatialFilter._MATCH_ALL
 
-        from osgeo import osr
-
         try:
             crs_spec = str(crs)
             if isinstance(crs, str):
                 crs = make_crs(crs)
             if demote_to_2d:
                 crs.DemoteTo2D()
-            transform = osr.CoordinateTransformation(self.crs, crs)
+            transform = make_transform(self.crs, crs)
             new_filter_ogr = self.filter_ogr.Clone()
             new_filter_ogr.Transform(transform)
             return SpatialFilter(crs, new_filter_ogr, extract_geometry=extract_geometry)
@@ -6,13 +6,13 @@ import time
 
 import click
 import pygit2
-from osgeo import ogr, osr
+from osgeo import ogr
 from pysqlite3 import dbapi2 as sqlite
 from sqlalchemy import Column, Table
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.types import BLOB
 
-from kart.crs_util import make_crs, normalise_wkt
+from kart.crs_util import make_crs, make_transform, normalise_wkt
 from kart.exceptions import InvalidOperation, SubprocessError
 from kart.geometry import Geometry
 from kart.repo import KartRepoFiles
@@ -169,7 +169,7 @@ class CrsHelper:
 
     @functools.lru_cache()
     def transform_from_src_crs(self, src_crs):
-        transform = osr.CoordinateTransformation(src_crs, self.target_crs)
+        transform = make_transform(src_crs, self.target_crs)
         if src_crs.IsSame(self.target_crs):
             desc = f"IDENTITY({src_crs.GetAuthorityCode(None)})"
         else:
@@ -392,8 +392,13 @@ class GeometryType(ConverterType):
     def python_prewrite(self, geom):
         return Binary(geom.to_ewkb()) if geom is not None else None
 
-    def python_postread(self, geom):
-        return Geometry.from_hex_ewkb(geom)
+    def sql_read(self, column):
+        # Read geometries as little-endian ISO WKB - Kart geometries don't store an SRID, and most WKB can be
+        # converted to a Kart geometry without loading it into OGR. PostGIS would otherwise return hex EWKB.
+        return Function("ST_AsBinary", column, "NDR", type_=self)
+
+    def python_postread(self, wkb):
+        return Geometry.from_wkb(bytes(wkb)) if wkb is not None else None
 
 
 @aliased_converter_type
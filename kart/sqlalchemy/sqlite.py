@@ -1,8 +1,11 @@
+import contextlib
+import functools
 import os
 
 from pysqlite3 import dbapi2 as sqlite
 
 import sqlalchemy
+from sqlalchemy.orm import sessionmaker
 
 
 def sqlite_engine(path, *, journal_mode=None):
@@ -21,3 +24,44 @@ def sqlite_engine(path, *, journal_mode=None):
     engine = sqlalchemy.create_engine(f"sqlite:///{path}", module=sqlite)
     sqlalchemy.event.listen(engine, "connect", _on_connect)
     return engine
+
+
+@functools.lru_cache()
+def _ensure_tables_exist(table_set, db_path):
+    engine = sqlite_engine(db_path, journal_mode="WAL")
+    with sessionmaker(bind=engine)() as sess:
+        table_set.create_all(sess)
+        sess.commit()
+
+
+def connect_sqlite_db(table_set, db_path, *, read_only=False):
+    """
+    Returns a plain sqlite connection to the sqlite database at db_path, with the tables of the given TableSet -
+    the database and tables are created first if they don't yet exist, unless read_only is True.
+    If read_only is True and the database doesn't exist, returns None.
+    Using sqlite directly, instead of sqlalchemy, suits the indexes and caches that Kart keeps alongside a repo,
+    since most of their operations are simple bulk lookups, inserts and updates.
+    """
+    if read_only:
+        if not os.path.exists(db_path):
+            return None
+        return sqlite.connect(f"file:{db_path}?mode=ro", uri=True)
+    _ensure_tables_exist(table_set, db_path)
+    return sqlite.connect(f"file:{db_path}", uri=True, timeout=30)
+
+
+@contextlib.contextmanager
+def sqlite_db(table_set, db_path, *, read_only=False):
+    """
+    Context manager giving a connection to the given sqlite database (see connect_sqlite_db) - commits on success.
+    If read_only is True and the database doesn't exist, yields None.
+    """
+    db = connect_sqlite_db(table_set, db_path, read_only=read_only)
+    if db is None:
+        yield None
+        return
+    try:
+        with db:
+            yield db
+    finally:
+        db.close()
@@ -6,7 +6,7 @@ import pygit2
 from .base_diff_writer import BaseDiffWriter
 from .key_filters import RepoKeyFilter
 from .conflicts_writer import BaseConflictsWriter
-from .crs_util import make_crs
+from .crs_util import make_crs, make_transform
 from .exceptions import CrsError, GeometryError
 from .geometry import geometry_from_string
 from .merge_util import MergeContext, merge_status_to_text
@@ -265,8 +265,6 @@ def spatial_filter_status_to_json(jdict):
 
 
 def spatial_filter_status_to_text(jdict):
-    from osgeo import osr
-
     spatial_filter_desc = "spatial filter"
     if "reference" in jdict:
         spatial_filter_desc += f" at reference {jdict['reference']} "
@@ -283,7 +281,7 @@ def spatial_filter_status_to_text(jdict):
         return "Repo config contains spatial filter with invalid CRS"
 
     try:
-        transform = osr.CoordinateTransformation(crs, make_crs("EPSG:4326"))
+        transform = make_transform(crs, make_crs("EPSG:4326"))
         geom_ogr = geometry.to_ogr()
         geom_ogr.Transform(transform)
         w, e, s, n = geom_ogr.GetEnvelope()
@@ -467,6 +467,7 @@ class Datasets:
         self.repo_key_filter = repo_key_filter
         self.filter_dataset_type = filter_dataset_type
         self.force_dataset_class = force_dataset_class
+        self._ds_paths = None
 
     def __getitem__(self, ds_path):
         """Get a specific dataset by path."""
@@ -542,11 +543,37 @@ class Datasets:
         if not self.tree:
             return
 
-        for tree_path, tree in all_trees_with_paths_in_tree(self.tree):
-            ds = self._get_for_tree(tree, tree_path)
+        if self.force_dataset_class is not None:
+            for tree_path, tree in all_trees_with_paths_in_tree(self.tree):
+                ds = self._get_for_tree(tree, tree_path)
+                if ds is not None:
+                    yield ds
+            return
+
+        for ds_path in self._dataset_paths():
+            ds = self._get_for_tree(self.tree / ds_path, ds_path)
             if ds is not None:
                 yield ds
 
+    def _dataset_paths(self):
+        """
+        Returns the paths of all the trees that contain a dataset dirname, whatever the filters.
+        These are found by walking the whole tree, which is slow for big repos - so they are kept in the
+        structure cache (see kart.structure_cache) for next time.
+        """
+        if self._ds_paths is None:
+            from kart.structure_cache import get_dataset_paths
+
+            self._ds_paths = get_dataset_paths(
+                self.repo, self.tree, self._find_dataset_paths
+            )
+        return self._ds_paths
+
+    def _find_dataset_paths(self, root_tree):
+        for tree_path, tree in all_trees_with_paths_in_tree(root_tree):
+            if any(self.is_dataset_dirname(child.name) for child in tree):
+                yield tree_path
+
     def working_copy_part_types(self):
         """Returns the types of working copy parts that are needed to check out these datasets."""
         result = set()
@@ -0,0 +1,125 @@
+import logging
+import time
+
+from pysqlite3 import dbapi2 as sqlite
+from sqlalchemy import Column, Integer, Table, Text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.types import BLOB
+
+from kart.repo import KartRepoFiles
+from kart.sqlalchemy import TableSet
+from kart.sqlalchemy.sqlite import sqlite_db
+
+# A cache of where the datasets are in each root tree, so that commands like `kart data ls` or `kart show` don't have
+# to walk every directory of the tree each time they are run - in a repo with hundreds of datasets, that is most of
+# the work done by such commands. Trees are immutable so a cached entry never goes stale. Only the trees that have been
+# at HEAD are stored - so that commands that walk through history, like `kart log`, don't write to the cache for
+# every commit - and only the most recently stored of those are kept, so that the cache doesn't grow forever and the
+# current HEAD is never pruned. Reading from the cache never writes to it, so that commands that only read the repo
+# don't have to wait for other Kart processes that are writing to it.
+
+L = logging.getLogger(__name__)
+
+# How many root trees to remember the datasets of.
+MAX_CACHED_TREES = 256
+
+
+class StructureCacheTables(TableSet):
+    """Tables for caching where the datasets are in each root tree."""
+
+    def __init__(self):
+        super().__init__()
+
+        # "cached_trees" has a row for every root tree in the cache - including trees that have no datasets.
+        self.cached_trees = Table(
+            "cached_trees",
+            self.sqlalchemy_metadata,
+            # The tree ID (the SHA-1 hash), in binary (20 bytes).
+            Column("tree_id", BLOB, nullable=False, primary_key=True),
+            # When this tree was added to the cache (while it was at HEAD), in seconds since the epoch.
+            Column("added", Integer, nullable=False),
+            sqlite_with_rowid=False,
+        )
+
+        # "tree_datasets" has a row for every dataset in every cached tree.
+        self.tree_datasets = Table(
+            "tree_datasets",
+            self.sqlalchemy_metadata,
+            Column("tree_id", BLOB, nullable=False, primary_key=True),
+            # The order in which the datasets are found when walking the tree.
+            Column("seq", Integer, nullable=False, primary_key=True),
+            Column("ds_path", Text, nullable=False),
+            sqlite_with_rowid=False,
+        )
+
+
+StructureCacheTables.copy_tables_to_class()
+
+
+def structure_cache_db(repo, read_only=False):
+    """
+    Context manager giving a connection to the structure cache of the given repo - commits on success.
+    If read_only is True, the cache is not created if it doesn't yet exist - instead, this yields None.
+    """
+    db_path = str(repo.gitdir_file(KartRepoFiles.STRUCTURE_CACHE))
+    return sqlite_db(StructureCacheTables, db_path, read_only=read_only)
+
+
+def get_dataset_paths(repo, tree, find_dataset_paths):
+    """
+    Returns the list of paths of the datasets in the given root tree, in the order that find_dataset_paths(tree)
+    returns them. The answer is read from the structure cache if possible - otherwise, find_dataset_paths is called,
+    and its answer is stored in the cache if the tree is at HEAD. If the cache can't be read or written, works just
+    the same, but slower.
+    """
+    tree_id = tree.id.raw
+    try:
+        with structure_cache_db(repo, read_only=True) as db:
+            is_cached = (
+                db is not None
+                and db.execute(
+                    "SELECT 1 FROM cached_trees WHERE tree_id = ?;", (tree_id,)
+                ).fetchone()
+            )
+            if is_cached:
+                return [
+                    row[0]
+                    for row in db.execute(
+                        "SELECT ds_path FROM tree_datasets WHERE tree_id = ? ORDER BY seq;",
+                        (tree_id,),
+                    )
+                ]
+    except (sqlite.Error, SQLAlchemyError) as e:
+        L.info("Couldn't read the structure cache: %s", e)
+        return list(find_dataset_paths(tree))
+
+    ds_paths = list(find_dataset_paths(tree))
+    head_tree = repo.head_tree
+    if head_tree is None or head_tree.id != tree.id:
+        return ds_paths
+
+    try:
+        with structure_cache_db(repo) as db:
+            db.execute(
+                "INSERT OR REPLACE INTO cached_trees (tree_id, added) VALUES (?, ?);",
+                (tree_id, int(time.time())),
+            )
+            db.executemany(
+                "INSERT OR REPLACE INTO tree_datasets (tree_id, seq, ds_path) VALUES (?, ?, ?);",
+                [(tree_id, seq, ds_path) for seq, ds_path in enumerate(ds_paths)],
+            )
+            _prune(db)
+    except (sqlite.Error, SQLAlchemyError) as e:
+        L.info("Couldn't update the structure cache: %s", e)
+    return ds_paths
+
+
+def _prune(db):
+    db.execute(
+        "DELETE FROM cached_trees WHERE tree_id NOT IN "
+        "(SELECT tree_id FROM cached_trees ORDER BY added DESC LIMIT ?);",
+        (MAX_CACHED_TREES,),
+    )
+    db.execute(
+        "DELETE FROM tree_datasets WHERE tree_id NOT IN (SELECT tree_id FROM cached_trees);"
+    )
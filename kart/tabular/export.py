@@ -0,0 +1,364 @@
+import concurrent.futures
+import json
+import math
+from pathlib import Path
+
+import click
+import pygit2
+
+from kart import crs_util
+from kart.cli_util import KartCommand
+from kart.completion_shared import ref_completer
+from kart.exceptions import NO_DRIVER, InvalidOperation, NotFound
+from kart.geometry import geom_envelope
+from kart.serialise_util import msg_unpack
+from kart.utils import chunk, get_num_available_cores
+
+# How many features go in each record batch / Parquet row group.
+DEFAULT_BATCH_SIZE = 65536
+
+EXPORT_FORMATS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+# GeoParquet names for Kart's geometry types.
+GEOPARQUET_GEOMETRY_TYPES = {
+    "POINT": "Point",
+    "LINESTRING": "LineString",
+    "POLYGON": "Polygon",
+    "MULTIPOINT": "MultiPoint",
+    "MULTILINESTRING": "MultiLineString",
+    "MULTIPOLYGON": "MultiPolygon",
+    "GEOMETRYCOLLECTION": "GeometryCollection",
+}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise NotFound(
+            f"Exporting to Parquet or Arrow requires pyarrow, which is not installed ({e})",
+            exit_code=NO_DRIVER,
+        )
+    return pyarrow
+
+
+def arrow_type_for_column(pa, column):
+    """Returns the Arrow type that the values of the given Kart column are exported as."""
+    data_type = column.data_type
+    size = column.get("size")
+    if data_type == "boolean":
+        return pa.bool_()
+    elif data_type in ("blob", "geometry"):
+        # Geometries are exported as WKB.
+        return pa.binary()
+    elif data_type == "float":
+        return pa.float32() if size == 32 else pa.float64()
+    elif data_type == "integer":
+        return {8: pa.int8(), 16: pa.int16(), 32: pa.int32()}.get(size, pa.int64())
+    # Everything else - text, numeric, date, time, timestamp, interval - is stored by Kart as a string.
+    return pa.string()
+
+
+class ArrowFeatureDecoder:
+    """
+    Decodes feature blobs straight into Arrow record batches. Rather than building a dict for each feature, the
+    values of each feature are placed straight into the right output column - see Schema.row_getter_for_legend.
+
+    Each geometry column is exported as WKB, along with a "<name>_bbox" struct column holding its 2D bounding box,
+    so that Parquet row-group statistics on the bounding box columns can be used to skip row groups spatially.
+    """
+
+    def __init__(self, pa, dataset):
+        self.pa = pa
+        self.dataset = dataset
+        self.columns = list(dataset.schema.columns)
+        self._row_getters = {}
+
+        column_names = {c.name for c in self.columns}
+        self.geometry_columns = []
+        for i, column in enumerate(self.columns):
+            if column.data_type == "geometry":
+                bbox_name = f"{column.name}_bbox"
+                while bbox_name in column_names:
+                    bbox_name = f"_{bbox_name}"
+                column_names.add(bbox_name)
+                self.geometry_columns.append((i, column, bbox_name))
+
+        self._bbox_type = pa.struct(
+            [(f, pa.float64()) for f in ("xmin", "ymin", "xmax", "ymax")]
+        )
+        fields = [
+            pa.field(c.name, arrow_type_for_column(pa, c), nullable=c.pk_index is None)
+            for c in self.columns
+        ]
+        for i, column, bbox_name in self.geometry_columns:
+            fields.append(pa.field(bbox_name, self._bbox_type))
+        self.schema = pa.schema(fields, metadata=self._geo_metadata())
+
+    def _geo_metadata(self):
+        """GeoParquet metadata describing the geometry columns."""
+        if not self.geometry_columns:
+            return None
+        columns = {}
+        for i, column, bbox_name in self.geometry_columns:
+            geometry_type = column.get("geometryType", "GEOMETRY").split(" ")
+            name = GEOPARQUET_GEOMETRY_TYPES.get(geometry_type[0])
+            if name and len(geometry_type) > 1 and "Z" in geometry_type[1]:
+                name += " Z"
+            columns[column.name] = {
+                "encoding": "WKB",
+                "geometry_types": [name] if name else [],
+                "crs": self._projjson(column),
+                "covering": {
+                    "bbox": {
+                        f: [bbox_name, f] for f in ("xmin", "ymin", "xmax", "ymax")
+                    }
+                },
+            }
+        geo = {
+            "version": "1.1.0",
+            "primary_column": self.geometry_columns[0][1].name,
+            "columns": columns,
+        }
+        return {"geo": json.dumps(geo)}
+
+    def _projjson(self, column):
+        # A missing CRS means OGC:CRS84 to GeoParquet readers, so use null (unknown) if there's no usable CRS.
+        crs_name = column.get("geometryCRS")
+        if not crs_name:
+            return None
+        try:
+            crs_definition = self.dataset.get_crs_definition(crs_name)
+            return json.loads(crs_util.make_crs(crs_definition).ExportToPROJJSON())
+        except (KeyError, RuntimeError, AttributeError, ValueError):
+            return None
+
+    def decode_blobs(self, blobs):
+        """Decodes the given feature blobs into a single record batch."""
+        rows = []
+        for blob in blobs:
+            pk_values = self.dataset.decode_path_to_pks(blob.name)
+            legend_hash, non_pk_values = msg_unpack(memoryview(blob))
+            get_row = self._row_getters.get(legend_hash)
+            if get_row is None:
+                legend = self.dataset.get_legend(legend_hash)
+                get_row = self.dataset.schema.row_getter_for_legend(legend)
+                self._row_getters[legend_hash] = get_row
+            rows.append(get_row(pk_values, non_pk_values))
+        return self.rows_to_record_batch(rows)
+
+    def rows_to_record_batch(self, rows):
+        pa = self.pa
+        if rows:
+            column_values = [list(values) for values in zip(*rows)]
+        else:
+            column_values = [[] for c in self.columns]
+
+        bbox_arrays = []
+        for i, column, bbox_name in self.geometry_columns:
+            values = column_values[i]
+            bboxes = []
+            for j, geom in enumerate(values):
+                if geom is None:
+                    bboxes.append(None)
+                    continue
+                envelope = geom_envelope(geom, only_2d=True, calculate_if_missing=True)
+                if envelope is None:
+                    bboxes.append(None)
+                else:
+                    min_x, max_x, min_y, max_y = envelope
+                    bboxes.append(
+                        {"xmin": min_x, "ymin": min_y, "xmax": max_x, "ymax": max_y}
+                    )
+                values[j] = geom.to_wkb()
+            bbox_arrays.append(pa.array(bboxes, type=self._bbox_type))
+
+        arrays = [
+            pa.array(values, type=field.type)
+            for values, field in zip(column_values, self.schema)
+        ]
+        return pa.RecordBatch.from_arrays(arrays + bbox_arrays, schema=self.schema)
+
+
+class _RowGroupWriter:
+    """
+    Collects record batches and writes them to a Parquet or Arrow IPC file, in row groups / record batches of
+    exactly batch_size rows (except for the last one).
+    """
+
+    def __init__(self, pa, output_format, path, schema, batch_size):
+        self.pa = pa
+        self.batch_size = batch_size
+        self._pending = []
+        self._pending_rows = 0
+        if output_format == "parquet":
+            self._writer = pa.parquet.ParquetWriter(str(path), schema)
+            self._write = lambda t: self._writer.write_table(
+                t, row_group_size=self.batch_size
+            )
+        else:
+            self._writer = pa.ipc.new_file(str(path), schema)
+            self._write = lambda t: self._writer.write_table(
+                t, max_chunksize=self.batch_size
+            )
+        self.row_count = 0
+
+    def write_batch(self, batch):
+        if not batch.num_rows:
+            return
+        self._pending.append(batch)
+        self._pending_rows += batch.num_rows
+        self.row_count += batch.num_rows
+        if self._pending_rows >= self.batch_size:
+            table = self.pa.Table.from_batches(self._pending)
+            num_full_rows = (self._pending_rows // self.batch_size) * self.batch_size
+            self._write(table.slice(0, num_full_rows).combine_chunks())
+            remainder = table.slice(num_full_rows).combine_chunks()
+            self._pending = remainder.to_batches()
+            self._pending_rows = remainder.num_rows
+
+    def close(self):
+        if self._pending_rows:
+            self._write(self.pa.Table.from_batches(self._pending).combine_chunks())
+        self._pending = []
+        self._writer.close()
+
+
+# The decoder used by each worker process - each worker opens its own repo.
+_worker_decoder = None
+
+
+def _init_worker(repo_path, tree_id, ds_path):
+    global _worker_decoder
+    from kart.repo import KartRepo
+
+    dataset = KartRepo(repo_path).datasets(tree_id)[ds_path]
+    _worker_decoder = ArrowFeatureDecoder(_import_pyarrow(), dataset)
+
+
+def _decode_subtree(subtree_name, batch_size):
+    """Runs in a worker process. Returns a list of record batches for every feature in the given subtree."""
+    from kart.core import all_blobs_in_tree
+
+    dataset = _worker_decoder.dataset
+    subtree = dataset.inner_tree / dataset.FEATURE_PATH / subtree_name
+    return [
+        _worker_decoder.decode_blobs(blobs)
+        for blobs in chunk(all_blobs_in_tree(subtree), batch_size)
+    ]
+
+
+def _iter_record_batches(repo, root_tree_id, decoder, batch_size, jobs):
+    """
+    Yields record batches for every feature in the decoder's dataset, in the same order as dataset.feature_blobs().
+    With more than one job, each top-level subtree of the feature tree is decoded by a worker process - at most
+    a couple of subtrees per worker are decoded ahead of the writer, so that memory use stays bounded.
+    """
+    dataset = decoder.dataset
+    if jobs == 1 or dataset.FEATURE_PATH not in dataset.inner_tree:
+        for blobs in chunk(dataset.feature_blobs(), batch_size):
+            yield decoder.decode_blobs(blobs)
+        return
+
+    feature_tree = dataset.inner_tree / dataset.FEATURE_PATH
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(repo.path, root_tree_id, dataset.path),
+    ) as executor:
+        futures = []
+        for entry in feature_tree:
+            if entry.type == pygit2.GIT_OBJ_BLOB:
+                futures.append(decoder.decode_blobs([entry]))
+            elif entry.type == pygit2.GIT_OBJ_TREE:
+                futures.append(executor.submit(_decode_subtree, entry.name, batch_size))
+            while len(futures) > jobs * 2:
+                yield from _future_batches(futures.pop(0))
+        for future in futures:
+            yield from _future_batches(future)
+
+
+def _future_batches(future):
+    if isinstance(future, concurrent.futures.Future):
+        return future.result()
+    # A batch that was decoded in this process.
+    return [future]
+
+
+@click.command("export", cls=KartCommand)
+@click.pass_context
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["parquet", "arrow"]),
+    help="Output format. By default, this is chosen based on the output file's extension, or else is parquet.",
+)
+@click.option(
+    "--ref",
+    default="HEAD",
+    shell_complete=ref_completer,
+    help="The revision of the dataset to export.",
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_BATCH_SIZE,
+    show_default=True,
+    help="How many features to write in each Parquet row group or Arrow record batch.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="How many processes to use to decode features. Use 0 for the number of available CPU cores.",
+)
+@click.argument("dataset_path", metavar="DATASET")
+@click.argument(
+    "output_path",
+    metavar="OUTPUT",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+)
+def export(ctx, output_format, ref, batch_size, jobs, dataset_path, output_path):
+    """
+    Exports a snapshot of a table dataset to a columnar file - either Apache Parquet (GeoParquet), or Apache Arrow
+    IPC. Geometries are written as WKB, along with a bounding-box column for each geometry column.
+    """
+    repo = ctx.obj.repo
+    pa = _import_pyarrow()
+
+    rs = repo.structure(ref)
+    dataset = rs.datasets().get(dataset_path)
+    if dataset is None:
+        raise NotFound(f"No dataset found at '{dataset_path}' at {ref}")
+    if dataset.DATASET_TYPE != "table":
+        raise InvalidOperation(
+            f"Only table datasets can be exported - {dataset_path} is a {dataset.DATASET_TYPE} dataset"
+        )
+
+    if output_format is None:
+        output_format = EXPORT_FORMATS.get(output_path.suffix.lower(), "parquet")
+    if jobs == 0:
+        jobs = max(1, int(math.ceil(get_num_available_cores())))
+
+    decoder = ArrowFeatureDecoder(pa, dataset)
+    writer = _RowGroupWriter(pa, output_format, output_path, decoder.schema, batch_size)
+    try:
+        batches = _iter_record_batches(repo, rs.tree.id.hex, decoder, batch_size, jobs)
+        for batch in batches:
+            writer.write_batch(batch)
+    finally:
+        writer.close()
+
+    click.echo(
+        f"Exported {writer.row_count} features from {dataset_path} to {output_path}"
+    )
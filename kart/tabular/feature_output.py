@@ -1,7 +1,8 @@
 import json
 
 from kart.exceptions import InvalidOperation
-from kart.geometry import Geometry, ogr_to_hex_wkb
+from kart.geometry import Geometry, wkb_to_hex_wkb
+from kart.tabular.reprojection import reproject_to_ogr, reproject_to_wkb
 from kart.utils import ungenerator
 
 
@@ -37,22 +38,27 @@ def feature_as_json(row, pk_value, geometry_transform=None):
     The geometry is serialized as hexWKB.
     """
     for k, v in row.items():
-        if isinstance(v, Geometry):
-            if geometry_transform is None:
-                v = v.to_hex_wkb()
-            else:
-                # reproject
-                ogr_geom = v.to_ogr()
-                try:
-                    ogr_geom.Transform(geometry_transform)
-                except RuntimeError as e:
-                    raise InvalidOperation(
-                        f"Can't reproject geometry with ID '{pk_value}' into target CRS"
-                    ) from e
-                v = ogr_to_hex_wkb(ogr_geom)
-        elif isinstance(v, bytes):
-            v = bytes.hex(v)
-        yield k, v
+        yield k, feature_value_as_json(v, pk_value, geometry_transform)
+
+
+def feature_value_as_json(value, pk_value, geometry_transform=None):
+    """
+    Turns a single value from a row into a value that can be serialized as JSON.
+    Geometries are serialized as hexWKB, other binary values as hex.
+    """
+    if isinstance(value, Geometry):
+        if geometry_transform is None:
+            return value.to_hex_wkb()
+        # reproject
+        try:
+            return wkb_to_hex_wkb(reproject_to_wkb(value, geometry_transform))
+        except RuntimeError as e:
+            raise InvalidOperation(
+                f"Can't reproject geometry with ID '{pk_value}' into target CRS"
+            ) from e
+    elif isinstance(value, bytes):
+        return bytes.hex(value)
+    return value
 
 
 def feature_as_geojson(
@@ -78,11 +84,12 @@ def feature_as_geojson(
     for k in row.keys():
         v = row[k]
         if isinstance(v, Geometry):
-            g = v.to_ogr()
-            if geometry_transform is not None:
+            if geometry_transform is None:
+                g = v.to_ogr()
+            else:
                 # reproject
                 try:
-                    g.Transform(geometry_transform)
+                    g = reproject_to_ogr(v, geometry_transform)
                 except RuntimeError as e:
                     raise InvalidOperation(
                         f"Can't reproject geometry at '{change_id}' into target CRS"
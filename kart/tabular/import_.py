@@ -159,8 +159,15 @@ def any_at_all(iterable):
 @click.option(
     "--num-workers",
     "--num-processes",
-    type=click.INT,
-    help="How many import workers to run in parallel. This is not currently supported for tabular import, so this option is ignored.",
+    type=click.IntRange(min=1),
+    help="How many workers to read each table with in parallel. Only database import sources make use of this.",
+    default=None,
+    hidden=True,
+)
+@click.option(
+    "--page-size",
+    type=click.IntRange(min=1),
+    help="How many features to read from a database table in each query.",
     default=None,
     hidden=True,
 )
@@ -192,6 +199,7 @@ def table_import(
     max_delta_depth,
     do_checkout,
     num_workers,
+    page_size,
     ds_path,
     args,
 ):
@@ -273,6 +281,10 @@ def table_import(
             primary_key=primary_key,
             meta_overrides=meta_overrides,
         )
+        if num_workers is not None:
+            import_source.num_workers = num_workers
+        if page_size is not None:
+            import_source.page_size = page_size
 
         if replace_ids is not None:
             if repo.table_dataset_version < 2:
@@ -0,0 +1,302 @@
+import hashlib
+import logging
+
+from pysqlite3 import dbapi2 as sqlite
+from sqlalchemy import Column, Integer, Table, Text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.types import BLOB
+
+from kart.repo import KartRepoFiles
+from kart.serialise_util import msg_pack
+from kart.sqlalchemy import TableSet
+from kart.sqlalchemy.sqlite import connect_sqlite_db
+from kart.tabular.pk_generation import PkGeneratingTableImportSource
+from kart.utils import chunk
+
+# A cache of a hash of every source row imported by the last `kart import --replace-existing` of each dataset, so that
+# the next time the same dataset is re-imported, only the rows that were inserted, updated or deleted in the source
+# need to be encoded and written - every other feature is left as it is in the existing feature tree.
+# The cache is only trusted if the dataset's feature tree and schema are still exactly as they were after that import.
+
+L = logging.getLogger(__name__)
+
+# How many source rows to look up in the cache at once.
+BATCH_SIZE = 500
+
+# The types of primary key that can be stored as-is in the cache.
+CACHEABLE_PK_TYPES = ("integer", "text")
+
+
+class ImportCacheError(Exception):
+    """
+    Raised while yielding only the changed features of an import, if the cache can't be read or written after all.
+    The cache no longer describes the dataset, and the features yielded so far aren't all of the changed features -
+    so the dataset's existing features must be deleted, and every feature of the source imported instead.
+    """
+
+
+class ImportCacheTables(TableSet):
+    """Tables for caching which source rows were imported to each dataset."""
+
+    def __init__(self):
+        super().__init__()
+
+        # "import_cache_datasets" has a row for every dataset that has rows in import_cache_rows.
+        self.import_cache_datasets = Table(
+            "import_cache_datasets",
+            self.sqlalchemy_metadata,
+            Column("ds_path", Text, nullable=False, primary_key=True),
+            # The sha256 hash of the schema the rows were imported with, in binary.
+            Column("schema_hash", BLOB, nullable=False),
+            # The ID of the feature tree created by the import, in binary.
+            Column("feature_tree", BLOB, nullable=True),
+            # Incremented every import - rows not updated by an import are rows that have been deleted.
+            Column("import_id", Integer, nullable=False),
+        )
+
+        # "import_cache_rows" has a row for every feature imported to each dataset.
+        self.import_cache_rows = Table(
+            "import_cache_rows",
+            self.sqlalchemy_metadata,
+            Column("ds_path", Text, nullable=False, primary_key=True),
+            # The primary key value - an integer or a string. Declared as BLOB so that SQLite doesn't convert it.
+            Column("pk", BLOB, nullable=False, primary_key=True),
+            # A hash of the values of the source row, in binary.
+            Column("row_hash", BLOB, nullable=False),
+            Column("import_id", Integer, nullable=False),
+            sqlite_with_rowid=False,
+        )
+
+
+ImportCacheTables.copy_tables_to_class()
+
+
+def _schema_hash(schema):
+    return hashlib.sha256(schema.dumps()).digest()
+
+
+def _row_hasher(schema):
+    column_names = [c.name for c in schema.columns]
+
+    def _row_hash(feature):
+        values = [feature[name] for name in column_names]
+        return hashlib.blake2b(msg_pack(values), digest_size=16).digest()
+
+    return _row_hash
+
+
+class ImportCache:
+    """
+    Keeps track of the source rows imported by `kart import --replace-existing`. Nothing is written to the cache
+    unless commit() is called, once the import has succeeded - call close() when done.
+    If the cache can't be opened, imports work just the same, but every feature is encoded and written.
+    """
+
+    def __init__(self, repo):
+        self.repo = repo
+        # {ds_path: feature tree path} for every dataset that has been recorded by this import.
+        self._recorded = {}
+        db_path = str(repo.gitdir_file(KartRepoFiles.IMPORT_CACHE))
+        try:
+            self._db = connect_sqlite_db(ImportCacheTables, db_path)
+        except (sqlite.Error, SQLAlchemyError) as e:
+            L.info("Couldn't open the import cache: %s", e)
+            self._db = None
+
+    def close(self):
+        """Closes the cache, discarding anything recorded since the last call to commit()."""
+        if self._db is not None:
+            self._db.rollback()
+            self._db.close()
+            self._db = None
+
+    def can_cache(self, source):
+        """Returns True if rows from the given source can be recorded in this cache."""
+        if self._db is None:
+            return False
+        if isinstance(source, PkGeneratingTableImportSource):
+            # Generated primary keys are already matched to existing features by a different mechanism.
+            return False
+        if getattr(source, "feature_blobs_already_written", False):
+            return False
+        pk_columns = source.schema.pk_columns
+        return len(pk_columns) == 1 and pk_columns[0].data_type in CACHEABLE_PK_TYPES
+
+    def is_up_to_date(self, source, replacing_dataset):
+        """
+        Returns True if this cache describes exactly the features of replacing_dataset - which means that only the
+        source rows that have changed since they were recorded need to be written.
+        """
+        if replacing_dataset is None or not self.can_cache(source):
+            return False
+        if replacing_dataset.schema != source.schema:
+            return False
+        try:
+            row = self._db.execute(
+                "SELECT schema_hash, feature_tree FROM import_cache_datasets WHERE ds_path = ?;",
+                (source.dest_path,),
+            ).fetchone()
+        except sqlite.Error as e:
+            L.info("Couldn't read the import cache: %s", e)
+            return False
+        return row is not None and row == (
+            _schema_hash(source.schema),
+            replacing_dataset.feature_tree.id.raw,
+        )
+
+    def _next_import_id(self, ds_path):
+        row = self._db.execute(
+            "SELECT import_id FROM import_cache_datasets WHERE ds_path = ?;",
+            (ds_path,),
+        ).fetchone()
+        return row[0] + 1 if row else 1
+
+    @staticmethod
+    def feature_tree_path(dataset):
+        """Returns the path of the given dataset's feature tree, relative to the root tree."""
+        return f"{dataset.inner_path}/{dataset.FEATURE_PATH}".rstrip("/")
+
+    def _record_dataset(self, source, dataset, import_id):
+        self._db.execute(
+            "INSERT OR REPLACE INTO import_cache_datasets (ds_path, schema_hash, feature_tree, import_id) "
+            "VALUES (?, ?, NULL, ?);",
+            (source.dest_path, _schema_hash(source.schema), import_id),
+        )
+        self._recorded[source.dest_path] = self.feature_tree_path(dataset)
+
+    def changed_features(self, source, dataset, features, incremental):
+        """
+        Records the hash of every row in features, which are the features of the given source, as they are imported
+        to the given dataset. If incremental is True, only yields those features that are new or have changed since
+        the last import - otherwise, yields every feature. Call deleted_pks() afterwards to find out which features
+        are no longer in the source. If incremental is True and the cache can't be read or written, raises
+        ImportCacheError - call this again with incremental=False to import every feature instead.
+        """
+        if incremental:
+            yield from self._changed_features(source, dataset, features)
+        else:
+            yield from self._all_features(source, dataset, features)
+
+    def _changed_features(self, source, dataset, features):
+        ds_path = source.dest_path
+        pk_name = source.schema.pk_columns[0].name
+        row_hash = _row_hasher(source.schema)
+        try:
+            import_id = self._next_import_id(ds_path)
+            self._record_dataset(source, dataset, import_id)
+        except sqlite.Error as e:
+            self._fail(ds_path, e)
+
+        for batch in chunk(features, BATCH_SIZE):
+            pks = [f[pk_name] for f in batch]
+            placeholders = ", ".join("?" * len(pks))
+            try:
+                old_hashes = dict(
+                    self._db.execute(
+                        f"SELECT pk, row_hash FROM import_cache_rows WHERE ds_path = ? AND pk IN ({placeholders});",
+                        (ds_path, *pks),
+                    )
+                )
+            except sqlite.Error as e:
+                self._fail(ds_path, e)
+            params = []
+            for pk, feature in zip(pks, batch):
+                new_hash = row_hash(feature)
+                if old_hashes.get(pk) != new_hash:
+                    yield feature
+                params.append((ds_path, pk, new_hash, import_id))
+            try:
+                self._db.executemany(
+                    "INSERT INTO import_cache_rows (ds_path, pk, row_hash, import_id) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (ds_path, pk) DO UPDATE SET row_hash = excluded.row_hash, import_id = excluded.import_id;",
+                    params,
+                )
+            except sqlite.Error as e:
+                self._fail(ds_path, e)
+
+    def _all_features(self, source, dataset, features):
+        ds_path = source.dest_path
+        pk_name = source.schema.pk_columns[0].name
+        row_hash = _row_hasher(source.schema)
+        try:
+            import_id = self._next_import_id(ds_path)
+            self._db.execute(
+                "DELETE FROM import_cache_rows WHERE ds_path = ?;", (ds_path,)
+            )
+            self._record_dataset(source, dataset, import_id)
+        except sqlite.Error as e:
+            L.info("Couldn't update the import cache: %s", e)
+            yield from features
+            return
+
+        recording = True
+        for batch in chunk(features, BATCH_SIZE):
+            if recording:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO import_cache_rows (ds_path, pk, row_hash, import_id) "
+                        "VALUES (?, ?, ?, ?);",
+                        [(ds_path, f[pk_name], row_hash(f), import_id) for f in batch],
+                    )
+                except sqlite.Error as e:
+                    # Not being able to record the rows doesn't stop the import: it just won't be cached.
+                    L.info("Couldn't update the import cache: %s", e)
+                    self._forget(ds_path)
+                    recording = False
+            yield from batch
+
+    def _fail(self, ds_path, e):
+        L.info("Couldn't use the import cache: %s", e)
+        self._forget(ds_path)
+        raise ImportCacheError(ds_path) from e
+
+    def _forget(self, ds_path):
+        self._recorded.pop(ds_path, None)
+        try:
+            self._db.execute(
+                "DELETE FROM import_cache_datasets WHERE ds_path = ?;", (ds_path,)
+            )
+        except sqlite.Error:
+            pass
+
+    def deleted_pks(self, source):
+        """
+        Returns a list of the primary keys of the rows that were recorded by the last import of this source, but
+        which were not seen by changed_features during this import - ie, rows that have been deleted from the source.
+        Raises ImportCacheError if the cache can't be read or written - see changed_features.
+        """
+        ds_path = source.dest_path
+        try:
+            import_id = self._next_import_id(ds_path) - 1
+            pks = [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT pk FROM import_cache_rows WHERE ds_path = ? AND import_id != ?;",
+                    (ds_path, import_id),
+                )
+            ]
+            self._db.execute(
+                "DELETE FROM import_cache_rows WHERE ds_path = ? AND import_id != ?;",
+                (ds_path, import_id),
+            )
+        except sqlite.Error as e:
+            self._fail(ds_path, e)
+        return pks
+
+    def commit(self, new_tree):
+        """Records that the rows seen during this import are the rows whose features are now in new_tree."""
+        if self._db is None or not self._recorded:
+            return
+        try:
+            for ds_path, feature_tree_path in self._recorded.items():
+                try:
+                    feature_tree_id = new_tree[feature_tree_path].id
+                except KeyError:
+                    feature_tree_id = self.repo.empty_tree.id
+                self._db.execute(
+                    "UPDATE import_cache_datasets SET feature_tree = ? WHERE ds_path = ?;",
+                    (feature_tree_id.raw, ds_path),
+                )
+            self._db.commit()
+        except sqlite.Error as e:
+            L.info("Couldn't update the import cache: %s", e)
@@ -14,6 +14,11 @@ class TableImportSource:
 
     UNNECESSARY_PREFIXES = ("OGR:", "GPKG:", "PG:")
 
+    # How many workers may read features from this source in parallel, and how many features each one reads at a
+    # time (None for the source's own default). Import sources that can't make use of these ignore them.
+    num_workers = 1
+    page_size = None
+
     @classmethod
     def _remove_unnecessary_prefix(cls, spec):
         spec_upper = spec.upper()
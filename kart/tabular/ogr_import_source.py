@@ -1,4 +1,5 @@
 import functools
+import importlib.util
 import os
 import re
 import sys
@@ -61,6 +62,22 @@ class OgrTableImportSource(TableImportSource):
 
     DEFAULT_GEOMETRY_COLUMN_NAME = "geom"
 
+    # Kart column types that can be read in bulk from an OGR Arrow stream, with the same result as reading them
+    # from each OGR feature. (Times and timestamps are not, since their timezones are not preserved.)
+    ARROW_STREAM_TYPES = {
+        "boolean",
+        "blob",
+        "date",
+        "float",
+        "geometry",
+        "integer",
+        "numeric",
+        "text",
+    }
+    # Default names given to the FID and geometry columns in an OGR Arrow stream, when they have no other name:
+    ARROW_STREAM_DEFAULT_FID_NAME = "OGC_FID"
+    ARROW_STREAM_DEFAULT_GEOMETRY_NAME = "wkb_geometry"
+
     @classmethod
     def _all_subclasses(cls):
         for sub in cls.__subclasses__():
@@ -384,9 +401,114 @@ class OgrTableImportSource(TableImportSource):
         l.ResetReading()
 
     def features(self):
+        arrow_stream_features = self._iter_arrow_stream_features()
+        if arrow_stream_features is not None:
+            yield from arrow_stream_features
+            return
+
         for ogr_feature in self._iter_ogr_features():
             yield self._ogr_feature_to_kart_feature(ogr_feature)
 
+    def _can_use_arrow_stream(self):
+        """
+        Returns True if features can be read in record batches using the layer's Arrow stream (GDAL >= 3.6),
+        rather than one at a time. This requires numpy, and that every column is of a type in ARROW_STREAM_TYPES.
+        """
+        if not hasattr(self.ogrlayer, "GetArrowStreamAsNumPy"):
+            return False
+        if importlib.util.find_spec("numpy") is None:
+            return False
+        return all(col.data_type in self.ARROW_STREAM_TYPES for col in self.schema)
+
+    @property
+    @functools.lru_cache(maxsize=1)
+    def arrow_stream_column_names(self):
+        """Returns a dict of {kart-column-name: arrow-stream-column-name} for every column in the schema."""
+        ld = self.layer_defn
+        geom_names = {}
+        for i in range(ld.GetGeomFieldCount()):
+            ogr_name = ld.GetGeomFieldDefn(i).GetName()
+            geom_names[ogr_name or self.DEFAULT_GEOMETRY_COLUMN_NAME] = (
+                ogr_name or self.ARROW_STREAM_DEFAULT_GEOMETRY_NAME
+            )
+
+        result = {}
+        for col in self.schema:
+            if col.name == self.primary_key and self.use_ogc_fid_as_pk:
+                fid_name = self.ogrlayer.GetFIDColumn()
+                result[col.name] = fid_name or self.ARROW_STREAM_DEFAULT_FID_NAME
+            else:
+                result[col.name] = geom_names.get(col.name, col.name)
+        return result
+
+    def _iter_arrow_stream_features(self):
+        """
+        Returns an iterator of features read from the layer's Arrow stream - each record batch is converted to Kart's
+        types a column at a time. Returns None if the Arrow stream can't be used, in which case the caller should
+        fall back to reading one OGR feature at a time.
+        """
+        if not self._can_use_arrow_stream():
+            return None
+
+        l = self.ogrlayer
+        l.ResetReading()
+        try:
+            stream = l.GetArrowStreamAsNumPy()
+            batches = iter(stream)
+            first_batch = next(batches, None)
+        except RuntimeError:
+            l.ResetReading()
+            return None
+
+        if first_batch is not None and not all(
+            name in first_batch for name in self.arrow_stream_column_names.values()
+        ):
+            # Not the columns we expected - the per-feature path knows how to deal with this layer.
+            del batches, stream
+            l.ResetReading()
+            return None
+
+        return self._arrow_batches_to_features(stream, first_batch, batches)
+
+    def _arrow_batches_to_features(self, stream, first_batch, batches):
+        batch = first_batch
+        names = list(self.arrow_stream_column_names)
+        while batch is not None:
+            columns = [
+                self._arrow_column_to_kart_values(
+                    name, batch[self.arrow_stream_column_names[name]]
+                )
+                for name in names
+            ]
+            for values in zip(*columns):
+                yield dict(zip(names, values))
+            batch = next(batches, None)
+
+        # end of iter
+        del batches, stream
+        self.ogrlayer.ResetReading()
+
+    def _arrow_column_to_kart_values(self, name, array):
+        # Masked (ie, null) values become None.
+        values = array.tolist()
+        data_type = self.schema[name].data_type
+        if data_type == "text":
+            return [v.decode("utf8") if isinstance(v, bytes) else v for v in values]
+        elif data_type == "date":
+            # numpy datetime64[D] -> datetime.date -> ISO8601 string
+            return [v.isoformat() if v is not None else None for v in values]
+        elif data_type == "geometry":
+            adapter = self.field_adapter_map[name]
+            return [
+                adapter(ogr.CreateGeometryFromWkb(v)) if v is not None else None
+                for v in values
+            ]
+        elif data_type == "numeric":
+            adapter = self.field_adapter_map[name]
+            return [adapter(v) for v in values]
+        # Integers, floats, booleans and blobs already have the right Python type.
+        return values
+
     def _ogr_sql_quote_literal(self, x):
         # OGR follows normal SQL92 string literal quoting rules.
         # There's no params argument to SetAttributeFilter(),
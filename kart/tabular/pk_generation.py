@@ -4,6 +4,7 @@ from .v2 import TableV2
 from .v3 import TableV3
 from .import_source import TableImportSource
 from kart.schema import Schema, ColumnSchema
+from kart.serialise_util import json_unpack
 
 
 class PkGeneratingTableImportSource(TableImportSource):
@@ -23,27 +24,8 @@ class PkGeneratingTableImportSource(TableImportSource):
 
     >>> {feature hash -> [list of primary keys]}
 
-    In fact the inverse mapping is stored, since it has a simpler structure, primary keys are unique:
-
-    >>> {primary key -> feature hash}
-
-    This is stored in $DATASET_PATH/meta/generated-pks.json, along with the column-schema of the new primary key::
-
-      {
-        "primaryKeySchema": {
-          "id": "ad068414-3a04-45ab-851d-bfa5104c60d6",
-          "name": "auto_pk",
-          "dataType": "integer",
-          "primaryKeyIndex": 0,
-          "size": 64
-        },
-        "generatedPrimaryKeys": {
-          "1": "181e23cf3a3c5e74254707687c4be2b5b02dbf63",
-          "2": "021ac25fcf4dafc72053f84d2b87ec5662adcb83",
-          "3": "8e775122edbdd367c8d383fffeabf6580de485fd",
-          ...
-        }
-      }
+    This mapping is stored in $DATASET_PATH/meta/generated-pks/, split into many small shards so that a reimport
+    only needs to load and rewrite the shards that it changes - see GeneratedPks for details.
 
     During a reimport, if similarity_detection_limit is set to some X > 0, and the import results in a number
     of inserts + deletes[1] that is less than X, then these inserts and deletes will be searched to see if we can
@@ -59,9 +41,6 @@ class PkGeneratingTableImportSource(TableImportSource):
     primary key, and a delete is a feature that was present in the previous import but not in the current one.
     """
 
-    GENERATED_PKS_ITEM = "generated-pks.json"
-    GENERATED_PKS_PATH = "meta/" + GENERATED_PKS_ITEM
-
     DEFAULT_PK_COL = {
         "id": ColumnSchema.new_id(),
         "name": "auto_pk",
@@ -105,8 +84,12 @@ class PkGeneratingTableImportSource(TableImportSource):
             self.prev_dest_schema = None
             self.pk_col = self.DEFAULT_PK_COL
             self.primary_key = self.pk_col["name"]
-            self.pk_to_hash = {}
-            self.first_new_pk = 1
+            self.generated_pks = GeneratedPks(
+                self.pk_col,
+                shard_prefix_length=GeneratedPks.shard_prefix_length_for_count(
+                    self.feature_count
+                ),
+            )
 
             self.similarity_detection_limit = 0
             self.similarity_detection_insert_limit = 0
@@ -117,20 +100,11 @@ class PkGeneratingTableImportSource(TableImportSource):
         )
         self.prev_dest_schema = self.prev_dest_dataset.schema
 
-        data = self.prev_dest_dataset.get_meta_item(self.GENERATED_PKS_ITEM)
-        self.pk_col = data["primaryKeySchema"]
+        # Hash of feature contents -> primary keys, for every feature ever imported.
+        self.generated_pks = GeneratedPks.from_dataset(self.prev_dest_dataset)
+        self.pk_col = self.generated_pks.pk_col
         self.primary_key = self.pk_col["name"]
 
-        # The primary-key of an imported feature -> hash of feature contents, for every feature ever imported.
-        self.pk_to_hash = {
-            # JSON has string-keys - generated primary keys are integers.
-            int(pk): feature_hash
-            for pk, feature_hash in data["generatedPrimaryKeys"].items()
-        }
-
-        # First primary key to use if we can't find a historical but unassigned one.
-        self.first_new_pk = max(self.pk_to_hash) + 1 if self.pk_to_hash else 1
-
         # The number of inserts, deletes, previous- and current-feature-count, are related by the given formula:
         # prev-FC + inserts - deletes = curr-FC
         # Since we know prev-FC and curr-FC already, we can already calculate the number of inserts we can encounter
@@ -149,14 +123,14 @@ class PkGeneratingTableImportSource(TableImportSource):
         if not self.repo.head_tree:
             return None
 
-        current_pks_blob = self._get_generated_pks_blob(self.repo.head_tree)
-        if current_pks_blob is None:
+        current_pks_obj = self._get_generated_pks_obj(self.repo.head_tree)
+        if current_pks_obj is None:
             return None
 
         prev_import_commit = None
         try:
             for commit in self.repo.walk(self.repo.head_commit.id):
-                if self._get_generated_pks_blob(commit) == current_pks_blob:
+                if self._get_generated_pks_obj(commit) == current_pks_obj:
                     prev_import_commit = commit
                 else:
                     # We've reached the commit before the previous import
@@ -170,28 +144,24 @@ class PkGeneratingTableImportSource(TableImportSource):
             # This means similarity detection works subtly differently.
             return self.repo.head_tree / self.dest_path
 
-    def _get_generated_pks_blob(self, commit_or_tree):
+    def _get_generated_pks_obj(self, commit_or_tree):
+        """
+        Returns the git object that stores the generated primary keys at the given commit -
+        the meta/generated-pks/ tree, or for datasets imported by older versions of Kart, the
+        meta/generated-pks.json blob. Returns None if there is no such object.
+        """
         root_tree = commit_or_tree.peel(pygit2.Tree)
         try:
             dataset = self.repo.dataset_class(
                 root_tree / self.dest_path, self.dest_path, self.repo
             )
-            return dataset.inner_tree / self.GENERATED_PKS_PATH
+            meta_tree = dataset.meta_tree
         except KeyError:
             return None
-
-    def to_dict(self):
-        return {
-            "primaryKeySchema": self.pk_col,
-            "generatedPrimaryKeys": self.pk_to_hash,
-        }
-
-    def _invert_pk_map(self, pk_to_hash):
-        result = {}
-        for pk, h in pk_to_hash.items():
-            result.setdefault(h, [])
-            result[h].append(pk)
-        return result
+        for path in (GeneratedPks.TREE_NAME, GeneratedPks.LEGACY_ITEM):
+            if path in meta_tree:
+                return meta_tree / path
+        return None
 
     def _is_schema_similar_to_last_import(self):
         if not self.prev_dest_schema:
@@ -203,13 +173,12 @@ class PkGeneratingTableImportSource(TableImportSource):
         return True
 
     def features(self):
-        # Next primary key to use if we can't find a historical but unassigned one in hash_to_unassigned_pks.
-        next_new_pk = self.first_new_pk
+        # Next primary key to use if we can't find a historical but unassigned one in self.generated_pks.
+        next_new_pk = self.generated_pks.next_pk
 
-        # Subset of hash_to_pks - only contains primary keys that have not yet been assigned during the current import.
-        # Meaning, if we need a primary key for a feature, we should first check this dict to find a historical one that
-        # hasn't yet been assigned to a feature during this import, and reassign it to the current feature.
-        hash_to_unassigned_pks = self._invert_pk_map(self.pk_to_hash)
+        # If we need a primary key for a feature, we should first check self.generated_pks to find a historical one
+        # that hasn't yet been assigned to a feature during this import, and reassign it to the current feature.
+        generated_pks = self.generated_pks
 
         # Features that we couldn't reassign PKs to - so far they are inserts, but if we can find some similar deletes
         # once we know the full list of inserts and deletes, then we can reassign PKs from the deletes, so that they
@@ -224,8 +193,7 @@ class PkGeneratingTableImportSource(TableImportSource):
             feature = {self.primary_key: None, **orig_feature}
             feature_hash = self.schema.hash_feature(feature, without_pk=True)
 
-            pks = hash_to_unassigned_pks.get(feature_hash)
-            reassigned_pk = pks.pop(0) if pks else None
+            reassigned_pk = generated_pks.pop_unassigned_pk(feature_hash)
 
             if reassigned_pk is not None:
                 # This feature is exactly the same as a historical one that had a PK,
@@ -256,7 +224,7 @@ class PkGeneratingTableImportSource(TableImportSource):
 
             # Look for matching inserts-deletes - reassign the PK from the delete, treat is as an edit:
             yield from self._match_similar_features_and_remove(
-                self._find_deleted_features(hash_to_unassigned_pks), buffered_inserts
+                self._find_deleted_features(), buffered_inserts
             )
             # Just assign new PKs to those we couldn't find a match for.
             yield from self._assign_pk_range(buffered_inserts, next_new_pk)
@@ -284,7 +252,7 @@ class PkGeneratingTableImportSource(TableImportSource):
             feature_hash = self.schema.hash_feature(feature, without_pk=True)
 
         feature[self.primary_key] = pk
-        self.pk_to_hash[pk] = feature_hash
+        self.generated_pks.assign(pk, feature_hash)
         return feature
 
     def _match_similar_features_and_remove(self, old_features, new_features):
@@ -375,10 +343,8 @@ class PkGeneratingTableImportSource(TableImportSource):
             "Generic similarity metric not yet implemented - see _fast_pop_similar_pairs"
         )
 
-    def _find_deleted_features(self, hash_to_unassigned_pks):
-        unassigned_pks = set()
-        for pks in hash_to_unassigned_pks.values():
-            unassigned_pks.update(pks)
+    def _find_deleted_features(self):
+        unassigned_pks = self.generated_pks.unassigned_pks()
 
         filtered_dataset_class = {2: FilteredTableV2, 3: FilteredTableV3}[
             self.repo.table_dataset_version
@@ -406,8 +372,11 @@ class PkGeneratingTableImportSource(TableImportSource):
     def get_meta_item(self, name, missing_ok=True):
         if name == "schema.json":
             return self._schema_with_pk
-        elif name == self.GENERATED_PKS_ITEM:
-            return self.to_dict()
+        elif name.startswith(GeneratedPks.TREE_NAME + "/"):
+            result = self.generated_pks.meta_items(self.pk_col).get(name)
+            if result is None and not missing_ok:
+                raise KeyError(name)
+            return result
         else:
             return self.delegate.get_meta_item(name, missing_ok=missing_ok)
 
@@ -415,7 +384,7 @@ class PkGeneratingTableImportSource(TableImportSource):
         return {
             **self.delegate.meta_items(),
             "schema.json": self._schema_with_pk,
-            self.GENERATED_PKS_ITEM: self.to_dict(),
+            **self.generated_pks.meta_items(self.pk_col),
         }
 
     def align_schema_to_existing_schema(self, existing_schema):
@@ -465,6 +434,230 @@ class PkGeneratingTableImportSource(TableImportSource):
         return self.delegate.aggregate_import_source_desc(import_sources)
 
 
+class GeneratedPks:
+    """
+    The mapping {feature hash -> [list of primary keys]} for every feature ever imported into a dataset by a
+    PkGeneratingTableImportSource. This is stored in $DATASET_PATH/meta/generated-pks/ - index.json holds the
+    column-schema of the generated primary key, and the next primary key that is to be assigned::
+
+      {
+        "primaryKeySchema": {
+          "id": "ad068414-3a04-45ab-851d-bfa5104c60d6",
+          "name": "auto_pk",
+          "dataType": "integer",
+          "primaryKeyIndex": 0,
+          "size": 64
+        },
+        "nextPrimaryKey": 4,
+        "shardPrefixLength": 1
+      }
+
+    The mapping itself is split into shards by the first few characters of each feature hash - for instance,
+    shards/1.json holds the primary keys of every feature with a hash that starts with "1"::
+
+      {
+        "181e23cf3a3c5e74254707687c4be2b5b02dbf63": [1],
+        "1a1ac25fcf4dafc72053f84d2b87ec5662adcb83": [2, 3]
+      }
+
+    A shard is only loaded once a feature with a hash in that shard is encountered, and only the shards that
+    have changed are rewritten - the rest are copied as is.
+
+    Older versions of Kart stored the inverse mapping {primary key -> feature hash} in a single meta-item,
+    generated-pks.json - this is still read, and is converted to the sharded format when it is next written.
+    """
+
+    TREE_NAME = "generated-pks"
+    INDEX_ITEM = TREE_NAME + "/index.json"
+    SHARDS_PATH = TREE_NAME + "/shards"
+    LEGACY_ITEM = "generated-pks.json"
+
+    # The number of hex characters used to pick a shard is chosen when the mapping is first written, and is
+    # increased whenever it is rewritten if need be, so that shards hold no more than about this many feature
+    # hashes each on average:
+    TARGET_SHARD_SIZE = 4096
+    MAX_SHARD_PREFIX_LENGTH = 4
+
+    def __init__(self, pk_col=None, next_pk=1, shard_prefix_length=1, shard_blobs=None):
+        self.pk_col = pk_col
+        self.next_pk = next_pk
+        self.shard_prefix_length = shard_prefix_length
+        # The shards that are already stored: {prefix: blob}
+        self._shard_blobs = shard_blobs or {}
+        # The shards that have been loaded so far: {prefix: {feature hash: [list of primary keys]}}
+        self._shards = {}
+        # The same as self._shards, but only the primary keys that haven't yet been assigned during this import.
+        self._unassigned = {}
+        # The prefixes of the shards that have been modified.
+        self._dirty = set()
+        # {primary key: feature hash} for all unassigned primary keys - only populated by unassigned_pks().
+        self._unassigned_pk_to_hash = {}
+
+    @classmethod
+    def shard_prefix_length_for_count(cls, feature_count):
+        result = 1
+        while (
+            result < cls.MAX_SHARD_PREFIX_LENGTH
+            and feature_count > cls.TARGET_SHARD_SIZE * 16**result
+        ):
+            result += 1
+        return result
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        """Loads the generated primary keys of the given dataset - only the index is loaded, not the shards."""
+        index = dataset.get_meta_item(cls.INDEX_ITEM)
+        if index is None:
+            return cls.from_legacy_dict(dataset.get_meta_item(cls.LEGACY_ITEM))
+
+        shards_tree = dataset.get_subtree(f"{dataset.META_PATH}{cls.SHARDS_PATH}")
+        shard_blobs = {
+            blob.name[: -len(".json")]: blob
+            for blob in shards_tree
+            if blob.name.endswith(".json")
+        }
+        return cls(
+            index["primaryKeySchema"],
+            index["nextPrimaryKey"],
+            index["shardPrefixLength"],
+            shard_blobs,
+        )
+
+    @classmethod
+    def from_legacy_dict(cls, data):
+        """Converts the contents of a generated-pks.json meta-item. Every shard is marked as modified."""
+        pk_to_hash = data["generatedPrimaryKeys"]
+        result = cls(
+            data["primaryKeySchema"],
+            shard_prefix_length=cls.shard_prefix_length_for_count(len(pk_to_hash)),
+        )
+        for pk, feature_hash in pk_to_hash.items():
+            # JSON has string-keys - generated primary keys are integers.
+            pk = int(pk)
+            shard = result._shards.setdefault(result._prefix(feature_hash), {})
+            shard.setdefault(feature_hash, []).append(pk)
+            result.next_pk = max(result.next_pk, pk + 1)
+
+        for prefix, shard in result._shards.items():
+            result._unassigned[prefix] = {h: list(pks) for h, pks in shard.items()}
+        result._dirty.update(result._shards)
+        return result
+
+    def _prefix(self, feature_hash):
+        return feature_hash[: self.shard_prefix_length]
+
+    def _load_shard(self, prefix):
+        shard = self._shards.get(prefix)
+        if shard is None:
+            blob = self._shard_blobs.get(prefix)
+            shard = json_unpack(blob.data) if blob is not None else {}
+            self._shards[prefix] = shard
+            self._unassigned[prefix] = {h: list(pks) for h, pks in shard.items()}
+        return shard
+
+    def pop_unassigned_pk(self, feature_hash):
+        """
+        Returns a primary key that was previously assigned to a feature with the given hash, but which hasn't yet
+        been assigned during this import - the primary key is then considered to be assigned. Returns None if
+        there is no such primary key.
+        """
+        prefix = self._prefix(feature_hash)
+        self._load_shard(prefix)
+        pks = self._unassigned[prefix].get(feature_hash)
+        return pks.pop(0) if pks else None
+
+    def unassigned_pks(self):
+        """
+        Returns all the primary keys that haven't yet been assigned during this import.
+        Note that this loads every shard.
+        """
+        for prefix in self._shard_blobs:
+            self._load_shard(prefix)
+        self._unassigned_pk_to_hash = {
+            pk: feature_hash
+            for unassigned in self._unassigned.values()
+            for feature_hash, pks in unassigned.items()
+            for pk in pks
+        }
+        return self._unassigned_pk_to_hash.keys()
+
+    def assign(self, pk, feature_hash):
+        """
+        Stores that the given primary key has been assigned to a feature with the given hash. The primary key must
+        either be new, or be one of the unassigned_pks(), in which case it is no longer stored at its old hash.
+        """
+        old_hash = self._unassigned_pk_to_hash.pop(pk, None)
+        if old_hash is not None:
+            old_prefix = self._prefix(old_hash)
+            old_pks = self._shards[old_prefix][old_hash]
+            old_pks.remove(pk)
+            if not old_pks:
+                del self._shards[old_prefix][old_hash]
+            self._unassigned[old_prefix][old_hash].remove(pk)
+            self._dirty.add(old_prefix)
+
+        prefix = self._prefix(feature_hash)
+        shard = self._load_shard(prefix)
+        shard.setdefault(feature_hash, []).append(pk)
+        self._dirty.add(prefix)
+        self.next_pk = max(self.next_pk, pk + 1)
+
+    def _reshard_if_needed(self):
+        """
+        Increases the shard prefix length if the shards have grown to hold more than TARGET_SHARD_SIZE feature
+        hashes each on average. This loads every shard, and marks every shard as modified.
+        """
+        # Every primary key that was ever generated is stored, so there are next_pk - 1 of them.
+        shard_prefix_length = self.shard_prefix_length_for_count(self.next_pk - 1)
+        if shard_prefix_length <= self.shard_prefix_length:
+            return
+
+        for prefix in self._shard_blobs:
+            self._load_shard(prefix)
+        self.shard_prefix_length = shard_prefix_length
+
+        def reshard(shards):
+            result = {}
+            for shard in shards.values():
+                for feature_hash, pks in shard.items():
+                    result.setdefault(self._prefix(feature_hash), {})[
+                        feature_hash
+                    ] = pks
+            return result
+
+        self._shards = reshard(self._shards)
+        self._unassigned = {
+            **{prefix: {} for prefix in self._shards},
+            **reshard(self._unassigned),
+        }
+        # None of the shards are stored with the new prefix length yet.
+        self._shard_blobs = {}
+        self._dirty = set(self._shards)
+
+    def meta_items(self, pk_col):
+        """
+        Returns the meta-items to be written to meta/generated-pks/ as a dict {meta-item-path: content}.
+        Shards that haven't been modified are returned as the blobs they are already stored in.
+        """
+        self._reshard_if_needed()
+        result = {
+            self.INDEX_ITEM: {
+                "primaryKeySchema": pk_col,
+                "nextPrimaryKey": self.next_pk,
+                "shardPrefixLength": self.shard_prefix_length,
+            }
+        }
+        for prefix in sorted(self._shard_blobs.keys() | self._dirty):
+            path = f"{self.SHARDS_PATH}/{prefix}.json"
+            if prefix not in self._dirty:
+                result[path] = self._shard_blobs[prefix]
+                continue
+            shard = self._shards[prefix]
+            if shard:
+                result[path] = {h: sorted(shard[h]) for h in sorted(shard)}
+        return result
+
+
 class FilteredTableDataset:
     """A dataset that only yields features with pk where `pk_filter(pk)` returns True."""
 
@@ -0,0 +1,179 @@
+import math
+import struct
+
+from osgeo import ogr
+
+from kart.geometry import Geometry, scan_wkb
+from kart.utils import chunk
+
+# How many features to reproject at once.
+DEFAULT_BATCH_SIZE = 1000
+
+
+class BatchGeometryTransform:
+    """
+    Wraps an osr.CoordinateTransformation so that geometries can be reprojected in batches - the coordinates of
+    every geometry in a batch are reprojected in a single TransformPoints call, and then written back into a copy
+    of each geometry's WKB. This is much faster than converting each geometry to OGR and reprojecting it separately.
+
+    Call prepare() with a batch of geometries, then reproject them one by one using reproject_to_wkb() or
+    reproject_to_ogr(). The result is exactly the same as if each geometry was reprojected using OGR - geometries
+    that weren't prepared, or which can't be handled in a batch, are reprojected using OGR.
+    """
+
+    def __init__(self, transform):
+        self.transform = transform
+        self._prepared = {}
+
+    def prepare(self, geometries):
+        """Reprojects the given geometries all at once, ready to be returned by reproject_to_wkb / reproject_to_ogr."""
+        self._prepared = _batch_reproject(self.transform, geometries)
+
+    def reproject_to_wkb(self, geometry):
+        """
+        Returns the little-endian ISO WKB of the given geometry, reprojected.
+        Raises RuntimeError if the geometry can't be reprojected.
+        """
+        wkb = self._prepared.get(geometry)
+        if wkb is not None:
+            return wkb
+        return self._reproject_using_ogr(geometry).ExportToIsoWkb(ogr.wkbNDR)
+
+    def reproject_to_ogr(self, geometry):
+        """
+        Returns the given geometry as an OGR geometry, reprojected.
+        Raises RuntimeError if the geometry can't be reprojected.
+        """
+        wkb = self._prepared.get(geometry)
+        if wkb is not None:
+            return ogr.CreateGeometryFromWkb(wkb)
+        return self._reproject_using_ogr(geometry)
+
+    def _reproject_using_ogr(self, geometry):
+        ogr_geom = geometry.to_ogr()
+        ogr_geom.Transform(self.transform)
+        return ogr_geom
+
+
+def reproject_to_wkb(geometry, geometry_transform):
+    """
+    Returns the little-endian ISO WKB of the given geometry, reprojected using the given transform - either a
+    BatchGeometryTransform or an osr.CoordinateTransformation. Raises RuntimeError if it can't be reprojected.
+    """
+    if isinstance(geometry_transform, BatchGeometryTransform):
+        return geometry_transform.reproject_to_wkb(geometry)
+    ogr_geom = geometry.to_ogr()
+    ogr_geom.Transform(geometry_transform)
+    return ogr_geom.ExportToIsoWkb(ogr.wkbNDR)
+
+
+def reproject_to_ogr(geometry, geometry_transform):
+    """
+    Returns the given geometry as an OGR geometry, reprojected using the given transform - either a
+    BatchGeometryTransform or an osr.CoordinateTransformation. Raises RuntimeError if it can't be reprojected.
+    """
+    if isinstance(geometry_transform, BatchGeometryTransform):
+        return geometry_transform.reproject_to_ogr(geometry)
+    ogr_geom = geometry.to_ogr()
+    ogr_geom.Transform(geometry_transform)
+    return ogr_geom
+
+
+def batch_reproject_deltas(
+    key_delta_iter, old_transform, new_transform, batch_size=DEFAULT_BATCH_SIZE
+):
+    """
+    Given an iterable of (key, delta) feature deltas, yields the same (key, delta) pairs - but before each batch is
+    yielded, the geometries in the old and new values of that batch are prepared for reprojection by old_transform
+    and new_transform respectively (see BatchGeometryTransform.prepare). Transforms which aren't
+    BatchGeometryTransforms are ignored.
+    """
+    transforms = [
+        (t, is_old)
+        for t, is_old in ((old_transform, True), (new_transform, False))
+        if isinstance(t, BatchGeometryTransform)
+    ]
+    if not transforms:
+        yield from key_delta_iter
+        return
+
+    for batch in chunk(key_delta_iter, batch_size):
+        to_prepare = {}
+        for transform, is_old in transforms:
+            geometries = to_prepare.setdefault(id(transform), (transform, []))[1]
+            for key, delta in batch:
+                if is_old and delta.old:
+                    _find_geometries(delta.old_value, geometries)
+                elif not is_old and delta.new:
+                    _find_geometries(delta.new_value, geometries)
+        for transform, geometries in to_prepare.values():
+            transform.prepare(geometries)
+        yield from batch
+
+
+def _find_geometries(row, result):
+    for value in row.values():
+        if isinstance(value, Geometry):
+            result.append(value)
+
+
+def _batch_reproject(transform, geometries):
+    """
+    Reprojects the coordinates of all the given geometries in a single call to transform.TransformPoints.
+    Returns a dict {geometry: reprojected-wkb}. Geometries which can't be reprojected this way, either because their
+    WKB is of a type not handled here or because not all of their points could be reprojected, are left out.
+    """
+    parsed = []
+    points = []
+    for geometry in dict.fromkeys(geometries):
+        wkb = geometry.to_wkb()
+        try:
+            scan = scan_wkb(wkb, bounds=False, coord_arrays=True)
+        except (ValueError, IndexError, struct.error):
+            continue
+        # Anything that OGR might not write back out in exactly the same way is left to OGR.
+        if scan.end != len(wkb) or not scan.is_normalised:
+            continue
+        coord_arrays = scan.coord_arrays
+        num_points = sum(count for offset, count, dims in coord_arrays)
+        if not num_points:
+            continue
+
+        start = len(points)
+        for offset, count, dims in coord_arrays:
+            coords = struct.unpack_from(f"<{count * dims}d", wkb, offset)
+            if not all(map(math.isfinite, coords)):
+                break
+            if dims == 3:
+                points.extend(zip(coords[0::3], coords[1::3], coords[2::3]))
+            else:
+                points.extend(zip(coords[0::2], coords[1::2], [0.0] * count))
+        else:
+            parsed.append((geometry, wkb, coord_arrays, start))
+            continue
+        # Non-finite coordinates (eg POINT EMPTY) - leave this one to OGR.
+        del points[start:]
+
+    if not points:
+        return {}
+
+    try:
+        transformed = transform.TransformPoints(points)
+    except RuntimeError:
+        return {}
+
+    result = {}
+    for geometry, wkb, coord_arrays, start in parsed:
+        out = bytearray(wkb)
+        i = start
+        for offset, count, dims in coord_arrays:
+            coords = []
+            for point in transformed[i : i + count]:
+                coords.extend(point[:dims])
+            i += count
+            struct.pack_into(f"<{count * dims}d", out, offset, *coords)
+            if not all(map(math.isfinite, coords)):
+                break
+        else:
+            result[geometry] = bytes(out)
+    return result
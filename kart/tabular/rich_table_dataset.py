@@ -3,7 +3,6 @@ import time
 
 import click
 from kart.diff_format import DiffFormat
-from osgeo import osr
 
 from kart import crs_util
 from kart.diff_structs import Delta, DeltaDiff, DatasetDiff
@@ -27,6 +26,8 @@ class RichTableDataset(TableDataset):
     this functionality isn't needed. For example, see Dataset0.
     """
 
+    DIFF_SORT_BUFFER_SIZE_KEY = "kart.diff.sortBufferSize"
+
     def features_plus_blobs(self):
         for blob in self.feature_blobs():
             yield self.get_feature(path=blob.name, data=memoryview(blob)), blob
@@ -104,7 +105,7 @@ class RichTableDataset(TableDataset):
             return None
         try:
             src_crs = crs_util.make_crs(crs_definition)
-            return osr.CoordinateTransformation(src_crs, target_crs)
+            return crs_util.make_transform(src_crs, target_crs)
         except RuntimeError as e:
             raise InvalidOperation(
                 f"Can't reproject dataset {self.path!r} into target CRS: {e}"
@@ -134,8 +135,8 @@ class RichTableDataset(TableDataset):
 
         # Else do a full diff.
         else:
-            ds_diff["feature"] = DeltaDiff(
-                self.diff_feature(other, feature_filter, reverse=reverse)
+            ds_diff["feature"] = self.diff_feature_as_stream(
+                other, feature_filter, reverse=reverse
             )
         return ds_diff
 
@@ -167,6 +168,31 @@ class RichTableDataset(TableDataset):
             reverse=reverse,
         )
 
+    def diff_feature_as_stream(
+        self, other, feature_filter=FeatureKeyFilter.MATCH_ALL, reverse=False
+    ):
+        """
+        Like diff_feature, but returns a StreamingDeltaDiff, which doesn't hold every feature delta in memory at once.
+        The number of deltas held in memory while sorting is controlled by the kart.diff.sortBufferSize config.
+        """
+        return self.diff_subtree_as_stream(
+            other,
+            "feature",
+            key_filter=feature_filter,
+            key_decoder_method="decode_path_to_1pk",
+            value_decoder_method="get_feature_promise_from_path",
+            reverse=reverse,
+            sort_buffer_size=self._get_diff_sort_buffer_size(),
+        )
+
+    def _get_diff_sort_buffer_size(self):
+        if self.repo is None:
+            return None
+        try:
+            return max(1, self.repo.config.get_int(self.DIFF_SORT_BUFFER_SIZE_KEY))
+        except (KeyError, ValueError):
+            return None
+
     def get_feature_promise_from_path(self, feature_path):
         feature_blob = self.get_blob_at(feature_path)
         return functools.partial(self.get_feature_from_blob, feature_blob)
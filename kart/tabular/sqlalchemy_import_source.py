@@ -1,6 +1,9 @@
+import concurrent.futures
 import functools
 import os
+import queue
 import sys
+import threading
 
 import click
 
@@ -27,6 +30,13 @@ class SqlAlchemyTableImportSource(TableImportSource):
 
     CURSOR_SIZE = 10000
 
+    # Features are read in pages of this many rows, each in its own short transaction.
+    DEFAULT_PAGE_SIZE = 10000
+    # When reading a table using several workers, it is split into this many PK ranges per worker.
+    RANGES_PER_WORKER = 4
+    # How many pages each worker can read ahead of the features that have been yielded.
+    PAGES_READ_AHEAD = 2
+
     @classmethod
     def open(cls, spec, table=None):
         db_type = DbType.from_spec(spec)
@@ -293,6 +303,55 @@ class SqlAlchemyTableImportSource(TableImportSource):
         table_def = self.db_type.adapter.table_def_for_schema(
             schema, db_schema=self.db_schema, table_name=self.table
         )
+        if len(schema.pk_columns) != 1:
+            # Without a single primary key column there is nothing to page by - read the whole table in one query.
+            yield from self._streamed_features(table_def)
+            return
+
+        pk_column = schema.pk_columns[0]
+        with self.engine.connect() as conn:
+            is_unique = self._is_whole_primary_key(conn, pk_column.name)
+        if not is_unique:
+            # Paging by a column that isn't unique would skip any rows that have the same value as the last row of a
+            # page - so read the whole table in one query instead.
+            yield from self._streamed_features(table_def)
+            return
+
+        if self.num_workers > 1:
+            with self.engine.connect() as conn:
+                pk_ranges = self._pk_ranges(
+                    conn,
+                    table_def,
+                    pk_column,
+                    self.num_workers * self.RANGES_PER_WORKER,
+                )
+        else:
+            pk_ranges = [(None, None)]
+
+        if len(pk_ranges) == 1:
+            with self.engine.connect() as conn:
+                for page in self._keyset_pages(conn, table_def, pk_column.name):
+                    yield from page
+        else:
+            yield from self._parallel_keyset_features(
+                table_def, pk_column.name, pk_ranges
+            )
+
+    def _is_whole_primary_key(self, conn, column_name):
+        """
+        Returns True if the named column is known to be the entire primary key of the table - and so is unique.
+        This isn't true of the first column of a composite primary key in a GPKG, which the adapter reports as the
+        only primary key column - nor of any column chosen using --primary-key.
+        """
+        try:
+            pk_constraint = sqlalchemy.inspect(conn).get_pk_constraint(
+                self.table, schema=self.db_schema
+            )
+        except sqlalchemy.exc.SQLAlchemyError:
+            return False
+        return pk_constraint.get("constrained_columns") == [column_name]
+
+    def _streamed_features(self, table_def):
         query = sqlalchemy.select(table_def.columns).select_from(table_def)
         with self.engine.connect() as conn:
             r = (
@@ -302,6 +361,122 @@ class SqlAlchemyTableImportSource(TableImportSource):
             )
             yield from self._resultset_as_dicts(r)
 
+    def _keyset_pages(self, conn, table_def, pk_name, start=None, stop=None):
+        """
+        Yields every feature with a PK in the range start <= pk < stop (where None means unbounded) in PK order,
+        as a list of features per page. Each page is read by a separate query (WHERE pk > :last ORDER BY pk LIMIT n)
+        in its own transaction, so no snapshot or cursor is held open while the rest of the import happens.
+        """
+        page_size = self.page_size or self.DEFAULT_PAGE_SIZE
+        pk = table_def.c[pk_name]
+        last_pk = None
+        while True:
+            query = (
+                sqlalchemy.select(table_def.columns)
+                .select_from(table_def)
+                .order_by(pk)
+                .limit(page_size)
+            )
+            if last_pk is not None:
+                query = query.where(pk > last_pk)
+            elif start is not None:
+                query = query.where(pk >= start)
+            if stop is not None:
+                query = query.where(pk < stop)
+
+            with conn.begin():
+                page = list(self._resultset_as_dicts(conn.execute(query)))
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            last_pk = page[-1][pk_name]
+
+    def _pk_ranges(self, conn, table_def, pk_column, num_ranges):
+        """
+        Splits the table into at most num_ranges (start, stop) PK ranges which can be read in parallel, where start
+        is inclusive, stop is exclusive, and None means unbounded. Integer PKs are split evenly between their min and
+        max values - any other type of PK is split at PKs sampled at regular intervals from the PK index.
+        """
+        pk = table_def.c[pk_column.name]
+        if pk_column.data_type == "integer":
+            min_pk, max_pk = conn.execute(
+                sqlalchemy.select(sqlalchemy.func.min(pk), sqlalchemy.func.max(pk))
+            ).one()
+            if min_pk is None:
+                return [(None, None)]
+            step = max(1, -(-(max_pk - min_pk + 1) // num_ranges))
+            boundaries = list(range(min_pk + step, max_pk + 1, step))
+        else:
+            count = conn.scalar(
+                sqlalchemy.select(sqlalchemy.func.count()).select_from(table_def)
+            )
+            boundaries = []
+            for i in range(1, num_ranges):
+                query = (
+                    sqlalchemy.select(pk)
+                    .select_from(table_def)
+                    .order_by(pk)
+                    .offset(count * i // num_ranges)
+                    .limit(1)
+                )
+                boundary = conn.scalar(query)
+                if boundary is not None and (
+                    not boundaries or boundary > boundaries[-1]
+                ):
+                    boundaries.append(boundary)
+
+        return list(zip([None] + boundaries, boundaries + [None]))
+
+    def _parallel_keyset_features(self, table_def, pk_name, pk_ranges):
+        """
+        Reads the given PK ranges in parallel - each one using its own connection - and yields all the features,
+        range by range, in PK order. Workers only read a few pages ahead, so memory use stays bounded.
+        """
+        stop_event = threading.Event()
+        range_queues = [queue.Queue(maxsize=self.PAGES_READ_AHEAD) for r in pk_ranges]
+
+        def _put(range_queue, item):
+            while not stop_event.is_set():
+                try:
+                    range_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _read_range(pk_range, range_queue):
+            if stop_event.is_set():
+                return
+            try:
+                with self.engine.connect() as conn:
+                    for page in self._keyset_pages(conn, table_def, pk_name, *pk_range):
+                        if not _put(range_queue, page):
+                            return
+            except Exception as e:
+                _put(range_queue, e)
+                return
+            _put(range_queue, None)
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.num_workers
+        ) as executor:
+            try:
+                for pk_range, range_queue in zip(pk_ranges, range_queues):
+                    executor.submit(_read_range, pk_range, range_queue)
+                for range_queue in range_queues:
+                    while True:
+                        page = range_queue.get()
+                        if page is None:
+                            break
+                        if isinstance(page, Exception):
+                            raise page
+                        yield from page
+            finally:
+                # Stops any workers that are still running if we don't get to the end.
+                stop_event.set()
+
     def _resultset_as_dicts(self, resultset):
         for row in resultset:
             yield dict(zip(row.keys(), row))
@@ -73,6 +73,12 @@ class TableV3(RichTableDataset):
     # == Hidden meta-items (which don't show in diffs) ==
     # How automatically generated PKs have been assigned so far:
     GENERATED_PKS = MetaItemDefinition(
+        re.compile(r"generated-pks/(.*)\.json"),
+        MetaItemFileType.JSON,
+        MetaItemVisibility.HIDDEN,
+    )
+    # The same, as written by older versions of Kart:
+    LEGACY_GENERATED_PKS = MetaItemDefinition(
         "generated-pks.json", MetaItemFileType.JSON, MetaItemVisibility.HIDDEN
     )
     # How primary keys are converted to feature paths:
@@ -93,6 +99,7 @@ class TableV3(RichTableDataset):
         SCHEMA_JSON,
         CRS_DEFINITIONS,
         GENERATED_PKS,
+        LEGACY_GENERATED_PKS,
         PATH_STRUCTURE,
         LEGEND,
     )
@@ -140,7 +147,36 @@ class TableV3(RichTableDataset):
         which might not be the same values that are now in the schema.
         To get a feature consistent with the current schema, call get_feature.
         """
+        pk_values, legend_hash, non_pk_values = self._get_feature_values(
+            pk_values=pk_values, path=path, data=data
+        )
+        legend = self.get_legend(legend_hash)
+        return legend.value_tuples_to_raw_dict(pk_values, non_pk_values)
+
+    def get_feature(self, pk_values=None, *, path=None, data=None, schema=None):
+        """
+        Gets the feature with the given primary key(s) / at the given "full" path.
+        The result is a dict of values keyed by column name.
+        If a schema is supplied, the feature is adapted to that schema, instead of to this dataset's schema.
+        """
+        pk_values, legend_hash, non_pk_values = self._get_feature_values(
+            pk_values=pk_values, path=path, data=data
+        )
+        decode_feature = self.get_feature_decoder(legend_hash, schema)
+        return decode_feature(pk_values, non_pk_values)
 
+    def get_feature_decoder(self, legend_hash, schema=None):
+        """
+        Returns a function that turns the (pk_values, non_pk_values) of a feature stored using the legend with
+        the given hash into a feature dict - see Schema.feature_decoder_for_legend. Decoders are cached per
+        (legend, schema), along with the legend itself.
+        """
+        if schema is None:
+            schema = self.schema
+        return schema.feature_decoder_for_legend(self.get_legend(legend_hash))
+
+    def _get_feature_values(self, pk_values=None, *, path=None, data=None):
+        """Returns (pk_values, legend_hash, non_pk_values) for the given feature."""
         # The caller must supply at least one of (pk_values, path) so we know which
         # feature is meant. We can infer whichever one is missing from the one supplied.
         # If the caller knows both already, they can supply both, to avoid redundant work.
@@ -164,16 +200,7 @@ class TableV3(RichTableDataset):
             data = memoryview(data)
 
         legend_hash, non_pk_values = msg_unpack(data)
-        legend = self.get_legend(legend_hash)
-        return legend.value_tuples_to_raw_dict(pk_values, non_pk_values)
-
-    def get_feature(self, pk_values=None, *, path=None, data=None):
-        """
-        Gets the feature with the given primary key(s) / at the given "full" path.
-        The result is a dict of values keyed by column name.
-        """
-        raw_dict = self.get_raw_feature_dict(pk_values=pk_values, path=path, data=data)
-        return self.schema.feature_from_raw_dict(raw_dict)
+        return pk_values, legend_hash, non_pk_values
 
     def feature_blobs(self):
         """
@@ -270,7 +297,7 @@ class TableV3(RichTableDataset):
         # The legend of said schema is not a meta item, but must also be written.
         yield self.encode_legend(source.schema.legend)
 
-        # This can include non-standard meta-items, like generated-pks.json
+        # This can include non-standard meta-items, like generated-pks/
         meta_items = source.meta_items()
 
         # The path encoder is not a meta-item of the source, since it is only a property
@@ -282,7 +309,10 @@ class TableV3(RichTableDataset):
         for rel_path, content in meta_items.items():
             if content is None:
                 continue
-            if not isinstance(content, bytes):
+            if isinstance(content, pygit2.Blob):
+                # Meta-items that are unchanged from a previous import can be copied as is.
+                content = content.data
+            elif not isinstance(content, bytes):
                 if rel_path.endswith(".json"):
                     content = json_pack(content)
                 else:
@@ -340,12 +370,9 @@ class TableV3(RichTableDataset):
                     yield self.encode_feature(feature, schema)
                     continue
 
-                existing_feature_raw_dict = replacing_dataset.get_raw_feature_dict(
-                    pk_values, data=existing_data
-                )
                 # This adapts the existing feature to the new schema
-                existing_feature = schema.feature_from_raw_dict(
-                    existing_feature_raw_dict
+                existing_feature = replacing_dataset.get_feature(
+                    pk_values, data=existing_data, schema=schema
                 )
                 if existing_feature == feature:
                     # Nothing changed? No need to rewrite the feature blob
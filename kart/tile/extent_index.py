@@ -0,0 +1,172 @@
+import logging
+
+import pygit2
+from pysqlite3 import dbapi2 as sqlite
+from sqlalchemy import Column, Float, Integer, Table, Text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.types import BLOB
+
+from kart.geometry import Geometry
+from kart.lfs_util import pointer_file_bytes_to_dict
+from kart.repo import KartRepoFiles
+from kart.sqlalchemy import TableSet
+from kart.sqlalchemy.sqlite import sqlite_db
+from kart.tile.tilename_util import PAM_SUFFIX, LEN_PAM_SUFFIX
+
+# An index of the extent of every tile in a tile tree, taken from the "nativeExtent" stored in each tile's pointer file.
+# Tile trees are immutable, so each one is only indexed once - the first time it is spatially filtered - and from
+# then on, the tiles that might match a spatial filter can be selected by querying their extents, rather than by
+# reading and parsing every pointer file in the tree.
+
+L = logging.getLogger(__name__)
+
+
+class TileExtentIndexTables(TableSet):
+    """Tables for indexing the extents of the tiles in tile trees."""
+
+    def __init__(self):
+        super().__init__()
+
+        # "indexed_tile_trees" records every tile tree for which the extents of all tiles have been indexed.
+        self.indexed_tile_trees = Table(
+            "indexed_tile_trees",
+            self.sqlalchemy_metadata,
+            # The tree ID (the SHA-1 hash), in binary (20 bytes).
+            Column("tree_id", BLOB, nullable=False, primary_key=True),
+            sqlite_with_rowid=False,
+        )
+
+        # "tile_extents" has a row for every tile and every PAM file in every indexed tile tree.
+        self.tile_extents = Table(
+            "tile_extents",
+            self.sqlalchemy_metadata,
+            Column("tree_id", BLOB, nullable=False, primary_key=True),
+            # The order in which the blob is found when walking the tree - results are returned in this order.
+            Column("seq", Integer, nullable=False, primary_key=True),
+            # Path of the blob relative to the tile tree.
+            Column("path", Text, nullable=False),
+            # The 2D envelope of the tile in the dataset's CRS. PAM files have the same extent as their tile.
+            # Null if the tile has no extent, or if it couldn't be read - such tiles are always checked individually.
+            Column("min_x", Float, nullable=True),
+            Column("max_x", Float, nullable=True),
+            Column("min_y", Float, nullable=True),
+            Column("max_y", Float, nullable=True),
+            sqlite_with_rowid=False,
+        )
+
+
+TileExtentIndexTables.copy_tables_to_class()
+
+
+def tile_extent_index_db(repo):
+    """Context manager giving a connection to the tile extent index of the given repo - commits on success."""
+    return sqlite_db(
+        TileExtentIndexTables, str(repo.gitdir_file(KartRepoFiles.TILE_EXTENTS))
+    )
+
+
+def get_native_extent_envelope(pointer_dict):
+    """
+    Returns the 2D envelope of the nativeExtent in the given pointer dict as (min-x, max-x, min-y, max-y),
+    or None if there is no nativeExtent.
+    """
+    native_extent = pointer_dict.get("nativeExtent")
+    if not native_extent:
+        return None
+    if native_extent.startswith("POLYGON"):
+        return Geometry.from_wkt(native_extent).envelope(
+            only_2d=True, calculate_if_missing=True
+        )
+    return tuple(float(v) for v in native_extent.split(",")[:4])
+
+
+def _iter_tile_extent_rows(tile_tree):
+    """Yields (path, envelope) for every blob in the given tile tree."""
+    envelopes = {}
+
+    def _envelope_of(tile_blob):
+        if tile_blob.id not in envelopes:
+            try:
+                envelopes[tile_blob.id] = get_native_extent_envelope(
+                    pointer_file_bytes_to_dict(tile_blob)
+                )
+            except Exception as e:
+                L.warning("Couldn't read extent of tile %s: %s", tile_blob.name, e)
+                envelopes[tile_blob.id] = None
+        return envelopes[tile_blob.id]
+
+    for parent_path, parent, blob in _all_blobs_with_parent_path(tile_tree):
+        if blob.name.endswith(PAM_SUFFIX):
+            try:
+                tile_blob = parent / blob.name[:-LEN_PAM_SUFFIX]
+            except KeyError:
+                tile_blob = None
+        else:
+            tile_blob = blob
+
+        envelope = _envelope_of(tile_blob) if tile_blob is not None else None
+        yield f"{parent_path}{blob.name}", envelope
+
+
+def _all_blobs_with_parent_path(tree, path=""):
+    """Like all_blobs_with_parent_in_tree, but also yields the path of the parent, relative to the given tree."""
+    for entry in tree:
+        if entry.type == pygit2.GIT_OBJ_BLOB:
+            yield path, tree, entry
+        elif entry.type == pygit2.GIT_OBJ_TREE:
+            yield from _all_blobs_with_parent_path(entry, f"{path}{entry.name}/")
+
+
+def _index_tile_tree(db, tile_tree):
+    tree_id = tile_tree.id.raw
+    db.execute("DELETE FROM tile_extents WHERE tree_id = ?;", (tree_id,))
+    db.executemany(
+        "INSERT INTO tile_extents (tree_id, seq, path, min_x, max_x, min_y, max_y) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?);",
+        (
+            (tree_id, seq, path, *(envelope or (None, None, None, None)))
+            for seq, (path, envelope) in enumerate(_iter_tile_extent_rows(tile_tree))
+        ),
+    )
+    db.execute(
+        "INSERT OR IGNORE INTO indexed_tile_trees (tree_id) VALUES (?);", (tree_id,)
+    )
+
+
+def find_candidate_tile_paths(repo, tile_tree, envelope):
+    """
+    Returns the paths (relative to the tile tree) of every tile or PAM file in the given tile tree that could match
+    the given envelope (min-x, max-x, min-y, max-y) - that is, whose extent intersects it, or whose extent is unknown.
+    The caller should still check each tile individually, since a tile's extent may not be a rectangle.
+    Indexes the tile tree first if it is not yet indexed.
+
+    Returns a tuple (candidate_paths, tile_count) where tile_count is the total number of tiles in the tree (not
+    including PAM files) - or returns None if the index can't be used.
+    """
+    tree_id = tile_tree.id.raw
+    min_x, max_x, min_y, max_y = envelope
+    try:
+        with tile_extent_index_db(repo) as db:
+            is_indexed = db.execute(
+                "SELECT 1 FROM indexed_tile_trees WHERE tree_id = ?;", (tree_id,)
+            ).fetchone()
+            if not is_indexed:
+                _index_tile_tree(db, tile_tree)
+
+            candidate_paths = [
+                row[0]
+                for row in db.execute(
+                    "SELECT path FROM tile_extents WHERE tree_id = ? AND "
+                    "(min_x IS NULL OR (max_x >= ? AND min_x <= ? AND max_y >= ? AND min_y <= ?)) "
+                    "ORDER BY seq;",
+                    (tree_id, min_x, max_x, min_y, max_y),
+                )
+            ]
+            (tile_count,) = db.execute(
+                "SELECT COUNT(*) FROM tile_extents WHERE tree_id = ? AND path NOT LIKE ?;",
+                (tree_id, f"%{PAM_SUFFIX}"),
+            ).fetchone()
+            return candidate_paths, tile_count
+    except (sqlite.Error, SQLAlchemyError) as e:
+        L.info("Couldn't use the tile extent index: %s", e)
+        return None
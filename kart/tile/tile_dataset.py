@@ -21,6 +21,7 @@ from kart.meta_items import MetaItemDefinition, MetaItemFileType
 from kart.progress_util import progress_bar
 from kart.serialise_util import hexhash
 from kart.spatial_filter import SpatialFilter
+from kart.tile.extent_index import find_candidate_tile_paths
 from kart.tile.tilename_util import (
     find_similar_files_case_insensitive,
     PAM_SUFFIX,
@@ -92,12 +93,36 @@ class TileDataset(BaseDataset):
         n_read = 0
         n_matched = 0
         n_total = self.tile_count if show_progress else 0
+
+        blobs_with_parent = None
+        if spatial_filter.filter_env is not None:
+            # Use the tile extent index to avoid reading every pointer file - only the candidates are read.
+            candidates = find_candidate_tile_paths(
+                self.repo, tile_tree, spatial_filter.filter_env
+            )
+            if candidates is not None:
+                candidate_paths, tile_count = candidates
+                blobs_with_parent = self._blobs_with_parent_at_paths(
+                    tile_tree, candidate_paths
+                )
+                n_read = tile_count - sum(
+                    1 for path in candidate_paths if not path.endswith(PAM_SUFFIX)
+                )
+                n_total = tile_count if show_progress else 0
+
+        if blobs_with_parent is None:
+            blobs_with_parent = all_blobs_with_parent_in_tree(tile_tree)
+
         progress = progress_bar(
-            show_progress=show_progress, total=n_total, unit="tile", desc=self.path
+            show_progress=show_progress,
+            total=n_total,
+            initial=n_read,
+            unit="tile",
+            desc=self.path,
         )
 
         with progress as p:
-            for parent, blob in all_blobs_with_parent_in_tree(tile_tree):
+            for parent, blob in blobs_with_parent:
                 if blob.name.endswith(PAM_SUFFIX):
                     is_tile = False
                     try:
@@ -130,6 +155,18 @@ class TileDataset(BaseDataset):
                 f"(of {n_read} tiles read, wrote {n_matched} matching tiles to the working copy due to spatial filter)"
             )
 
+    @staticmethod
+    def _blobs_with_parent_at_paths(tile_tree, paths):
+        """Yields (parent, blob) for each of the given paths, which are relative to the given tile tree."""
+        parents = {}
+        for path in paths:
+            parent_path, _, name = path.rpartition("/")
+            parent = parents.get(parent_path)
+            if parent is None:
+                parent = tile_tree / parent_path if parent_path else tile_tree
+                parents[parent_path] = parent
+            yield parent, parent / name
+
     def tile_pointer_blobs(
         self, spatial_filter=SpatialFilter.MATCH_ALL, show_progress=False
     ):
@@ -1,3 +1,6 @@
+import concurrent.futures
+import json
+import math
 import uuid
 from datetime import datetime
 from pathlib import Path
@@ -9,13 +12,14 @@ from kart import context
 from kart.create_workingcopy import create_workingcopy
 from kart.exceptions import InvalidOperation, NotFound
 from kart.fast_import import ReplaceExisting, fast_import_tables
-from kart.repo import KartConfigKeys, KartRepo
-from kart.tabular.version import DEFAULT_NEW_REPO_VERSION
+from kart.object_builder import ObjectBuilder
+from kart.repo import KartConfigKeys, KartRepo, KartRepoFiles
+from kart.tabular.version import DEFAULT_NEW_REPO_VERSION, extra_blobs_for_version
 from kart.serialise_util import ensure_bytes
 from kart.structure import RepoStructure
 from kart.tabular.v2 import TableV2
-from kart.timestamps import minutes_to_tz_offset
 from kart.cli_util import KartCommand
+from kart.utils import get_num_available_cores
 
 
 def dataset_class_for_legacy_version(version, in_place=False):
@@ -110,6 +114,86 @@ class ForceLatestVersionRepo(KartRepo):
         return DEFAULT_NEW_REPO_VERSION
 
 
+# Temporary branches that datasets are imported onto are named with this prefix, followed by a UUID.
+# This will never collide with a real branch, so we can happily delete any such branches we find.
+UPGRADE_REF_PREFIX = "refs/heads/kart-upgrade-"
+
+# The commits that datasets are imported in are temporary, and are garbage collected at the end of the upgrade.
+UPGRADE_SIGNATURE = ("Kart", "kart-upgrade@localhost")
+
+
+class UpgradeCheckpoint:
+    """
+    Records the progress of an upgrade in the destination repo, so that an interrupted upgrade can be resumed -
+    which datasets have been converted, and which commits have been written. Progress is recorded as lines of JSON
+    that are appended to the checkpoint file, so that recording progress is cheap no matter how much has been done.
+    """
+
+    def __init__(self, dest_repo, source_repo):
+        self.path = dest_repo.gitdir_file(KartRepoFiles.UPGRADE_CHECKPOINT)
+        # {(ds_path, source_tree_hex): (dest_tree_hex, feature_count)}
+        self.datasets = {}
+        # {source_commit_hex: dest_commit_hex}
+        self.commits = {}
+
+        source_path = str(Path(source_repo.path).resolve())
+        if self.path.exists():
+            self._load(dest_repo, source_path)
+        else:
+            self._append({"source": source_path})
+
+    @classmethod
+    def exists(cls, dest_path):
+        try:
+            dest_repo = KartRepo(dest_path)
+        except NotFound:
+            return False
+        return dest_repo.gitdir_file(KartRepoFiles.UPGRADE_CHECKPOINT).exists()
+
+    def _load(self, dest_repo, source_path):
+        with self.path.open(encoding="utf8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # The last line may have only been partially written.
+
+                if "source" in record and record["source"] != source_path:
+                    raise InvalidOperation(
+                        f"Cannot resume upgrade: it was started from a different source repository ({record['source']})"
+                    )
+                # Objects that were written but not yet referenced could have been garbage collected since.
+                if "dataset" in record and record["dest"] in dest_repo:
+                    key = (record["dataset"], record["source"])
+                    self.datasets[key] = (record["dest"], record["features"])
+                if "commit" in record and record["dest"] in dest_repo:
+                    self.commits[record["commit"]] = record["dest"]
+
+    def record_dataset(self, key, result):
+        ds_path, source_tree_hex = key
+        dest_tree_hex, feature_count = result
+        self.datasets[key] = result
+        self._append(
+            {
+                "dataset": ds_path,
+                "source": source_tree_hex,
+                "dest": dest_tree_hex,
+                "features": feature_count,
+            }
+        )
+
+    def record_commit(self, source_commit_hex, dest_commit_hex):
+        self.commits[source_commit_hex] = dest_commit_hex
+        self._append({"commit": source_commit_hex, "dest": dest_commit_hex})
+
+    def _append(self, record):
+        with self.path.open("a", encoding="utf8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def remove(self):
+        self.path.unlink()
+
+
 @click.command(cls=KartCommand)
 @click.pass_context
 @click.option(
@@ -119,13 +203,23 @@ class ForceLatestVersionRepo(KartRepo):
     hidden=True,
     help="Irreversibly upgrade a repo in place.",
 )
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="How many datasets to convert in parallel. Use 0 for the number of available CPU cores.",
+)
 @click.argument("source", type=click.Path(exists=True, file_okay=False), required=True)
 @click.argument("dest", type=click.Path(writable=True), required=True)
-def upgrade(ctx, source, dest, in_place):
+def upgrade(ctx, source, dest, in_place, jobs):
     """
     Upgrade a repository for an earlier version of Kart to be compatible with the latest version.
     The current repository structure of Kart is known as Datasets V2, which is used from kart/Kart 0.5 onwards.
 
+    If an upgrade is interrupted, running the same command again resumes it where it left off.
+
     Usage:
     kart upgrade SOURCE DEST
     """
@@ -135,8 +229,11 @@ def upgrade(ctx, source, dest, in_place):
     if in_place:
         dest = source
 
+    resume = False
     if not in_place and dest.exists() and any(dest.iterdir()):
-        raise InvalidOperation(f'"{dest}" isn\'t empty', param_hint="DEST")
+        if not UpgradeCheckpoint.exists(dest):
+            raise InvalidOperation(f'"{dest}" isn\'t empty', param_hint="DEST")
+        resume = True
 
     try:
         source_repo = KartRepo(source)
@@ -163,9 +260,15 @@ def upgrade(ctx, source, dest, in_place):
             f"Unrecognised source repository version: {source_version}"
         )
 
+    if jobs == 0:
+        jobs = max(1, int(math.ceil(get_num_available_cores())))
+
     # action!
     if in_place:
         dest_repo = ForceLatestVersionRepo(dest)
+    elif resume:
+        click.secho(f"Resuming upgrade of {dest} ...", bold=True)
+        dest_repo = KartRepo(dest)
     else:
         click.secho(f"Initialising {dest} ...", bold=True)
         dest.mkdir()
@@ -173,18 +276,50 @@ def upgrade(ctx, source, dest, in_place):
             dest, wc_location=None, bare=source_repo.is_bare
         )
 
+    checkpoint = UpgradeCheckpoint(dest_repo, source_repo)
+    # Clean up after any import that was interrupted.
+    for ref_name in list(dest_repo.references):
+        if ref_name.startswith(UPGRADE_REF_PREFIX):
+            dest_repo.references.delete(ref_name)
+
     # walk _all_ references
     source_walker = source_repo.walk(
         None, pygit2.GIT_SORT_TOPOLOGICAL | pygit2.GIT_SORT_REVERSE
     )
     for ref in source_repo.listall_reference_objects():
         source_walker.push(ref.resolve().target)
+    source_commits = list(source_walker)
+
+    # Each dataset is converted at most once for each different source tree it has, no matter how many commits
+    # it appears in. The conversions are independent of each other (except that where possible, a dataset is
+    # converted by only updating the features that changed since the conversion of the same dataset in the
+    # parent commit) so they can be done in parallel - only writing the commits themselves is sequential.
+    commit_datasets, conversions = _plan_dataset_conversions(
+        source_repo, source_commits, source_dataset_class, checkpoint
+    )
 
-    commit_map = {}
+    click.secho("\nConverting datasets ...", bold=True)
+    _convert_datasets(
+        conversions,
+        checkpoint,
+        jobs,
+        worker_args=(
+            str(source),
+            str(dest),
+            source_version,
+            in_place,
+            ctx.obj.verbosity if jobs == 1 else 0,
+        ),
+    )
+    click.echo(f"{len(conversions)} dataset versions converted.")
 
     click.secho("\nWriting new commits ...", bold=True)
+    commit_map = checkpoint.commits
     i = -1
-    for i, source_commit in enumerate(source_walker):
+    for i, source_commit in enumerate(source_commits):
+        if source_commit.hex in commit_map:
+            continue  # Already written before the upgrade was interrupted.
+
         dest_parents = []
         for parent_id in source_commit.parent_ids:
             try:
@@ -195,14 +330,13 @@ def upgrade(ctx, source, dest, in_place):
                 )
 
         _upgrade_commit(
-            ctx,
             i,
-            source_repo,
             source_commit,
-            source_dataset_class,
+            commit_datasets[source_commit.hex],
+            conversions,
             dest_parents,
             dest_repo,
-            commit_map,
+            checkpoint,
         )
 
     click.echo(f"{i+1} commits processed.")
@@ -217,7 +351,7 @@ def upgrade(ctx, source, dest, in_place):
 
     for ref in source_repo.listall_reference_objects():
         if ref.type == pygit2.GIT_REF_SYMBOLIC:
-            dest_repo.references.create(ref.name, ref.target)
+            dest_repo.references.create(ref.name, ref.target, True)
             click.echo(f"  {ref.name} → {ref.target}")
 
     if i >= 0:
@@ -237,6 +371,8 @@ def upgrade(ctx, source, dest, in_place):
 
         dest_repo.gc("--prune=now")
 
+    checkpoint.remove()
+
     if source_repo.workingcopy_location:
         click.secho("\nCreating working copy ...", bold=True)
         subctx = click.Context(ctx.command, parent=ctx)
@@ -252,72 +388,182 @@ def upgrade(ctx, source, dest, in_place):
     click.secho("\nUpgrade complete", fg="green", bold=True)
 
 
-def _upgrade_commit(
-    ctx,
-    i,
-    source_repo,
-    source_commit,
-    source_dataset_class,
-    dest_parent_ids,
-    dest_repo,
-    commit_map,
+class _DatasetConversion:
+    """
+    A dataset that needs converting - the dataset at ds_path in source_commit - and, if it can be converted
+    incrementally, the key of the conversion of the same dataset in base_commit (the first parent of source_commit).
+    """
+
+    def __init__(self, ds_path, source_commit_hex, base_key=None, base_commit_hex=None):
+        self.ds_path = ds_path
+        self.source_commit_hex = source_commit_hex
+        self.base_key = base_key
+        self.base_commit_hex = base_commit_hex
+
+
+def _plan_dataset_conversions(
+    source_repo, source_commits, source_dataset_class, checkpoint
 ):
-    source_rs = RepoStructure(source_repo, source_commit)
-    source_datasets = source_rs.datasets(force_dataset_class=source_dataset_class)
-    dataset_count = len(source_datasets)
+    """
+    Finds every dataset that needs converting. Returns a tuple (commit_datasets, conversions) where
+    commit_datasets is a dict {source_commit_hex: {ds_path: source_tree_hex}} and conversions is a dict
+    {(ds_path, source_tree_hex): _DatasetConversion} - in the order the source commits are given in, so that the
+    conversion that any conversion is based on comes first. Conversions already recorded in the checkpoint are
+    left out.
+    """
+    # Earlier dataset versions are no longer full-featured so we can't diff them anymore, so we can't
+    # convert them incrementally.
+    can_diff = hasattr(source_dataset_class, "diff_feature")
+
+    commit_datasets = {}
+    conversions = {}
+    for source_commit in source_commits:
+        source_datasets = RepoStructure(source_repo, source_commit).datasets(
+            force_dataset_class=source_dataset_class
+        )
+        datasets = {ds.path: ds.tree.hex for ds in source_datasets}
+        commit_datasets[source_commit.hex] = datasets
+        if source_commit.hex in checkpoint.commits:
+            continue
+
+        parent = source_commit.parents[0] if source_commit.parents else None
+        parent_datasets = commit_datasets.get(parent.hex, {}) if parent else {}
+        for ds_path, tree_hex in datasets.items():
+            key = (ds_path, tree_hex)
+            if key in conversions or key in checkpoint.datasets:
+                continue
+            parent_tree_hex = parent_datasets.get(ds_path)
+            if can_diff and parent_tree_hex:
+                conversions[key] = _DatasetConversion(
+                    ds_path, source_commit.hex, (ds_path, parent_tree_hex), parent.hex
+                )
+            else:
+                conversions[key] = _DatasetConversion(ds_path, source_commit.hex)
 
-    s = source_commit
-    author_time = f"{s.author.time} {minutes_to_tz_offset(s.author.offset)}"
-    commit_time = f"{s.commit_time} {minutes_to_tz_offset(s.commit_time_offset)}"
-
-    # We import the commit onto a temporary branch, and fix the branch heads later.
-    # We choose a name that will never collide with a real branch so we can happily delete it later.
-    upgrade_ref = f"refs/heads/kart-upgrade-{uuid.uuid4()}"
-    header = (
-        f"commit {upgrade_ref}\n"
-        f"author {s.author.name} <{s.author.email}> {author_time}\n"
-        f"committer {s.committer.name} <{s.committer.email}> {commit_time}\n"
-        f"data {len(s.message.encode('utf8'))}\n{s.message}\n"
-    )
+    return commit_datasets, conversions
+
+
+def _convert_datasets(conversions, checkpoint, jobs, worker_args):
+    """
+    Does all the given conversions, using jobs worker processes, and records the results in the checkpoint.
+    A conversion that is based on another conversion is started once that conversion has finished.
+    """
 
-    sole_dataset_diff = _find_sole_dataset_diff(
-        source_repo, source_commit, source_datasets, source_dataset_class
+    def conversion_args(key):
+        conversion = conversions[key]
+        base_tree_hex = None
+        if conversion.base_key:
+            base_tree_hex, _ = checkpoint.datasets[conversion.base_key]
+        return (
+            conversion.ds_path,
+            conversion.source_commit_hex,
+            conversion.base_commit_hex,
+            base_tree_hex,
+        )
+
+    if jobs == 1:
+        _init_worker(*worker_args)
+        for key in conversions:
+            checkpoint.record_dataset(key, _convert_dataset(*conversion_args(key)))
+        return
+
+    ready = []
+    dependents = {}
+    for key, conversion in conversions.items():
+        if conversion.base_key and conversion.base_key not in checkpoint.datasets:
+            dependents.setdefault(conversion.base_key, []).append(key)
+        else:
+            ready.append(key)
+    ready.reverse()
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=worker_args
+    ) as executor:
+        running = {}
+        while ready or running:
+            # Keep the workers busy, but don't get too far ahead of the results.
+            while ready and len(running) < jobs * 2:
+                key = ready.pop()
+                future = executor.submit(_convert_dataset, *conversion_args(key))
+                running[future] = key
+
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                key = running.pop(future)
+                checkpoint.record_dataset(key, future.result())
+                ready.extend(reversed(dependents.pop(key, [])))
+
+
+# The state used by each worker process - each worker opens its own repos.
+_worker_source_repo = None
+_worker_dest_repo = None
+_worker_dataset_class = None
+_worker_verbosity = None
+
+
+def _init_worker(source_path, dest_path, source_version, in_place, verbosity):
+    global _worker_source_repo, _worker_dest_repo, _worker_dataset_class, _worker_verbosity
+
+    _worker_source_repo = KartRepo(source_path)
+    _worker_dest_repo = (ForceLatestVersionRepo if in_place else KartRepo)(dest_path)
+    _worker_dataset_class = dataset_class_for_legacy_version(source_version, in_place)
+    _worker_verbosity = verbosity
+
+
+def _convert_dataset(ds_path, source_commit_hex, base_commit_hex, base_tree_hex):
+    """
+    Runs in a worker process. Imports the dataset at ds_path in the given source commit into the destination repo,
+    and returns a tuple (dest_tree_hex, feature_count) - the converted dataset's tree, and how many features were
+    imported. If base_commit_hex and base_tree_hex are given, only the features that have changed since the base
+    commit are imported, on top of the base tree - the base commit's version of the dataset, already converted.
+    """
+    from kart.diff_util import get_dataset_diff
+
+    source_repo, dest_repo = _worker_source_repo, _worker_dest_repo
+    source_datasets = RepoStructure(source_repo, source_commit_hex).datasets(
+        force_dataset_class=_worker_dataset_class
     )
+    dataset = source_datasets[ds_path]
 
-    if sole_dataset_diff:
-        # Optimisation - we can use feature_ids if we are only importing one dataset at a time, and,
-        # we have access to the parent commit.
-        ds_path, ds_diff = sole_dataset_diff
-        source_datasets = [source_datasets[ds_path]]
+    # We import the dataset onto a temporary branch, and delete the branch afterwards - we only need the tree.
+    upgrade_ref = f"{UPGRADE_REF_PREFIX}{uuid.uuid4()}"
+    name, email = UPGRADE_SIGNATURE
+    header = f"commit {upgrade_ref}\ncommitter {name} <{email}> 0 +0000\ndata 0\n"
+
+    if base_commit_hex:
+        base_datasets = RepoStructure(source_repo, base_commit_hex).datasets(
+            force_dataset_class=_worker_dataset_class
+        )
+        ds_diff = get_dataset_diff(ds_path, base_datasets, source_datasets)
         replace_existing = ReplaceExisting.GIVEN
-        from_id = commit_map[source_commit.parents[0].hex]
-        from_commit = dest_repo[from_id]
-        merge_ids = [p for p in dest_parent_ids if p != from_id]
         replace_ids = list(ds_diff.get("feature", {}).keys())
         feature_count = len(replace_ids)
+
+        object_builder = ObjectBuilder(dest_repo, None)
+        _insert_dataset_tree(object_builder, ds_path, dest_repo[base_tree_hex])
+        signature = pygit2.Signature(name, email, 0, 0)
+        from_commit = object_builder.commit(None, signature, signature, "", [])
+        header += f"from {from_commit.hex}\n"
     else:
-        from_id = from_commit = None
-        merge_ids = dest_parent_ids
         replace_existing = ReplaceExisting.ALL
         replace_ids = None
-        feature_count = sum(s.feature_count for s in source_datasets)
-
-    if from_id:
-        header += f"from {from_id}\n"
-    header += "".join(f"merge {p}\n" for p in merge_ids)
+        feature_count = dataset.feature_count
+        from_commit = None
 
     try:
         fast_import_tables(
             dest_repo,
-            source_datasets,
+            [dataset],
             replace_existing=replace_existing,
             from_commit=from_commit,
             replace_ids=replace_ids,
-            verbosity=ctx.obj.verbosity,
+            verbosity=_worker_verbosity,
             header=header,
             extra_cmd_args=["--force"],
         )
-        dest_commit = dest_repo.references.get(upgrade_ref).target
+        dest_commit = dest_repo[dest_repo.references.get(upgrade_ref).target]
     finally:
         # delete the extra branch ref we just created; we don't need/want it
         try:
@@ -325,60 +571,55 @@ def _upgrade_commit(
         except KeyError:
             pass  # Nothing to delete, probably due to some earlier failure.
 
-    commit_map[source_commit.hex] = dest_commit.hex
+    return (dest_commit.tree / ds_path).hex, feature_count
 
-    commit_time = datetime.fromtimestamp(source_commit.commit_time)
-    click.echo(
-        f"  {i}: {source_commit.hex[:8]} → {dest_commit.hex[:8]}"
-        f" ({commit_time}; {source_commit.committer.name}; {dataset_count} datasets; {feature_count} rows)"
-    )
+
+def _insert_dataset_tree(object_builder, ds_path, dest_tree):
+    # The contents of the tree are inserted one by one rather than the tree itself, in case datasets are nested.
+    for obj in dest_tree:
+        object_builder.insert(f"{ds_path}/{obj.name}", obj)
 
 
-def _find_sole_dataset_diff(
-    source_repo, source_commit, source_datasets, source_dataset_class
+def _upgrade_commit(
+    i,
+    source_commit,
+    datasets,
+    conversions,
+    dest_parent_ids,
+    dest_repo,
+    checkpoint,
 ):
     """
-    Returns a tuple (dataset_path, dataset_diff) if there is only one dataset which is changed
-    in source_commit (when comparing source_commit to its first parent). Otherwise returns None.
+    Writes the upgraded version of the given source commit, given its datasets {ds_path: source_tree_hex} - which
+    must all have been converted already - and the IDs of the upgraded versions of its parents.
     """
-    if not hasattr(source_dataset_class, "diff_feature"):
-        # Earlier dataset versions are no longer full-featured so we can't diff them anymore,
-        # so, we don't do this optimisation.
-        return None
-
-    parent_commit = source_commit.parents[0] if source_commit.parents else None
-    if not parent_commit:
-        # Initial commit - this optimisation won't help here anyway.
-        return None
-
-    parent_rs = RepoStructure(source_repo, parent_commit)
-    parent_datasets = parent_rs.datasets(force_dataset_class=source_dataset_class)
-    source_ds_paths = {ds.path for ds in source_datasets}
-    parent_ds_paths = {ds.path for ds in parent_datasets}
-
-    all_ds_paths = source_ds_paths | parent_ds_paths
-    all_changed_ds_paths = [
-        path
-        for path in all_ds_paths
-        if _is_path_changed(parent_commit, source_commit, path)
-    ]
-    if len(all_changed_ds_paths) != 1:
-        return None
-
-    from kart.diff_util import get_dataset_diff
+    object_builder = ObjectBuilder(dest_repo, None)
+    for path, data in extra_blobs_for_version(dest_repo.table_dataset_version):
+        object_builder.insert(path, data)
+
+    feature_count = 0
+    for ds_path, tree_hex in sorted(datasets.items()):
+        key = (ds_path, tree_hex)
+        dest_tree_hex, ds_feature_count = checkpoint.datasets[key]
+        _insert_dataset_tree(object_builder, ds_path, dest_repo[dest_tree_hex])
+        if (
+            conversions.get(key)
+            and conversions[key].source_commit_hex == source_commit.hex
+        ):
+            feature_count += ds_feature_count
 
-    ds_path = all_changed_ds_paths[0]
-    ds_diff = get_dataset_diff(ds_path, parent_datasets, source_datasets)
-    return ds_path, ds_diff
-
-
-def _is_path_changed(treeish_a, treeish_b, path):
-    def lookup_path(tree, path):
-        try:
-            return tree / path
-        except KeyError:
-            return None
+    s = source_commit
+    dest_commit = object_builder.commit(
+        None,
+        s.author,
+        s.committer,
+        s.message,
+        [pygit2.Oid(hex=p) for p in dest_parent_ids],
+    )
+    checkpoint.record_commit(source_commit.hex, dest_commit.hex)
 
-    tree_a = lookup_path(treeish_a.peel(pygit2.Tree), path)
-    tree_b = lookup_path(treeish_b.peel(pygit2.Tree), path)
-    return tree_a != tree_b
+    commit_time = datetime.fromtimestamp(source_commit.commit_time)
+    click.echo(
+        f"  {i}: {source_commit.hex[:8]} → {dest_commit.hex[:8]}"
+        f" ({commit_time}; {source_commit.committer.name}; {len(datasets)} datasets; {feature_count} rows)"
+    )
@@ -23,7 +23,8 @@ from kart.exceptions import (
     translate_subprocess_exit_code,
 )
 from kart.lfs_util import get_local_path_from_lfs_hash, dict_to_pointer_file_bytes
-from kart.lfs_commands import fetch_lfs_blobs_for_pointer_files
+from kart.lfs_commands import start_fetching_lfs_blobs_for_pointer_files
+from kart.lfs_index import touch_lfs_objects
 from kart.key_filters import RepoKeyFilter
 from kart.output_util import InputMode, get_input_mode
 from kart.reflink_util import try_reflink
@@ -95,6 +96,9 @@ class FileSystemWorkingCopy(WorkingCopyPart):
         self.repo = repo
         self.path = repo.workdir_path
 
+        self._lfs_fetcher = None
+        self._lfs_oids_used = None
+
         self.index_path = repo.gitdir_file("workdir-index")
         self.state_path = repo.gitdir_file("workdir-state.db")
 
@@ -369,7 +373,8 @@ class FileSystemWorkingCopy(WorkingCopyPart):
             repo_key_filter,
         )
 
-        pointer_files_to_fetch = set()
+        # Ordered, so that tiles are fetched in the same order that they are written.
+        pointer_files_to_fetch = {}
         workdir_diff_cache = self.workdir_diff_cache()
         update_diffs = {}
 
@@ -377,7 +382,7 @@ class FileSystemWorkingCopy(WorkingCopyPart):
         # - For the datasets that will be inserted (written from scratch):
         for ds_path in ds_inserts:
             pointer_files_to_fetch.update(
-                blob.hex
+                (blob.hex, None)
                 for blob in target_datasets[ds_path].tile_pointer_blobs(
                     self.repo.spatial_filter
                 )
@@ -393,7 +398,7 @@ class FileSystemWorkingCopy(WorkingCopyPart):
                 repo_key_filter[ds_path],
             )
             pointer_files_to_fetch.update(
-                blob.hex
+                (blob.hex, None)
                 for blob in self._list_new_pointer_blobs_for_diff(
                     update_diffs[ds_path], target_datasets[ds_path]
                 )
@@ -401,13 +406,11 @@ class FileSystemWorkingCopy(WorkingCopyPart):
 
         # We fetch the LFS tiles immediately before writing them to the working copy -
         # unlike ODB objects that are already fetched.
-        fetch_lfs_blobs_for_pointer_files(
-            self.repo, pointer_files_to_fetch, quiet=quiet
-        )
-
-        # Second pass - actually update the working copy:
+        # Second pass - actually update the working copy - each tile is written as soon as it has been fetched:
 
-        with self.workdir_index_session() as workdir_index:
+        with self._fetching_lfs_blobs(
+            pointer_files_to_fetch, quiet=quiet
+        ), self.workdir_index_session() as workdir_index:
             if ds_deletes:
                 self.delete_datasets_from_workdir(
                     [base_datasets[d] for d in ds_deletes], workdir_index
@@ -440,6 +443,28 @@ class FileSystemWorkingCopy(WorkingCopyPart):
                 sess, self.repo.spatial_filter.hexhash
             )
 
+    @contextlib.contextmanager
+    def _fetching_lfs_blobs(self, pointer_files, quiet=False):
+        """
+        Starts fetching the LFS blobs for the given pointer files in the background. While this context is active,
+        _write_tile_or_pam_file_to_workdir waits for each tile to be fetched before writing it - so that tiles are
+        written as they arrive, rather than once they have all been fetched.
+        Every LFS blob written to the working copy is marked as recently used in the LFS index, for the benefit of gc.
+        """
+        self._lfs_oids_used = []
+        try:
+            with start_fetching_lfs_blobs_for_pointer_files(
+                self.repo, pointer_files, quiet=quiet
+            ) as lfs_fetcher:
+                self._lfs_fetcher = lfs_fetcher
+                try:
+                    yield lfs_fetcher
+                finally:
+                    self._lfs_fetcher = None
+        finally:
+            touch_lfs_objects(self.repo, self._lfs_oids_used)
+            self._lfs_oids_used = None
+
     def write_attached_files_to_workdir(
         self, base_tree, target_tree, workdir_index, track_changes_as_dirty=False
     ):
@@ -731,6 +756,10 @@ class FileSystemWorkingCopy(WorkingCopyPart):
         tilename = tile_summary["pamName" if use_pam_prefix else "name"]
         oid = tile_summary["pamOid" if use_pam_prefix else "oid"]
         size = tile_summary["pamSize" if use_pam_prefix else "size"]
+        if self._lfs_fetcher is not None:
+            # If the tile couldn't be fetched, this raises - which stops the workdir-index session from being written
+            # and the state table from being updated, the same as if the fetch had failed before any writing began.
+            self._lfs_fetcher.wait_for(oid)
         lfs_path = get_local_path_from_lfs_hash(self.repo, oid)
         if not lfs_path.is_file():
             click.echo(f"Couldn't find {tilename} locally - skipping...", err=True)
@@ -744,6 +773,8 @@ class FileSystemWorkingCopy(WorkingCopyPart):
 
         if not skip_write_tile:
             try_reflink(lfs_path, workdir_path)
+            if self._lfs_oids_used is not None:
+                self._lfs_oids_used.append(oid)
 
         if write_to_index:
             # In general, after writing a dataset, we ask Git to build an index of the workdir,
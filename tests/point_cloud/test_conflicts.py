@@ -2,6 +2,7 @@ import re
 import shutil
 
 from .fixtures import requires_pdal  # noqa
+from kart.lfs_index import lfs_index_db
 from kart.lfs_util import get_hash_and_size_of_file
 from kart.repo import KartRepo
 
@@ -214,6 +215,12 @@ def test_resolve_conflict_with_file(cli_runner, data_archive, requires_pdal, tmp
             "Resolved 1 conflict. 0 conflicts to go.",
             "Use `kart merge --continue` to complete the merge",
         ]
+        # The resolution is in the LFS cache, and the LFS index knows it is there.
+        with lfs_index_db(repo) as db:
+            assert db.execute(
+                "SELECT size FROM lfs_objects WHERE oid = ?;",
+                ("32b5fe23040b236dfe469456dd8f7ebbb4dcb3326305ba3e183714a32e4dd1ac",),
+            ).fetchone() == (2137,)
 
         r = cli_runner.invoke(
             [
@@ -1,4 +1,5 @@
 from glob import glob
+import io
 import json
 import shutil
 import subprocess
@@ -592,3 +593,63 @@ def test_import_convert_to_copc_mismatched_schema(
             # This is disallowed even though we are converting to COPC, since these tiles would have different
             # schemas even once converted to COPC.
             assert "The imported files would have more than one schema:" in r.stderr
+
+
+def test_native_las_header_matches_pdal(data_archive_readonly, requires_pdal):
+    from kart.point_cloud import metadata_util
+    from kart.point_cloud.las_header import read_las_header, UnsupportedLasHeader
+
+    with data_archive_readonly("point-cloud/auckland.tgz") as auckland:
+        for tile_path in sorted(glob(f"{auckland}/auckland/auckland_*.copc.laz")):
+            read_las_header(tile_path)
+            native = metadata_util.extract_pc_tile_metadata(tile_path)
+
+            def _unsupported(path):
+                raise UnsupportedLasHeader("Forcing PDAL")
+
+            with pytest.MonkeyPatch.context() as m:
+                m.setattr(metadata_util, "read_las_header", _unsupported)
+                using_pdal = metadata_util.extract_pc_tile_metadata(tile_path)
+
+            assert native == using_pdal
+
+    with data_archive_readonly("point-cloud/las-autzen.tgz") as autzen:
+        # Autzen stores its CRS as GeoTIFF keys - the native parser leaves this to PDAL.
+        with pytest.raises(UnsupportedLasHeader):
+            read_las_header(f"{autzen}/autzen.las")
+        metadata = metadata_util.extract_pc_tile_metadata(f"{autzen}/autzen.las")
+        assert metadata["format.json"]["lasVersion"] == "1.2"
+
+
+def test_las_header_range_read_from_s3(data_archive_readonly, monkeypatch):
+    from kart import s3_util
+    from kart.point_cloud.las_header import read_las_header, read_las_header_from_s3
+
+    with data_archive_readonly("point-cloud/auckland.tgz") as auckland:
+        tile_path = f"{auckland}/auckland/auckland_0_0.copc.laz"
+        with open(tile_path, "rb") as f:
+            tile_bytes = f.read()
+
+        ranges_requested = []
+
+        class FakeS3Client:
+            def get_object(self, Bucket, Key, Range):
+                start, end = (int(x) for x in Range[len("bytes=") :].split("-"))
+                ranges_requested.append((start, end))
+                return {"Body": io.BytesIO(tile_bytes[start : end + 1])}
+
+        monkeypatch.setattr(s3_util, "get_s3_client", lambda **kwargs: FakeS3Client())
+        monkeypatch.setattr(s3_util.S3RangeReader, "DEFAULT_BLOCK_SIZE", 1024)
+
+        header = read_las_header_from_s3(
+            "s3://example-bucket/auckland_0_0.copc.laz", size=len(tile_bytes)
+        )
+        assert header == read_las_header(tile_path)
+
+        # Only the blocks containing the header, the VLRs and the EVLR header were fetched -
+        # the point data in between was not:
+        assert sorted(ranges_requested) == [
+            (0, 1023),
+            (1024, 2047),
+            (54272, len(tile_bytes) - 1),
+        ]
@@ -231,3 +231,32 @@ def test_spatial_filtered_diff(data_archive, cli_runner, tmp_path, requires_pdal
             "    tile:",
             "      1 spatial filter conflicts",
         ]
+
+
+def test_tile_extent_index(data_archive):
+    from kart.spatial_filter import SpatialFilter
+    from kart.tile.extent_index import tile_extent_index_db
+
+    def _tile_names(dataset, spatial_filter):
+        return {
+            f"{blob.name}.copc.laz"
+            for blob in dataset.tile_pointer_blobs(spatial_filter)
+        }
+
+    with data_archive("point-cloud/auckland.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        dataset = repo.datasets()["auckland"]
+
+        se_filter = SpatialFilter.from_spec(CRS, SOUTH_EAST_TRIANGLE)
+        assert _tile_names(dataset, se_filter) == SOUTH_EAST_TILES
+        sw_filter = SpatialFilter.from_spec(CRS, SOUTH_WEST_TRIANGLE)
+        assert _tile_names(dataset, sw_filter) == SOUTH_WEST_TILES
+
+        # The tile tree is only indexed once, no matter how many spatial filters are applied:
+        with tile_extent_index_db(repo) as db:
+            assert db.execute(
+                "SELECT COUNT(*) FROM indexed_tile_trees;"
+            ).fetchone() == (1,)
+            assert db.execute("SELECT COUNT(*) FROM tile_extents;").fetchone() == (16,)
+
+        assert _tile_names(dataset, SpatialFilter.MATCH_ALL) == ALL_AUCKLAND_TILES
@@ -10,6 +10,7 @@ from kart.exceptions import (
     NO_CHANGES,
     INVALID_OPERATION,
 )
+from kart.lfs_fetch import LfsFetcher, LfsFetchError
 from kart.lfs_util import get_hash_and_size_of_file
 from kart.point_cloud.metadata_util import extract_pc_tile_metadata
 from kart.repo import KartRepo
@@ -1054,6 +1055,67 @@ def test_lfs_fetch(cli_runner, data_archive):
         ]
 
 
+def test_lfs_fetch_from_local_remote(cli_runner, data_archive, tmp_path):
+    with data_archive("point-cloud/auckland.tgz") as repo_path:
+        remote_path = tmp_path / "remote"
+        shutil.copytree(repo_path, remote_path)
+        KartRepo(repo_path).remotes.set_url("origin", str(remote_path))
+
+        # Delete everything in the local LFS cache.
+        shutil.rmtree(repo_path / ".kart" / "lfs")
+
+        # Simulate an interrupted fetch of one of the tiles:
+        lfs_oid = "0a696f35ab1404bbe9663e52774aaa800b0cf308ad2e5e5a9735d1c8e8b0a8c4"
+        remote_lfs_path = (
+            remote_path / ".kart" / "lfs" / "objects" / "0a" / "69" / lfs_oid
+        )
+        incomplete_path = repo_path / ".kart" / "lfs" / "incomplete" / lfs_oid
+        incomplete_path.parent.mkdir(parents=True)
+        incomplete_path.write_bytes(remote_lfs_path.read_bytes()[:1000])
+
+        r = cli_runner.invoke(["lfs+", "fetch", "HEAD", "--num-workers=4"])
+        assert r.exit_code == 0, r.stderr
+
+        r = cli_runner.invoke(["lfs+", "ls-files", "HEAD"])
+        assert r.exit_code == 0, r.stderr
+        assert len(r.stdout.splitlines()) == 16
+        assert all(" * " in line for line in r.stdout.splitlines())
+
+        local_lfs_path = repo_path / ".kart" / "lfs" / "objects" / "0a" / "69" / lfs_oid
+        assert local_lfs_path.read_bytes() == remote_lfs_path.read_bytes()
+        assert not incomplete_path.exists()
+
+
+def test_working_copy_reset_stops_if_lfs_fetch_fails(
+    cli_runner, data_archive, monkeypatch, requires_pdal
+):
+    with data_archive("point-cloud/auckland.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        for tile in (repo_path / "auckland").glob("auckland_0_*.copc.laz"):
+            tile.unlink()
+        r = cli_runner.invoke(["commit", "-m", "4 deletes"])
+        assert r.exit_code == 0, r.stderr
+
+        # Delete everything in the local LFS cache, and make sure it can't be fetched again.
+        shutil.rmtree(repo_path / ".kart" / "lfs")
+
+        def _wait_for(self, lfs_oid):
+            raise LfsFetchError(f"Couldn't fetch {lfs_oid}")
+
+        monkeypatch.setattr(LfsFetcher, "wait_for", _wait_for)
+
+        index_path = repo_path / ".kart" / "workdir-index"
+        orig_index = index_path.read_bytes()
+
+        r = cli_runner.invoke(["reset", "HEAD^", "--discard-changes"])
+        assert r.exit_code != 0
+
+        # Nothing was recorded as having been reset.
+        assert index_path.read_bytes() == orig_index
+        workdir = KartRepo(repo_path).working_copy.workdir
+        assert workdir.get_tree_id() == repo.head_tree.hex
+
+
 def test_lfs_gc(cli_runner, data_archive, monkeypatch):
     with data_archive("point-cloud/auckland.tgz") as repo_path:
         # Delete everything in the local LFS cache.
@@ -1095,6 +1157,23 @@ def test_lfs_gc(cli_runner, data_archive, monkeypatch):
             "c9de49a81e30153254fc65c8eb291545cbb30b520aff7d4ec0cff0fab086c60b",
         ]
 
+        # The cache is already smaller than the budget - nothing needs deleting.
+        r = cli_runner.invoke(["lfs+", "gc", "--dry-run", "--max-size=200G"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout.splitlines() == [
+            "Running gc with --dry-run: found 0 LFS blobs (0B) to delete from the cache"
+        ]
+
+        r = cli_runner.invoke(["lfs+", "gc", "--dry-run", "--max-size=0"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout.splitlines()[0] == (
+            "Running gc with --dry-run: found 4 LFS blobs (82KiB) to delete from the cache"
+        )
+
+        r = cli_runner.invoke(["lfs+", "gc", "--max-size=lots"])
+        assert r.exit_code == 2, r.stderr
+        assert "Invalid size: lots" in r.stderr
+
         r = cli_runner.invoke(["lfs+", "gc"])
         assert r.exit_code == 0, r.stderr
         assert r.stdout.splitlines() == [
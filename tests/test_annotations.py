@@ -64,6 +64,38 @@ def test_build_annotations(data_archive, cli_runner, caplog):
         ]
 
 
+def test_build_annotations_in_parallel(data_archive, cli_runner, caplog):
+    with data_archive("points"):
+        r = cli_runner.invoke(["build-annotations", "--all-reachable", "--jobs=2"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout.splitlines() == [
+            "Enumerating reachable commits...",
+            "Building feature change counts...",
+            "(1/2): 1582725 Improve naming on Coromandel East coast",
+            "(2/2): 6e2984a Import from nz-pa-points-topo-150k.gpkg",
+            "done.",
+        ]
+
+        # Commits that are already annotated are skipped.
+        r = cli_runner.invoke(["build-annotations", "--all-reachable", "--jobs=2"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout.splitlines() == [
+            "Enumerating reachable commits...",
+            "Building feature change counts...",
+            "done.",
+        ]
+
+        caplog.set_level(logging.DEBUG)
+        r = cli_runner.invoke(
+            ["-vv", "diff", "--only-feature-count=exact", "HEAD^..HEAD"]
+        )
+        assert r.exit_code == 0, r.stderr
+        assert (
+            "retrieved: feature-change-counts-exact for 42b63a2a7c1b5dfe9c21ff9884b59f198e421821...622e7cc3b54cd54493eed6c4c5abe35d4bfa168e: {'nz_pa_points_topo_150k': 5}"
+            in [r.message for r in caplog.records]
+        )
+
+
 @pytest.mark.parametrize(
     "existing_db_path",
     [
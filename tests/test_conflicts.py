@@ -1,7 +1,8 @@
 import json
+import pygit2
 import pytest
 
-from kart.merge_util import MergedIndex
+from kart.merge_util import AncestorOursTheirs, MergedIndex
 from kart.repo import KartRepo
 from kart.structs import CommitWithReference
 
@@ -9,6 +10,39 @@ H = pytest.helpers.helpers()
 CONFLICTS_OUTPUT_FORMATS = ["text", "geojson", "json", "quiet"]
 
 
+@pytest.mark.parametrize("archive", ["points", "polygons", "table"])
+def test_merged_index_from_tree_merge(archive, data_archive, cli_runner):
+    with data_archive(f"conflicts/{archive}.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        trees3 = AncestorOursTheirs(
+            *(
+                CommitWithReference.resolve(repo, f"{name}_branch").tree
+                for name in AncestorOursTheirs.NAMES
+            )
+        )
+
+        # Merging only the changed subtrees gives the same conflicts as a full libgit2 merge:
+        index = repo.merge_trees(**trees3.as_dict(), flags={"find_renames": False})
+        expected = MergedIndex.from_pygit2_index(index)
+        merged_index = MergedIndex.from_tree_merge(repo, trees3)
+        assert merged_index.tree is not None
+        assert merged_index.conflicts == expected.conflicts
+        assert len(merged_index.entries) < len(expected.entries)
+        for path, entry in merged_index.entries.items():
+            assert expected.entries[path] == entry
+
+        # And the same tree, once the conflicts are resolved:
+        def resolve_with_ours(conflict):
+            return [conflict.ours] if conflict.ours else []
+
+        assert merged_index.write_resolved_tree(
+            repo, resolve_with_ours
+        ) == expected.write_resolved_tree(repo, resolve_with_ours)
+
+        merged_index.write("test.conflict.index")
+        assert MergedIndex.read("test.conflict.index") == merged_index
+
+
 def test_merged_index_roundtrip(data_archive, cli_runner):
     # Difficult to create conflict indexes directly - easier to create them by doing a merge:
     with data_archive("conflicts/polygons.tgz") as repo_path:
@@ -55,6 +89,130 @@ def test_merged_index_roundtrip(data_archive, cli_runner):
         assert r2 == r1
 
 
+def test_merged_index_from_tree_merge_keeps_filemodes(data_archive):
+    with data_archive("conflicts/polygons.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        exe = pygit2.GIT_FILEMODE_BLOB_EXECUTABLE
+
+        def _tree(**contents):
+            tree_builder = repo.TreeBuilder()
+            for name, data in contents.items():
+                data, mode = data if isinstance(data, tuple) else (data, exe)
+                tree_builder.insert(name, repo.create_blob(data), mode)
+            return repo[tree_builder.write()]
+
+        trees3 = AncestorOursTheirs(
+            _tree(a=b"1", b=b"1"),
+            _tree(a=b"1", b=b"2"),
+            _tree(a=b"2", b=b"3"),
+        )
+        merged_index = MergedIndex.from_tree_merge(repo, trees3)
+        assert merged_index["a"].mode == exe
+        assert all(e.mode == exe for e in merged_index.conflicts["0"])
+
+        merged_index.add_resolve("0", [merged_index.conflicts["0"].theirs])
+        tree = repo[merged_index.write_resolved_tree(repo)]
+        assert {obj.name: obj.filemode for obj in tree} == {"a": exe, "b": exe}
+
+        # A change to just the filemode of a blob is merged too.
+        trees3 = AncestorOursTheirs(
+            _tree(a=b"1"),
+            _tree(a=b"1"),
+            _tree(a=(b"1", pygit2.GIT_FILEMODE_BLOB)),
+        )
+        merged_index = MergedIndex.from_tree_merge(repo, trees3)
+        assert merged_index["a"].mode == pygit2.GIT_FILEMODE_BLOB
+        tree = repo[merged_index.write_resolved_tree(repo)]
+        assert tree["a"].filemode == pygit2.GIT_FILEMODE_BLOB
+
+
+def test_merged_index_random_access(data_archive, cli_runner):
+    with data_archive("conflicts/polygons.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        trees3 = AncestorOursTheirs(
+            *(
+                CommitWithReference.resolve(repo, f"{name}_branch").tree
+                for name in AncestorOursTheirs.NAMES
+            )
+        )
+        orig = MergedIndex.from_tree_merge(repo, trees3)
+        orig.write("test.conflict.index")
+
+        # Single conflicts and resolves can be read without reading the rest of the file:
+        for key, conflict in orig.conflicts.items():
+            assert MergedIndex.read_conflict("test.conflict.index", key) == conflict
+            assert MergedIndex.read_resolve("test.conflict.index", key) is None
+        assert MergedIndex.read_conflict("test.conflict.index", "nonexistent") is None
+
+        # Single resolves can be updated in place:
+        k0, k1, k2, k3 = orig.conflicts.keys()
+        orig.add_resolve(k0, [orig.conflicts[k0].ours])
+        orig.add_resolve(k1, [])
+        orig.write_resolves("test.conflict.index", [k0, k1])
+        assert MergedIndex.read("test.conflict.index") == orig
+        assert MergedIndex.read_resolve("test.conflict.index", k0) == [
+            orig.conflicts[k0].ours
+        ]
+        assert MergedIndex.read_resolve("test.conflict.index", k1) == []
+
+        orig.remove_resolve(k0)
+        orig.add_resolve(k2, [orig.conflicts[k2].theirs])
+        orig.write_resolves("test.conflict.index", [k0, k2])
+        assert MergedIndex.read("test.conflict.index") == orig
+        assert MergedIndex.read_resolve("test.conflict.index", k0) is None
+
+        # Conflicts and resolves can be read without reading the entries:
+        partial = MergedIndex.read("test.conflict.index", with_entries=False)
+        assert partial.entries is None
+        assert partial.conflicts == orig.conflicts
+        assert partial.resolves == orig.resolves
+        assert partial.unresolved_conflicts == orig.unresolved_conflicts
+        partial.add_resolve(k3, [])
+        partial.write_resolves("test.conflict.index", [k3])
+        orig.add_resolve(k3, [])
+        assert MergedIndex.read("test.conflict.index") == orig
+
+
+def test_merged_index_read_legacy_format(data_archive, cli_runner):
+    # Older versions of Kart wrote the MergedIndex as a pygit2.Index, with conflicts and resolves at special paths.
+    with data_archive("conflicts/polygons.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        blob_id = repo.create_blob(b"test")
+
+        index = pygit2.Index("test.conflict.index")
+        for path in (
+            "a/b",
+            ".conflicts/0/ours/c/d",
+            ".conflicts/0/theirs/c/d",
+            ".conflicts/1/ancestor/e",
+            ".resolves/0/resolved",
+            ".resolves/0/0/c/d",
+        ):
+            index.add(pygit2.IndexEntry(path, blob_id, pygit2.GIT_FILEMODE_BLOB))
+        index.write()
+
+        def entry(path):
+            return MergedIndex.Entry(path, blob_id, pygit2.GIT_FILEMODE_BLOB)
+
+        expected = MergedIndex(
+            {"a/b": entry("a/b")},
+            {
+                "0": AncestorOursTheirs(None, entry("c/d"), entry("c/d")),
+                "1": AncestorOursTheirs(entry("e"), None, None),
+            },
+            {"0": [entry("c/d")]},
+        )
+        assert MergedIndex.read("test.conflict.index") == expected
+        assert MergedIndex.read_conflict("test.conflict.index", "1") == (
+            expected.conflicts["1"]
+        )
+
+        # Updating a resolve converts it to the current format:
+        expected.add_resolve("1", [])
+        expected.write_resolves("test.conflict.index", ["1"])
+        assert MergedIndex.read("test.conflict.index") == expected
+
+
 def test_summarise_conflicts(data_archive, cli_runner):
     # Difficult to create conflict indexes directly - easier to create them by doing a merge:
     with data_archive("conflicts/polygons.tgz") as _:
@@ -1,4 +1,4 @@
-from osgeo.osr import SpatialReference
+from osgeo.osr import OAMS_AUTHORITY_COMPLIANT, SpatialReference
 
 from kart import crs_util
 
@@ -62,3 +62,33 @@ MYSQL_COMPLIANT_WKT = (
 def test_mysql_compliant_wkt():
     assert crs_util.mysql_compliant_wkt(TEST_WKT) == MYSQL_COMPLIANT_WKT
     assert crs_util.mysql_compliant_wkt(AXIS_LAST_WKT) == MYSQL_COMPLIANT_WKT
+
+
+def test_make_crs_returns_independent_copies():
+    crs = crs_util.make_crs("EPSG:4326")
+    axis_mapping = crs.GetDataAxisToSRSAxisMapping()
+    crs.SetAxisMappingStrategy(OAMS_AUTHORITY_COMPLIANT)
+    assert crs.GetDataAxisToSRSAxisMapping() != axis_mapping
+
+    # Modifying the first CRS didn't modify the cached one.
+    other = crs_util.make_crs("EPSG:4326")
+    assert other is not crs
+    assert other.GetDataAxisToSRSAxisMapping() == axis_mapping
+
+
+def test_make_transform_is_memoised():
+    nztm = crs_util.make_crs("EPSG:2193")
+    wgs84 = crs_util.make_crs("EPSG:4326")
+    transform = crs_util.make_transform(nztm, wgs84)
+    assert crs_util.make_transform(crs_util.make_crs("EPSG:2193"), wgs84) is transform
+    assert crs_util.make_transform(wgs84, nztm) is not transform
+
+    # The axis order is part of the key.
+    wgs84_lat_lon = crs_util.make_crs("EPSG:4326")
+    wgs84_lat_lon.SetAxisMappingStrategy(OAMS_AUTHORITY_COMPLIANT)
+    lat_lon_transform = crs_util.make_transform(nztm, wgs84_lat_lon)
+    assert lat_lon_transform is not transform
+
+    x, y, z = transform.TransformPoint(1750000, 5900000)
+    y2, x2, z2 = lat_lon_transform.TransformPoint(1750000, 5900000)
+    assert (x, y) == (x2, y2)
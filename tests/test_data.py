@@ -65,6 +65,31 @@ def test_data_ls_with_ref(data_archive_readonly, cli_runner):
         assert output == {"kart.data.ls/v1": ["nz_pa_points_topo_150k"]}
 
 
+def test_data_ls_uses_structure_cache(data_archive, cli_runner, monkeypatch):
+    with data_archive("points"):
+        r = cli_runner.invoke(["data", "ls"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout.splitlines() == ["nz_pa_points_topo_150k"]
+        assert Path(".kart/structure_cache.db").exists()
+
+        # The datasets in this tree are now found without walking the tree - or writing to the cache.
+        def _fail(*args, **kwargs):
+            raise AssertionError("Tree should not be walked, or cache written")
+
+        monkeypatch.setattr("kart.structure.all_trees_with_paths_in_tree", _fail)
+        monkeypatch.setattr("kart.sqlalchemy.sqlite._ensure_tables_exist", _fail)
+        r = cli_runner.invoke(["data", "ls"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout.splitlines() == ["nz_pa_points_topo_150k"]
+
+        # Trees that aren't at HEAD are walked, but not added to the cache.
+        monkeypatch.undo()
+        monkeypatch.setattr("kart.sqlalchemy.sqlite._ensure_tables_exist", _fail)
+        r = cli_runner.invoke(["data", "ls", "HEAD^"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout.splitlines() == ["nz_pa_points_topo_150k"]
+
+
 def test_data_rm(data_archive, cli_runner):
     with data_archive("points"):
         r = cli_runner.invoke(["data", "ls"])
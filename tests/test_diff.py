@@ -1,4 +1,5 @@
 import functools
+import io
 import json
 import re
 import string
@@ -14,9 +15,12 @@ from kart.diff_format import DiffFormat
 from kart.diff_structs import Delta, DeltaDiff
 from kart.html_diff_writer import HtmlDiffWriter
 from kart.json_diff_writers import JsonLinesDiffWriter
+from kart.json_lines_encoder import FastJsonLinesEncoder, JsonLinesEncoder
 from kart.geometry import hex_wkb_to_ogr
 from kart.repo import KartRepo
 from kart.serialise_util import b64decode_str
+from kart.tabular.feature_output import feature_as_json
+from kart.tabular.reprojection import BatchGeometryTransform
 
 
 H = pytest.helpers.helpers()
@@ -378,6 +382,33 @@ def test_diff_reprojection(output_format, data_working_copy, cli_runner):
             _check_geojson(odata["nz_pa_points_topo_150k"])
 
 
+@pytest.mark.parametrize("output_format", ["json", "json-lines", "geojson"])
+def test_diff_batch_reprojection(
+    output_format, data_archive_readonly, cli_runner, monkeypatch
+):
+    # Reprojecting geometries in batches gives exactly the same output as reprojecting them one at a time.
+    with data_archive_readonly("polygons"):
+        args = ["diff", "-o", output_format, "--crs=EPSG:4326", "HEAD^...HEAD"]
+
+        prepared_counts = []
+        orig_prepare = BatchGeometryTransform.prepare
+
+        def _prepare(self, geometries):
+            orig_prepare(self, geometries)
+            prepared_counts.append(len(self._prepared))
+
+        monkeypatch.setattr(BatchGeometryTransform, "prepare", _prepare)
+        r = cli_runner.invoke(args)
+        assert r.exit_code == 0, r.stderr
+        assert sum(prepared_counts) > 0
+        batch_output = r.stdout
+
+        monkeypatch.setattr(BatchGeometryTransform, "prepare", lambda self, g: None)
+        r = cli_runner.invoke(args)
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout == batch_output
+
+
 def test_show_crs_with_aspatial_dataset(data_archive, cli_runner):
     """
     --crs should be ignored when used with aspatial data
@@ -1855,6 +1886,96 @@ def test_diff_streaming(data_archive_readonly):
             assert new.get_feature_calls == expected_calls
 
 
+def test_diff_external_sort(data_archive, cli_runner):
+    with data_archive("points") as repo_path:
+        r = cli_runner.invoke(["diff", "-o", "json-lines", "HEAD^...HEAD"])
+        assert r.exit_code == 0, r.stderr
+        expected = r.stdout.splitlines()
+
+        # Small enough that the sort has to be spilled to disk in several runs.
+        repo = KartRepo(repo_path)
+        repo.config["kart.diff.sortBufferSize"] = 2
+
+        old = repo.datasets("HEAD^")[H.POINTS.LAYER]
+        new = repo.datasets("HEAD")[H.POINTS.LAYER]
+        feature_diff = old.diff(new)["feature"]
+        assert feature_diff.sort_buffer_size == 2
+        sorted_keys = [key for key, delta in feature_diff.sorted_items()]
+        assert not feature_diff.is_loaded
+        assert len(sorted_keys) == len(feature_diff) == 5
+        assert sorted_keys == sorted(feature_diff.keys())
+        assert feature_diff.is_loaded
+
+        r = cli_runner.invoke(["diff", "-o", "json-lines", "HEAD^...HEAD"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout.splitlines() == expected
+
+
+@pytest.mark.parametrize("archive", ["points", "polygons", "table"])
+@pytest.mark.parametrize("json_style", ["compact", "extracompact"])
+@pytest.mark.parametrize("crs_args", [[], ["--crs=EPSG:4326"]])
+def test_diff_json_lines_fast_encoder(
+    archive, json_style, crs_args, data_archive_readonly, cli_runner, monkeypatch
+):
+    # The fast encoder must output exactly the same bytes as the standard library json encoder.
+    with data_archive_readonly(archive):
+        args = ["diff", "-o", "json-lines", f"--json-style={json_style}", *crs_args]
+        args.append("HEAD^...HEAD")
+        r = cli_runner.invoke(args)
+        assert r.exit_code == 0, r.stderr
+        assert JsonLinesDiffWriter.encoder_class is FastJsonLinesEncoder
+        fast_output = r.stdout
+
+        monkeypatch.setattr(JsonLinesDiffWriter, "encoder_class", JsonLinesEncoder)
+        r = cli_runner.invoke(args)
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout == fast_output
+
+
+@pytest.mark.parametrize("separators", [None, (",", ":")])
+def test_json_lines_encoders_match(separators):
+    rows = [
+        {},
+        {"fid": 1, "name": 'caf\u00e9 "quoted"\n', "blob": b"\x00\xff"},
+        {"a": 1.5, "b": float("nan"), "c": float("inf"), "d": float("-inf")},
+        {"big": 2**70, "t": True, "f": False, "n": None, "list": [1, "two"]},
+        {7: "int key", 2.5: "float key", True: "bool key", None: "null key"},
+        {"nested": {"x": [1.0, None]}, "\u2603": "snowman"},
+    ]
+    outputs = []
+    for encoder_class in (JsonLinesEncoder, FastJsonLinesEncoder):
+        fp = io.StringIO()
+        encoder = encoder_class(fp, separators=separators, chunk_size=10)
+        for i, row in enumerate(rows):
+            old = (row, i, None) if i % 3 != 1 else None
+            new = (row, i, None) if i % 3 != 2 else None
+            encoder.write_feature_change("feature", "ds/path", old=old, new=new)
+        encoder.write({"type": "other", "value": 1})
+        encoder.flush()
+        outputs.append(fp.getvalue())
+
+    expected = (
+        "".join(
+            json.dumps(
+                {
+                    "type": "feature",
+                    "dataset": "ds/path",
+                    "change": {
+                        **({"-": feature_as_json(row, i)} if i % 3 != 1 else {}),
+                        **({"+": feature_as_json(row, i)} if i % 3 != 2 else {}),
+                    },
+                },
+                separators=separators,
+            )
+            + "\n"
+            for i, row in enumerate(rows)
+        )
+        + json.dumps({"type": "other", "value": 1}, separators=separators)
+        + "\n"
+    )
+    assert outputs == [expected, expected]
+
+
 @pytest.mark.parametrize(
     "output_format", [o for o in SHOW_OUTPUT_FORMATS if o not in {"html", "quiet"}]
 )
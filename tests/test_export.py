@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from kart.repo import KartRepo
+
+H = pytest.helpers.helpers()
+
+pa = pytest.importorskip("pyarrow")
+
+
+def _read_table(path, output_format):
+    if output_format == "parquet":
+        import pyarrow.parquet
+
+        return pyarrow.parquet.read_table(path)
+    else:
+        import pyarrow.ipc
+
+        with pyarrow.ipc.open_file(path) as reader:
+            return reader.read_all()
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+@pytest.mark.parametrize("jobs", [1, 2])
+@pytest.mark.parametrize(
+    "archive,layer",
+    [
+        pytest.param("points", H.POINTS.LAYER, id="points"),
+        pytest.param("polygons", H.POLYGONS.LAYER, id="polygons"),
+        pytest.param("table", H.TABLE.LAYER, id="table"),
+    ],
+)
+def test_export(
+    archive, layer, output_format, jobs, data_archive_readonly, cli_runner, tmp_path
+):
+    with data_archive_readonly(archive) as repo_path:
+        output_path = tmp_path / f"out.{output_format}"
+        r = cli_runner.invoke(
+            [
+                "export",
+                f"--format={output_format}",
+                "--batch-size=100",
+                f"--jobs={jobs}",
+                layer,
+                str(output_path),
+            ]
+        )
+        assert r.exit_code == 0, r.stderr
+
+        dataset = KartRepo(repo_path).datasets()[layer]
+        features = list(dataset.features())
+        assert r.stdout.splitlines() == [
+            f"Exported {len(features)} features from {layer} to {output_path}"
+        ]
+
+        table = _read_table(output_path, output_format)
+        assert table.num_rows == len(features)
+        if output_format == "parquet":
+            import pyarrow.parquet
+
+            metadata = pyarrow.parquet.ParquetFile(output_path).metadata
+            assert metadata.num_row_groups == -(-len(features) // 100)
+
+        geom_column = dataset.geom_column_name
+        column_names = [c.name for c in dataset.schema.columns]
+        expected_names = column_names + ([f"{geom_column}_bbox"] if geom_column else [])
+        assert table.column_names == expected_names
+
+        rows = table.to_pylist()
+        for feature, row in zip(features, rows):
+            for name in column_names:
+                value = feature[name]
+                if name == geom_column and value is not None:
+                    value = value.to_wkb()
+                assert row[name] == value
+
+        if geom_column:
+            geo = json.loads(table.schema.metadata[b"geo"])
+            assert geo["primary_column"] == geom_column
+            assert geo["columns"][geom_column]["encoding"] == "WKB"
+
+            min_x, max_x, min_y, max_y = features[0][geom_column].envelope(
+                only_2d=True, calculate_if_missing=True
+            )
+            assert rows[0][f"{geom_column}_bbox"] == {
+                "xmin": min_x,
+                "ymin": min_y,
+                "xmax": max_x,
+                "ymax": max_y,
+            }
+
+
+def test_export_errors(data_archive_readonly, cli_runner, tmp_path):
+    with data_archive_readonly("points"):
+        r = cli_runner.invoke(["export", "nonexistent", str(tmp_path / "out.parquet")])
+        assert r.exit_code == 40, r.stderr
+        assert "No dataset found at 'nonexistent'" in r.stderr
@@ -4,11 +4,13 @@ import pytest
 from osgeo import ogr, osr
 
 from kart.geometry import (
+    geom_envelope,
     gpkg_geom_to_hex_wkb,
     gpkg_geom_to_ogr,
     hex_wkb_to_gpkg_geom,
     normalise_gpkg_geom,
     ogr_to_gpkg_geom,
+    wkb_to_gpkg_geom,
     GPKG_ENVELOPE_NONE,
     GPKG_ENVELOPE_XY,
 )
@@ -232,3 +234,90 @@ def test_gpkg_wkb_gpkg_roundtrip(
     gpkg_geom = hex_wkb_to_gpkg_geom(hex_wkb_2)
 
     assert gpkg_geom == input
+
+
+@pytest.mark.parametrize(
+    "wkt",
+    [
+        "POINT(1 2)",
+        "POINT(1 2 3)",
+        "POINT ZM (1 2 3 4)",
+        "POINT EMPTY",
+        "LINESTRING(1 2,-3 4,5 -6)",
+        "LINESTRING EMPTY",
+        "POLYGON((0 0,0 5,5 0,0 0),(1 1,1 2,2 1,1 1))",
+        "POLYGON Z((0 0 1,0 5 2,5 0 3,0 0 1))",
+        "MULTIPOINT(1 2,3 4)",
+        "MULTIPOINT EMPTY",
+        "MULTILINESTRING((1 2,3 4),(-5 6,7 8))",
+        "MULTIPOLYGON(((0 0,0 5,5 0,0 0)),((10 10,10 15,15 10,10 10)))",
+        "GEOMETRYCOLLECTION(POINT(1 2),MULTIPOINT EMPTY,LINESTRING(5 6,-7 8))",
+        "GEOMETRYCOLLECTION EMPTY",
+        "TRIANGLE((0 0 0,0 1 0,1 1 0,0 0 0))",
+        "TIN (((0 0 0, 0 0 1, 0 1 0, 0 0 0)), ((0 0 0, 0 1 0, 1 1 0, 0 0 0)))",
+    ],
+)
+@pytest.mark.parametrize("little_endian_wkb", [False, True])
+def test_geom_envelope_without_ogr(wkt, little_endian_wkb, monkeypatch):
+    ogr_geom = ogr.CreateGeometryFromWkt(wkt)
+    expected = None if ogr_geom.IsEmpty() else ogr_geom.GetEnvelope()
+
+    gpkg_geom = ogr_to_gpkg_geom(
+        ogr_geom,
+        _little_endian_wkb=little_endian_wkb,
+        _add_envelope_type=GPKG_ENVELOPE_NONE,
+    )
+    # The envelope is found by scanning the WKB - OGR isn't needed.
+    monkeypatch.setattr(
+        "kart.geometry.gpkg_geom_to_ogr", lambda *args, **kwargs: pytest.fail()
+    )
+    assert geom_envelope(gpkg_geom, only_2d=True) is None
+    assert geom_envelope(gpkg_geom, only_2d=True, calculate_if_missing=True) == (
+        pytest.approx(expected) if expected else None
+    )
+
+
+def test_geom_envelope_of_curve():
+    # Curves can extend beyond their points, so their envelope is found using OGR.
+    ogr_geom = ogr.CreateGeometryFromWkt("CIRCULARSTRING(0 0,1 1,2 0)")
+    gpkg_geom = ogr_to_gpkg_geom(ogr_geom, _add_envelope_type=GPKG_ENVELOPE_NONE)
+    assert geom_envelope(
+        gpkg_geom, only_2d=True, calculate_if_missing=True
+    ) == pytest.approx(ogr_geom.GetEnvelope())
+
+
+@pytest.mark.parametrize(
+    "wkt,needs_ogr",
+    [
+        ("POINT(1 2)", False),
+        ("POINT(1 2 3)", False),
+        ("POINT EMPTY", False),
+        ("POINT Z EMPTY", True),
+        ("POINT M (1 2 3)", True),
+        ("LINESTRING(1 2,-3 4,5 -6)", False),
+        ("LINESTRING Z(1 2 3,-3 4 -5)", False),
+        ("LINESTRING EMPTY", False),
+        ("POLYGON((0 0,0 5,5 0,0 0),(1 1,1 2,2 1,1 1))", False),
+        ("POLYGON Z((0 0 1,0 5 2,5 0 3,0 0 1))", False),
+        ("MULTIPOINT(1 2,3 4)", False),
+        ("MULTIPOINT EMPTY", False),
+        ("MULTILINESTRING((1 2,3 4),(-5 6,7 8))", False),
+        ("MULTIPOLYGON(((0 0,0 5,5 0,0 0)),((10 10,10 15,15 10,10 10)))", False),
+        ("GEOMETRYCOLLECTION(POINT(1 2),MULTIPOINT EMPTY,LINESTRING(5 6,-7 8))", False),
+        ("GEOMETRYCOLLECTION EMPTY", False),
+        ("CIRCULARSTRING(0 0,1 1,2 0)", True),
+    ],
+)
+@pytest.mark.parametrize("little_endian_wkb", [False, True])
+def test_wkb_to_gpkg_geom_without_ogr(wkt, needs_ogr, little_endian_wkb, monkeypatch):
+    ogr_geom = ogr.CreateGeometryFromWkt(wkt)
+    wkb = ogr_geom.ExportToIsoWkb(ogr.wkbNDR if little_endian_wkb else ogr.wkbXDR)
+    expected = ogr_to_gpkg_geom(ogr.CreateGeometryFromWkb(wkb))
+
+    if little_endian_wkb and not needs_ogr:
+        # The WKB is wrapped in a GPKG header as is - OGR isn't needed.
+        monkeypatch.setattr(
+            "kart.geometry.ogr.CreateGeometryFromWkb",
+            lambda *args, **kwargs: pytest.fail(),
+        )
+    assert wkb_to_gpkg_geom(wkb) == expected
@@ -3,9 +3,11 @@ import re
 import shutil
 
 import pytest
+from pysqlite3 import dbapi2 as sqlite
 
 from kart import dataset_util
 from kart.sqlalchemy.gpkg import Db_GPKG
+from kart.tabular.import_cache import ImportCache
 from kart.repo import KartRepo
 from kart.exceptions import (
     INVALID_OPERATION,
@@ -107,6 +109,44 @@ def test_import_table_with_prompt(data_archive_readonly, tmp_path, cli_runner, c
         assert "to census2016_sdhca_ot_ced_short/ ..." in r.stdout
 
 
+@pytest.mark.parametrize("num_workers", [1, 3])
+def test_import_in_pages(
+    num_workers, data_archive_readonly, tmp_path, cli_runner, chdir
+):
+    with data_archive_readonly("gpkg-polygons") as data:
+        repo_path = tmp_path / "emptydir"
+        r = cli_runner.invoke(["init", repo_path])
+        assert r.exit_code == 0
+        with chdir(repo_path):
+            r = cli_runner.invoke(
+                [
+                    "import",
+                    "--no-checkout",
+                    data / "nz-waca-adjustments.gpkg",
+                    "nz_waca_adjustments:default",
+                ]
+            )
+            assert r.exit_code == 0, r.stderr
+            r = cli_runner.invoke(
+                [
+                    "import",
+                    "--no-checkout",
+                    f"--num-workers={num_workers}",
+                    "--page-size=50",
+                    data / "nz-waca-adjustments.gpkg",
+                    "nz_waca_adjustments:paged",
+                ]
+            )
+            assert r.exit_code == 0, r.stderr
+
+        datasets = KartRepo(repo_path).datasets()
+        assert datasets["paged"].feature_count == H.POLYGONS.ROWCOUNT
+        # Exactly the same features were imported.
+        assert (datasets["paged"].inner_tree / "feature").id == (
+            datasets["default"].inner_tree / "feature"
+        ).id
+
+
 def test_import_table_meta_overrides(
     data_archive_readonly, tmp_path, cli_runner, chdir
 ):
@@ -276,6 +316,118 @@ def test_import_replace_existing_with_no_changes(
             assert r.exit_code == 44, r.stderr
 
 
+def test_import_replace_existing_only_imports_changed_rows(
+    data_archive,
+    tmp_path,
+    cli_runner,
+    chdir,
+):
+    with data_archive("gpkg-polygons") as data:
+        repo_path = tmp_path / "emptydir"
+        r = cli_runner.invoke(["init", repo_path])
+        assert r.exit_code == 0
+        with chdir(repo_path):
+            import_cmd = [
+                "import",
+                "--replace-existing",
+                data / "nz-waca-adjustments.gpkg",
+                "nz_waca_adjustments:mytable",
+            ]
+            r = cli_runner.invoke(import_cmd[:1] + import_cmd[2:])
+            assert r.exit_code == 0, r.stderr
+
+            # The first re-import has nothing to go on, but records the source rows for next time.
+            r = cli_runner.invoke(import_cmd)
+            assert r.exit_code == 44, r.stderr
+            assert "Only importing features changed" not in r.stdout
+            assert (repo_path / ".kart" / "import_cache.db").exists()
+
+            with Db_GPKG.create_engine(
+                data / "nz-waca-adjustments.gpkg"
+            ).connect() as conn:
+                conn.execute(
+                    "UPDATE nz_waca_adjustments SET survey_reference = 'edited' WHERE id = 1424927"
+                )
+                conn.execute("DELETE FROM nz_waca_adjustments WHERE id = 1443053")
+
+            r = cli_runner.invoke(import_cmd)
+            assert r.exit_code == 0, r.stderr
+            assert (
+                "Only importing features changed since the last import to mytable/"
+                in r.stdout
+            )
+
+            r = cli_runner.invoke(["show", "-o", "json"])
+            assert r.exit_code == 0, r.stderr
+            features = json.loads(r.stdout)["kart.diff/v1+hexwkb"]["mytable"]["feature"]
+            features_by_id = {(f.get("-") or f["+"])["id"]: f for f in features}
+            assert features_by_id.keys() == {1424927, 1443053}
+            assert features_by_id[1424927]["+"]["survey_reference"] == "edited"
+            assert "+" not in features_by_id[1443053]
+
+            # A full re-import of the same source has nothing left to change.
+            (repo_path / ".kart" / "import_cache.db").unlink()
+            r = cli_runner.invoke(import_cmd)
+            assert r.exit_code == 44, r.stderr
+
+
+def test_import_replace_existing_falls_back_if_import_cache_fails(
+    data_archive,
+    tmp_path,
+    cli_runner,
+    chdir,
+    monkeypatch,
+):
+    with data_archive("gpkg-polygons") as data:
+        repo_path = tmp_path / "emptydir"
+        r = cli_runner.invoke(["init", repo_path])
+        assert r.exit_code == 0
+        with chdir(repo_path):
+            import_cmd = [
+                "import",
+                "--replace-existing",
+                data / "nz-waca-adjustments.gpkg",
+                "nz_waca_adjustments:mytable",
+            ]
+            r = cli_runner.invoke(import_cmd[:1] + import_cmd[2:])
+            assert r.exit_code == 0, r.stderr
+            r = cli_runner.invoke(import_cmd)
+            assert r.exit_code == 44, r.stderr
+
+            with Db_GPKG.create_engine(
+                data / "nz-waca-adjustments.gpkg"
+            ).connect() as conn:
+                conn.execute(
+                    "UPDATE nz_waca_adjustments SET survey_reference = 'edited' WHERE id = 1424927"
+                )
+                conn.execute("DELETE FROM nz_waca_adjustments WHERE id = 1443053")
+
+            # The changed features have been written by the time the cache fails.
+            def _deleted_pks(self, source):
+                self._fail(source.dest_path, sqlite.OperationalError("disk I/O error"))
+
+            with monkeypatch.context() as m:
+                m.setattr(ImportCache, "deleted_pks", _deleted_pks)
+                r = cli_runner.invoke(import_cmd)
+            assert r.exit_code == 0, r.stderr
+            assert (
+                "Couldn't use the import cache - importing all features to mytable/"
+                in r.stdout
+            )
+
+            r = cli_runner.invoke(["show", "-o", "json"])
+            assert r.exit_code == 0, r.stderr
+            features = json.loads(r.stdout)["kart.diff/v1+hexwkb"]["mytable"]["feature"]
+            features_by_id = {(f.get("-") or f["+"])["id"]: f for f in features}
+            assert features_by_id.keys() == {1424927, 1443053}
+            assert "+" not in features_by_id[1443053]
+
+            # The full import recorded the source rows again.
+            r = cli_runner.invoke(import_cmd)
+            assert r.exit_code == 44, r.stderr
+            assert "Only importing features changed" in r.stdout
+
+
 def test_import_replace_existing_with_compatible_schema_changes(
     data_archive,
     tmp_path,
@@ -2,6 +2,8 @@ import re
 import json
 import pytest
 
+from kart.repo import KartRepo, KartRepoFiles
+
 
 H = pytest.helpers.helpers()
 
@@ -144,6 +146,39 @@ def test_log_shallow_clone(
             ]
 
 
+def test_log_dataset_changes_index(data_archive, cli_runner, monkeypatch):
+    with data_archive("points") as repo_path:
+        db_path = KartRepo(repo_path).gitdir_file(KartRepoFiles.DATASET_CHANGES)
+        assert not db_path.exists()
+        r = cli_runner.invoke(["log", "--output-format=json", "--dataset-changes"])
+        assert r.exit_code == 0, r.stderr
+        expected = json.loads(r.stdout)
+        assert [c["datasetChanges"] for c in expected] == [
+            ["nz_pa_points_topo_150k"],
+            ["nz_pa_points_topo_150k"],
+        ]
+        assert db_path.exists()
+
+        # Every commit is now indexed, so their dataset changes shouldn't be worked out again.
+        def _iter_changed_datasets(*args, **kwargs):
+            raise AssertionError("Commit should have been indexed")
+
+        monkeypatch.setattr(
+            "kart.dataset_changes_index._iter_changed_datasets", _iter_changed_datasets
+        )
+        r = cli_runner.invoke(
+            [
+                "log",
+                "--output-format=json",
+                "--dataset-changes",
+                "--",
+                "nz_pa_points_topo_150k",
+            ]
+        )
+        assert r.exit_code == 0, r.stderr
+        assert json.loads(r.stdout) == expected
+
+
 def test_log_with_feature_count_tabular(data_archive, cli_runner):
     with data_archive("points"):
         r = cli_runner.invoke(
@@ -18,12 +18,11 @@ def get_conflict_ids(cli_runner):
 
 
 def delete_remaining_conflicts(cli_runner):
-    # TODO - do this with a single resolve when this is supported.
     conflict_ids = get_conflict_ids(cli_runner)
-    while conflict_ids:
-        r = cli_runner.invoke(["resolve", conflict_ids[0], "--with=delete"])
+    if conflict_ids:
+        r = cli_runner.invoke(["resolve", *conflict_ids, "--with=delete"])
         assert r.exit_code == 0, r.stderr
-        conflict_ids = get_conflict_ids(cli_runner)
+    assert get_conflict_ids(cli_runner) == []
 
 
 def get_json_feature(rs, layer, pk):
@@ -100,7 +99,9 @@ def test_resolve_with_version(data_working_copy, cli_runner):
         assert len(conflict_ids) == 0
 
         merged_index = MergedIndex.read_from_repo(repo)
-        assert len(merged_index.entries) == 237
+        # Only the entries that changed in the merge are stored alongside the merged tree.
+        assert merged_index.tree is not None
+        assert len(merged_index.entries) < 237
         assert len(merged_index.conflicts) == 4
         assert len(merged_index.resolves) == 4
 
@@ -130,6 +131,56 @@ def test_resolve_with_version(data_working_copy, cli_runner):
         assert get_json_feature(merged, l, pk3) is None
 
 
+def test_resolve_multiple_with_version(data_working_copy, cli_runner):
+    with data_working_copy("conflicts/polygons.tgz") as (repo_path, wc_path):
+        repo = KartRepo(repo_path)
+        l = H.POLYGONS.LAYER
+
+        r = cli_runner.invoke(["merge", "theirs_branch"])
+        assert r.exit_code == 0, r.stderr
+        conflict_ids = get_conflict_ids(cli_runner)
+        assert len(conflict_ids) == 4
+
+        # Every conflict that matches the filter is resolved at once:
+        r = cli_runner.invoke(["resolve", f"{l}:feature", "--with=theirs"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout.splitlines()[-2:] == [
+            "Resolved 4 conflicts. 0 conflicts to go.",
+            "Use `kart merge --continue` to complete the merge",
+        ]
+        assert get_conflict_ids(cli_runner) == []
+
+        r = cli_runner.invoke(["resolve", conflict_ids[0], "--with=ours"])
+        assert r.exit_code == INVALID_OPERATION
+        assert f"Conflict at {conflict_ids[0]} is already resolved" in r.stderr
+
+        merged_index = MergedIndex.read_from_repo(repo)
+        assert len(merged_index.resolves) == 4
+        for key, conflict in merged_index.conflicts.items():
+            expected = [conflict.theirs] if conflict.theirs else []
+            assert merged_index.resolves[key] == expected
+
+        # The working copy was updated with all the resolves:
+        theirs = repo.structure("theirs_branch")
+        pks = [conflict_id.split(":", 2)[2] for conflict_id in conflict_ids]
+        with repo.working_copy.tabular.session() as sess:
+            for pk in pks:
+                survey_reference = sess.scalar(
+                    f"""SELECT survey_reference FROM {l} WHERE id = :id;""",
+                    {"id": pk},
+                )
+                if get_json_feature(theirs, l, pk) is None:
+                    assert survey_reference is None
+                else:
+                    assert survey_reference == "theirs_version"
+
+        r = cli_runner.invoke(["merge", "--continue", "-m", "merge commit"])
+        assert r.exit_code == 0, r.stderr
+        merged = repo.structure("HEAD")
+        for pk in pks:
+            assert get_json_feature(merged, l, pk) == get_json_feature(theirs, l, pk)
+
+
 def test_resolve_with_file(data_archive, cli_runner):
     with data_archive("conflicts/polygons.tgz") as repo_path:
         repo = KartRepo(repo_path)
@@ -5,7 +5,7 @@ import pytest
 
 from kart.geometry import Geometry
 from kart.repo import KartRepo
-from kart.schema import Schema, ColumnSchema
+from kart.schema import Legend, Schema, ColumnSchema
 from kart.text_diff_writer import TextDiffWriter
 
 
@@ -95,6 +95,33 @@ def test_align_schema(gen_uuid):
     }
 
 
+@pytest.mark.parametrize("num_columns", [0, 1, 4])
+def test_feature_decoder_for_legend(num_columns, gen_uuid):
+    # A legend from an older version of the schema: one column has since been deleted and one has been added.
+    old_ids = [gen_uuid() for i in range(num_columns + 1)]
+    new_ids = old_ids[1:] + [gen_uuid()]
+    legend = Legend(old_ids[:1], old_ids[1:])
+    pk_values, non_pk_values = (1,), tuple(f"value-{i}" for i in range(num_columns))
+
+    schema_ids = new_ids[len(new_ids) - num_columns :]
+    schema = Schema(
+        [
+            ColumnSchema(id=id, name=f"col{i}", data_type="text")
+            for i, id in enumerate(schema_ids)
+        ]
+    )
+    expected = schema.feature_from_raw_dict(
+        legend.value_tuples_to_raw_dict(pk_values, non_pk_values)
+    )
+    decode_feature = schema.feature_decoder_for_legend(legend)
+    assert decode_feature(pk_values, non_pk_values) == expected
+    assert list(decode_feature(pk_values, non_pk_values)) == schema.column_names
+    assert schema.feature_decoder_for_legend(legend) is decode_feature
+
+    with pytest.raises(AssertionError):
+        decode_feature(pk_values, non_pk_values + ("extra",))
+
+
 def test_align_schema_type_changed(gen_uuid):
     class SimpleRoundtripContext:
         @classmethod
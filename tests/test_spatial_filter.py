@@ -11,7 +11,12 @@ from kart.exceptions import (
     SPATIAL_FILTER_CONFLICT,
 )
 from kart.geometry import ring_as_wkt, bbox_as_wkt_polygon
-from kart.promisor_utils import FetchPromisedBlobsProcess, LibgitSubcode
+from kart.promisor_utils import (
+    FetchPromisedBlobsProcess,
+    LibgitSubcode,
+    PromisedBlobsPrefetch,
+    promised_blob_ids,
+)
 from kart.repo import KartRepo
 from kart import subprocess_util as subprocess
 
@@ -500,6 +505,67 @@ def test_spatially_filtered_fetch_promised(
             assert final_config_dict == orig_config_dict
 
 
+@pytest.mark.parametrize("chunk_size,expected_processes", [(None, 1), (50, 4)])
+def test_prefetch_promised_blobs(
+    data_archive, cli_runner, monkeypatch, chunk_size, expected_processes
+):
+    # Keep track of how many features we fetch, and how many git fetch processes are used to fetch them.
+    orig_init_func = FetchPromisedBlobsProcess.__init__
+    orig_fetch_func = FetchPromisedBlobsProcess.fetch
+    process_count = 0
+    fetch_count = 0
+
+    def _init(*args, **kwargs):
+        nonlocal process_count
+        process_count += 1
+        return orig_init_func(*args, **kwargs)
+
+    def _fetch(*args, **kwargs):
+        nonlocal fetch_count
+        fetch_count += 1
+        return orig_fetch_func(*args, **kwargs)
+
+    monkeypatch.setattr(FetchPromisedBlobsProcess, "__init__", _init)
+    monkeypatch.setattr(FetchPromisedBlobsProcess, "fetch", _fetch)
+    if chunk_size:
+        monkeypatch.setattr(PromisedBlobsPrefetch, "DEFAULT_CHUNK_SIZE", chunk_size)
+
+    with data_archive("polygons-with-feature-envelopes") as repo1_path:
+        repo1_url = f"file://{repo1_path.resolve()}"
+
+        r = cli_runner.invoke(["-C", repo1_path, "show", "-o", "json", "HEAD"])
+        assert r.exit_code == 0, r.stderr
+        expected = json.loads(r.stdout)["kart.diff/v1+hexwkb"][H.POLYGONS.LAYER]
+
+        with data_archive("polygons-spatial-filtered") as repo2_path:
+            repo2 = KartRepo(repo2_path)
+            repo2.config["remote.origin.url"] = repo1_url
+            repo2.config["remote.origin.partialclonefilter"] = "blob:none"
+            # Without a spatial filter, every feature is needed to show a commit, so they can all be prefetched.
+            del repo2.config["kart.spatialfilter.geometry"]
+            del repo2.config["kart.spatialfilter.crs"]
+
+            ds = repo2.datasets()[H.POLYGONS.LAYER]
+            assert local_features(ds) == 52
+            promised = list(promised_blob_ids(repo2, ds.feature_blobs()))
+            assert len(promised) == H.POLYGONS.ROWCOUNT - 52
+
+            r = cli_runner.invoke(["-C", repo2_path, "show", "-o", "json", "HEAD"])
+            assert r.exit_code == 0, r.stderr
+            assert (
+                f"Fetching missing but required features in {H.POLYGONS.LAYER}"
+                in r.stderr
+            )
+            # The features are still output in the same order.
+            actual = json.loads(r.stdout)["kart.diff/v1+hexwkb"][H.POLYGONS.LAYER]
+            assert actual == expected
+
+            assert local_features(ds) == H.POLYGONS.ROWCOUNT
+            assert fetch_count == H.POLYGONS.ROWCOUNT - 52
+            assert process_count == expected_processes
+            assert list(promised_blob_ids(repo2, ds.feature_blobs())) == []
+
+
 def test_spatially_filtered_commit(data_archive, cli_runner):
     # We use the points layer for this test since it uses consecutive integer PKs.
     # This means that promised features and locally features are likely to both be stored in the
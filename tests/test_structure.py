@@ -24,8 +24,11 @@ from kart.sqlalchemy.gpkg import Db_GPKG
 from kart.schema import Schema
 from kart.geometry import ogr_to_gpkg_geom, gpkg_geom_to_ogr
 from kart.tabular.import_source import TableImportSource
-from kart.tabular.ogr_import_source import postgres_url_to_ogr_conn_str
-from kart.tabular.pk_generation import PkGeneratingTableImportSource
+from kart.tabular.ogr_import_source import (
+    OgrTableImportSource,
+    postgres_url_to_ogr_conn_str,
+)
+from kart.tabular.pk_generation import GeneratedPks, PkGeneratingTableImportSource
 from kart.repo import KartRepo
 
 from conftest import postgis_db
@@ -729,6 +732,140 @@ def test_generated_pk_feature_matching_performance(data_archive_readonly, benchm
         benchmark(_match_features_benchmark)
 
 
+def test_generated_pks():
+    pk_col = dict(PkGeneratingTableImportSource.DEFAULT_PK_COL)
+    hash_a, hash_b, hash_c, hash_d = "a1" * 20, "a2" * 20, "b1" * 20, "c1" * 20
+    generated_pks = GeneratedPks.from_legacy_dict(
+        {
+            "primaryKeySchema": pk_col,
+            "generatedPrimaryKeys": {
+                "1": hash_a,
+                "2": hash_b,
+                "3": hash_a,
+                "5": hash_c,
+            },
+        }
+    )
+    assert generated_pks.next_pk == 6
+    assert generated_pks.shard_prefix_length == 1
+
+    assert generated_pks.pop_unassigned_pk(hash_a) == 1
+    assert generated_pks.pop_unassigned_pk(hash_a) == 3
+    assert generated_pks.pop_unassigned_pk(hash_a) is None
+    assert generated_pks.pop_unassigned_pk(hash_d) is None
+    assert set(generated_pks.unassigned_pks()) == {2, 5}
+
+    # Reassigning a PK moves it to the new hash:
+    generated_pks.assign(5, hash_d)
+    generated_pks.assign(6, hash_b)
+    assert generated_pks.next_pk == 7
+
+    assert generated_pks.meta_items(pk_col) == {
+        "generated-pks/index.json": {
+            "primaryKeySchema": pk_col,
+            "nextPrimaryKey": 7,
+            "shardPrefixLength": 1,
+        },
+        "generated-pks/shards/a.json": {hash_a: [1, 3], hash_b: [2, 6]},
+        "generated-pks/shards/c.json": {hash_d: [5]},
+    }
+
+    assert GeneratedPks.shard_prefix_length_for_count(1000) == 1
+    assert GeneratedPks.shard_prefix_length_for_count(10_000_000) == 3
+
+
+def test_generated_pks_reshard(monkeypatch):
+    monkeypatch.setattr(GeneratedPks, "TARGET_SHARD_SIZE", 1)
+    pk_col = dict(PkGeneratingTableImportSource.DEFAULT_PK_COL)
+    hashes = [f"{i:02x}" * 20 for i in range(0, 40, 2)]
+    generated_pks = GeneratedPks(pk_col, shard_prefix_length=1)
+
+    # 16 primary keys fit in 16 shards:
+    for pk, feature_hash in enumerate(hashes[:16], 1):
+        generated_pks.assign(pk, feature_hash)
+    meta_items = generated_pks.meta_items(pk_col)
+    assert meta_items["generated-pks/index.json"]["shardPrefixLength"] == 1
+
+    # But 20 don't, so every shard is rewritten with a longer prefix:
+    for pk, feature_hash in enumerate(hashes[16:], 17):
+        generated_pks.assign(pk, feature_hash)
+    assert generated_pks.meta_items(pk_col) == {
+        "generated-pks/index.json": {
+            "primaryKeySchema": pk_col,
+            "nextPrimaryKey": 21,
+            "shardPrefixLength": 2,
+        },
+        **{
+            f"generated-pks/shards/{feature_hash[:2]}.json": {feature_hash: [pk]}
+            for pk, feature_hash in enumerate(hashes, 1)
+        },
+    }
+
+
+@pytest.mark.slow
+def test_import_from_shp_generated_pks(data_archive, tmp_path, cli_runner, chdir):
+    with data_archive("shapefiles/shp-points.tgz") as data:
+        repo_path = tmp_path / "repo"
+        repo_path.mkdir()
+        with chdir(repo_path):
+            r = cli_runner.invoke(["init"])
+            assert r.exit_code == 0, r.stderr
+            r = cli_runner.invoke(["import", data / "nz_pa_points_topo_150k.shp"])
+            assert r.exit_code == 0, r.stderr
+
+            repo = KartRepo(repo_path)
+            dataset = repo.datasets()[H.POINTS.LAYER]
+            index = dataset.get_meta_item("generated-pks/index.json")
+            assert index["nextPrimaryKey"] == H.POINTS.ROWCOUNT + 1
+            assert index["shardPrefixLength"] == 1
+
+            shard_tree = dataset.meta_tree / "generated-pks/shards"
+            assert len(shard_tree) == 16
+            all_pks = []
+            for blob in shard_tree:
+                shard = dataset.get_meta_item(f"generated-pks/shards/{blob.name}")
+                assert all(h.startswith(blob.name[0]) for h in shard)
+                for pks in shard.values():
+                    all_pks.extend(pks)
+            assert sorted(all_pks) == list(range(1, H.POINTS.ROWCOUNT + 1))
+
+            # Reimporting the same data reuses the same PKs, and so changes nothing:
+            r = cli_runner.invoke(
+                ["import", data / "nz_pa_points_topo_150k.shp", "--replace-existing"]
+            )
+            assert r.exit_code == NO_CHANGES, r.stderr
+
+
+@pytest.mark.parametrize(
+    "archive,source_shp,layer",
+    [
+        pytest.param("shp-points", "nz_pa_points_topo_150k.shp", H.POINTS, id="points"),
+        pytest.param(
+            "shp-polygons", "nz_waca_adjustments.shp", H.POLYGONS, id="polygons"
+        ),
+    ],
+)
+def test_ogr_import_source_arrow_stream(
+    archive, source_shp, layer, data_archive, monkeypatch
+):
+    pytest.importorskip("numpy")
+    with data_archive(f"shapefiles/{archive}.tgz") as data:
+        source = TableImportSource.open(data / source_shp, table=layer.LAYER)
+        if not source._can_use_arrow_stream():
+            pytest.skip("GDAL doesn't support reading layers as Arrow streams")
+        with source:
+            arrow_features = list(source.features())
+
+        monkeypatch.setattr(
+            OgrTableImportSource, "_can_use_arrow_stream", lambda self: False
+        )
+        with source:
+            ogr_features = list(source.features())
+
+    assert len(arrow_features) == layer.ROWCOUNT
+    assert arrow_features == ogr_features
+
+
 def test_postgis_import_replace_no_ids(
     postgis_db,
     postgis_layer,
@@ -129,8 +129,9 @@ def test_upgrade_v1(archive, layer, data_archive_readonly, cli_runner, tmp_path,
         pytest.param("kart"),
     ],
 )
+@pytest.mark.parametrize("jobs", [1, 2])
 def test_upgrade_v2(
-    branding, archive, layer, data_archive_readonly, cli_runner, tmp_path, chdir
+    branding, jobs, archive, layer, data_archive_readonly, cli_runner, tmp_path, chdir
 ):
     archive_path = Path("upgrade") / f"v2.{branding}" / archive
     with data_archive_readonly(archive_path) as source_path:
@@ -144,7 +145,9 @@ def test_upgrade_v2(
         r = cli_runner.invoke(["log"])
         assert r.exit_code == 0  # V2 is still supported
 
-        r = cli_runner.invoke(["upgrade", source_path, tmp_path / "dest"])
+        r = cli_runner.invoke(
+            ["upgrade", f"--jobs={jobs}", source_path, tmp_path / "dest"]
+        )
         assert r.exit_code == 0, r.stderr
         assert r.stdout.splitlines()[-1] == "Upgrade complete"
 
@@ -239,3 +242,41 @@ def test_upgrade_preserves_refs(data_archive, cli_runner, tmp_path):
         # check that the refs are the same as before
         repo = KartRepo(dest)
         assert set(repo.references) == {"refs/heads/newbranch"}
+
+
+@pytest.mark.slow
+def test_upgrade_resume(data_archive_readonly, cli_runner, tmp_path, monkeypatch):
+    from kart.upgrade import UpgradeCheckpoint
+
+    class Interrupted(Exception):
+        pass
+
+    record_commit = UpgradeCheckpoint.record_commit
+
+    def record_commit_then_fail(self, source_commit_hex, dest_commit_hex):
+        record_commit(self, source_commit_hex, dest_commit_hex)
+        raise Interrupted()
+
+    dest = tmp_path / "dest"
+    with data_archive_readonly("upgrade/v2.kart/points") as source_path:
+        # Interrupt the upgrade once the first commit has been written.
+        monkeypatch.setattr(UpgradeCheckpoint, "record_commit", record_commit_then_fail)
+        with pytest.raises(Interrupted):
+            cli_runner.invoke(["upgrade", source_path, dest])
+        assert KartRepo(dest).gitdir_file("UPGRADE_CHECKPOINT").exists()
+        monkeypatch.undo()
+
+        r = cli_runner.invoke(["upgrade", source_path, dest])
+        assert r.exit_code == 0, r.stderr
+        lines = r.stdout.splitlines()
+        assert lines[0] == f"Resuming upgrade of {dest} ..."
+        # Every dataset was already converted, and only the second commit still needed writing:
+        assert "0 dataset versions converted." in lines
+        commit_lines = [l for l in lines if l.startswith(("  0: ", "  1: "))]
+        assert len(commit_lines) == 1 and commit_lines[0].startswith("  1: ")
+        assert lines[-1] == "Upgrade complete"
+
+    repo = KartRepo(dest)
+    assert not repo.gitdir_file("UPGRADE_CHECKPOINT").exists()
+    assert repo.head_commit.hex == H.POINTS.HEAD_SHA
+    assert set(repo.references) == {"refs/heads/main"}